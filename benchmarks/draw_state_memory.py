@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+每日抽奖状态内存基准测试
+
+对比两种DrawLimiter存储方式在N个用户下的Redis内存占用:
+- keys: 每用户每天 draw:free:{g}:{u}:{date} / draw:paid:{g}:{u}:{date} 两个独立key
+- hash: 每服务器每天 draw:free:{g}:{date} / draw:paid:{g}:{date} 两个hash
+
+需要可写的Redis实例(读取REDIS_URL或REDIS_HOST/REDIS_PORT/REDIS_PASSWORD/REDIS_DB),
+测试数据写入独立的服务器ID并在结束后删除。
+
+用法: python benchmarks/draw_state_memory.py [--users 100000]
+"""
+import argparse
+import os
+import random
+
+import redis
+
+BENCH_GUILD_ID = 'bench-guild'
+BENCH_DATE = '1970-01-01'
+TTL = 86400
+BATCH_SIZE = 5000
+
+
+def connect() -> redis.Redis:
+    redis_url = os.getenv('REDIS_URL')
+    if redis_url:
+        return redis.from_url(redis_url, decode_responses=True)
+    return redis.Redis(
+        host=os.getenv('REDIS_HOST', 'localhost'),
+        port=int(os.getenv('REDIS_PORT', 6379)),
+        password=os.getenv('REDIS_PASSWORD'),
+        db=int(os.getenv('REDIS_DB', 0)),
+        decode_responses=True
+    )
+
+
+def used_memory(client: redis.Redis) -> int:
+    return int(client.info('memory')['used_memory'])
+
+
+def write_keys(client: redis.Redis, users):
+    """keys模式: 每用户两个独立key"""
+    keys = []
+    for start in range(0, len(users), BATCH_SIZE):
+        pipe = client.pipeline(transaction=False)
+        for user_id, paid in users[start:start + BATCH_SIZE]:
+            free_key = f'draw:free:{BENCH_GUILD_ID}:{user_id}:{BENCH_DATE}'
+            paid_key = f'draw:paid:{BENCH_GUILD_ID}:{user_id}:{BENCH_DATE}'
+            pipe.set(free_key, '1', ex=TTL)
+            pipe.set(paid_key, paid, ex=TTL)
+            keys.extend((free_key, paid_key))
+        pipe.execute()
+    return keys
+
+
+def write_hash(client: redis.Redis, users):
+    """hash模式: 每服务器两个hash,到期时间统一"""
+    free_key = f'draw:free:{BENCH_GUILD_ID}:{BENCH_DATE}'
+    paid_key = f'draw:paid:{BENCH_GUILD_ID}:{BENCH_DATE}'
+    for start in range(0, len(users), BATCH_SIZE):
+        batch = users[start:start + BATCH_SIZE]
+        pipe = client.pipeline(transaction=False)
+        pipe.hset(free_key, mapping={str(user_id): '1' for user_id, _ in batch})
+        pipe.hset(paid_key, mapping={str(user_id): paid for user_id, paid in batch})
+        pipe.execute()
+    client.expire(free_key, TTL)
+    client.expire(paid_key, TTL)
+    return [free_key, paid_key]
+
+
+def delete(client: redis.Redis, keys):
+    for start in range(0, len(keys), BATCH_SIZE):
+        client.delete(*keys[start:start + BATCH_SIZE])
+
+
+def measure(client: redis.Redis, name: str, writer, users):
+    before = used_memory(client)
+    keys = writer(client, users)
+    after = used_memory(client)
+    delete(client, keys)
+
+    total = after - before
+    print(
+        f"{name:<5} key数 {len(keys):>8} | 内存增加 {total / 1024 / 1024:8.2f} MiB | "
+        f"每用户 {total / len(users):7.1f} 字节"
+    )
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=100_000)
+    args = parser.parse_args()
+
+    # 模拟Discord雪花ID和当日付费抽奖次数
+    rng = random.Random(42)
+    users = [(rng.randrange(10 ** 17, 10 ** 19), rng.randint(1, 30)) for _ in range(args.users)]
+
+    client = connect()
+    keys_total = measure(client, 'keys', write_keys, users)
+    hash_total = measure(client, 'hash', write_hash, users)
+
+    if keys_total > 0:
+        print(f"hash模式内存为keys模式的 {hash_total / keys_total * 100:.1f}%")
+
+
+if __name__ == '__main__':
+    main()
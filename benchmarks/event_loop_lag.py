@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+事件循环延迟基准测试
+
+模拟50个并发命令,每个命令执行若干次"慢"的PostgREST往返(time.sleep模拟),
+对比直接同步调用.execute()与通过src.db.async_db线程池执行时的事件循环延迟。
+
+用法: python benchmarks/event_loop_lag.py [--commands 50] [--queries 3] [--latency 0.05]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.db import async_db  # noqa: E402
+
+
+class FakeQuery:
+    """模拟Supabase查询构建器,execute()同步阻塞指定时长"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def execute(self):
+        time.sleep(self.latency)
+        return {'data': []}
+
+
+async def probe_lag(stop: asyncio.Event, interval: float, samples: list):
+    """周期性sleep,记录实际唤醒时间与预期时间的偏差"""
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - expected))
+
+
+async def blocking_command(queries: int, latency: float):
+    for _ in range(queries):
+        FakeQuery(latency).execute()
+        await asyncio.sleep(0)
+
+
+async def async_command(queries: int, latency: float):
+    for _ in range(queries):
+        await async_db.execute(FakeQuery(latency))
+
+
+async def run_case(command, commands: int, queries: int, latency: float):
+    samples: list = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_lag(stop, 0.005, samples))
+    await asyncio.sleep(0.02)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(command(queries, latency) for _ in range(commands)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await probe
+    return elapsed, samples
+
+
+def report(name: str, elapsed: float, samples: list):
+    ordered = sorted(samples) or [0.0]
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(
+        f"{name:<10} 总耗时 {elapsed * 1000:8.1f} ms | "
+        f"循环延迟 平均 {statistics.mean(ordered) * 1000:7.2f} ms, "
+        f"p99 {p99 * 1000:7.2f} ms, 最大 {ordered[-1] * 1000:7.2f} ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--commands', type=int, default=50)
+    parser.add_argument('--queries', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.05)
+    args = parser.parse_args()
+
+    print(
+        f"{args.commands} 个并发命令, 每个 {args.queries} 次查询, "
+        f"单次查询 {args.latency * 1000:.0f} ms, 线程池大小 {async_db.DB_MAX_WORKERS}"
+    )
+
+    elapsed, samples = await run_case(blocking_command, args.commands, args.queries, args.latency)
+    report('before', elapsed, samples)
+
+    elapsed, samples = await run_case(async_command, args.commands, args.queries, args.latency)
+    report('after', elapsed, samples)
+
+    async_db.shutdown_executor()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+翻译查找微基准测试
+
+对比原先逐个语言遍历嵌套JSON的t()实现与预编译扁平目录的t():
+- 无参数文本(按钮/标题)
+- 带参数模板(抽奖结果等)
+- 回退到其他语言的key
+并先校验两种实现对所有key的输出一致。
+
+用法: python benchmarks/i18n_lookup.py [--iterations 200000]
+"""
+import argparse
+import os
+import string
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 仅用于加载配置模块,不会连接任何服务
+os.environ.setdefault('TOKEN', 'benchmark')
+os.environ.setdefault('SUPABASE_KEY', 'benchmark')
+
+from src.utils import i18n  # noqa: E402
+
+
+def legacy_t(key, locale=None, default=None, **kwargs):
+    """优化前的t()实现,用作对照"""
+    locales_to_try = []
+    if locale and i18n.is_supported(locale):
+        locales_to_try.append(locale)
+
+    default_locale = i18n.get_default_locale()
+    if default_locale not in locales_to_try:
+        locales_to_try.append(default_locale)
+
+    if "en-US" not in locales_to_try:
+        locales_to_try.append("en-US")
+
+    for code in i18n.SUPPORTED_LOCALES:
+        if code not in locales_to_try:
+            locales_to_try.append(code)
+
+    for code in locales_to_try:
+        value = i18n._resolve_key(i18n._load_locale(code), key)
+        if isinstance(value, str):
+            try:
+                formatted_value = value.format(**kwargs) if kwargs else value
+                return formatted_value.replace('\\n', '\n')
+            except KeyError:
+                return value.replace('\\n', '\n')
+
+    if default:
+        try:
+            formatted_default = default.format(**kwargs) if kwargs else default
+            return formatted_default.replace('\\n', '\n')
+        except KeyError:
+            return default.replace('\\n', '\n')
+
+    return key
+
+
+def all_keys():
+    keys = set()
+    for code in i18n.SUPPORTED_LOCALES:
+        keys.update(i18n._flatten(i18n._load_locale(code)))
+    return sorted(keys)
+
+
+def verify(keys):
+    """确认新旧实现对所有key和语言的输出一致"""
+    mismatches = 0
+    for key in keys:
+        for locale in (None, *i18n.SUPPORTED_LOCALES):
+            if legacy_t(key, locale=locale) != i18n.t(key, locale=locale):
+                mismatches += 1
+    print(f"校验 {len(keys)} 个key,不一致 {mismatches} 处")
+    return mismatches == 0
+
+
+def pick_template(keys, locale):
+    """选一个带占位符的模板作为格式化用例"""
+    catalog = i18n._get_catalog(locale)
+    for key in keys:
+        template, has_fields = catalog[key]
+        if has_fields:
+            try:
+                names = {name for _, name, _, _ in string.Formatter().parse(template) if name}
+            except ValueError:
+                continue
+            if names and all(name.isidentifier() for name in names):
+                return key, {name: 123 for name in names}
+    return keys[0], {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=200_000)
+    args = parser.parse_args()
+
+    keys = all_keys()
+    if not verify(keys):
+        sys.exit(1)
+
+    locale = 'zh-CN'
+    plain_key = next(key for key in keys if not i18n._get_catalog(locale)[key][1])
+    format_key, params = pick_template(keys, locale)
+    cases = [
+        ('无参数文本', plain_key, {}),
+        ('带参数模板', format_key, params),
+        ('缺失key', 'benchmark.missing.key', {}),
+    ]
+
+    print(f"{'用例':<10} {'原实现(ns)':>12} {'新实现(ns)':>12} {'加速':>8}")
+    for name, key, kwargs in cases:
+        legacy = timeit.timeit(lambda: legacy_t(key, locale=locale, **kwargs), number=args.iterations)
+        current = timeit.timeit(lambda: i18n.t(key, locale=locale, **kwargs), number=args.iterations)
+        legacy_ns = legacy / args.iterations * 1e9
+        current_ns = current / args.iterations * 1e9
+        print(f"{name:<10} {legacy_ns:>12.0f} {current_ns:>12.0f} {legacy_ns / current_ns:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
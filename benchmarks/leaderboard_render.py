@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+排行榜渲染基准测试
+
+对比10条记录的排行榜图片渲染耗时:
+- 原实现: 每次请求用getpixel/putpixel逐像素生成渐变背景,并重新绘制所有卡片底板
+- 现实现: 背景按列计算后拉伸,背景+卡片底板按条目数缓存,渲染时只复制模板
+
+先校验新旧渐变背景逐像素一致。头像使用随机生成的PNG,不需要网络。
+
+用法: python benchmarks/leaderboard_render.py [--entries 10] [--runs 5]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+from src.utils import leaderboard_renderer as renderer  # noqa: E402
+
+FONT_MAP = {
+    'title': 'src/res/fonts/Comic Sans MS.ttf',
+    'rank': 'src/res/fonts/Arial Rounded Bold.ttf',
+    'name': 'src/res/fonts/SnellRoundhand.ttc',
+    'value': 'src/res/fonts/Arial Rounded Bold.ttf',
+}
+
+
+def legacy_gradient(width, height):
+    """优化前的逐像素渐变背景"""
+    base = Image.new('RGB', (width, height), renderer.GRADIENT_TOP)
+    overlay = Image.new('RGB', (width, height), renderer.GRADIENT_BOTTOM)
+
+    for y in range(height):
+        alpha = int(255 * (y / height))
+        for x in range(width):
+            r1, g1, b1 = base.getpixel((x, 0))
+            r2, g2, b2 = overlay.getpixel((x, 0))
+            r = int(r1 + (r2 - r1) * alpha / 255)
+            g = int(g1 + (g2 - g1) * alpha / 255)
+            b = int(b1 + (b2 - b1) * alpha / 255)
+            base.putpixel((x, y), (r, g, b))
+
+    return base
+
+
+def legacy_template(entry_count):
+    """优化前每次请求都重新生成背景和卡片底板"""
+    img = legacy_gradient(renderer.WIDTH, renderer.get_canvas_height(entry_count))
+    draw = ImageDraw.Draw(img)
+    y = renderer.PADDING + renderer.TITLE_HEIGHT
+    for _ in range(entry_count):
+        renderer.draw_rounded_rectangle(
+            draw, (renderer.PADDING, y, renderer.WIDTH - renderer.PADDING, y + renderer.CARD_HEIGHT),
+            15, renderer.CARD_COLOR
+        )
+        y += renderer.CARD_HEIGHT + renderer.CARD_SPACING
+    return img
+
+
+def make_entries(count):
+    rng = random.Random(42)
+    entries = []
+    for rank in range(1, count + 1):
+        avatar = Image.new('RGB', (128, 128), tuple(rng.randrange(256) for _ in range(3)))
+        buffer = BytesIO()
+        avatar.save(buffer, format='PNG')
+        entries.append({
+            'rank': rank,
+            'avatar_bytes': buffer.getvalue(),
+            'name': f'player{rank}',
+            'value_text': f'{rng.randrange(10 ** 6):,} points',
+        })
+    return entries
+
+
+def time_render(entries, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        renderer.render_leaderboard('Leaderboard', entries, FONT_MAP)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--entries', type=int, default=10)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    height = renderer.get_canvas_height(args.entries)
+    same = legacy_gradient(renderer.WIDTH, height).tobytes() == \
+        renderer.create_gradient_background(renderer.WIDTH, height).tobytes()
+    print(f"渐变背景逐像素一致: {same}")
+    if not same:
+        sys.exit(1)
+
+    entries = make_entries(args.entries)
+
+    cached_template = renderer.get_template
+    renderer.get_template = legacy_template
+    try:
+        legacy = time_render(entries, args.runs)
+    finally:
+        renderer.get_template = cached_template
+
+    renderer.get_template.cache_clear()
+    cold = time_render(entries, 1)
+    warm = time_render(entries, args.runs)
+
+    print(f"{args.entries}条记录 ({renderer.WIDTH}x{height}):")
+    print(f"  原实现           中位数 {statistics.median(legacy) * 1000:8.1f} ms")
+    print(f"  现实现(首次)     {cold[0] * 1000:8.1f} ms")
+    print(f"  现实现(模板缓存) 中位数 {statistics.median(warm) * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
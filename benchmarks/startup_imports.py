@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+启动导入耗时分析
+
+在子进程中以 python -X importtime 导入src.main(不会登录Discord),
+汇总总导入耗时以及累计耗时最高的模块,用于对比延迟导入前后的冷启动差异。
+运行完整的机器人时,on_ready结束后会另外输出一次启动时间线(src.utils.startup_profiler)。
+
+用法: python benchmarks/startup_imports.py [--top 20] [--runs 3]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_once():
+    """导入一次src.main,返回(总耗时秒, [(累计微秒, 自身微秒, 模块名), ...])"""
+    env = dict(os.environ)
+    # 仅用于通过配置检查,导入过程不会连接任何服务
+    env.setdefault('TOKEN', 'benchmark')
+    env.setdefault('SUPABASE_KEY', 'benchmark')
+
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import src.main'],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    total = time.perf_counter() - started
+    if result.returncode != 0:
+        tail = [line for line in result.stderr.splitlines() if not line.startswith('import time:')]
+        raise RuntimeError('\n'.join(tail[-10:]))
+
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return total, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    # 第一次运行会生成.pyc和语言缓存,取后续运行的最小值
+    totals = []
+    modules = []
+    for _ in range(max(1, args.runs)):
+        total, modules = run_once()
+        totals.append(total)
+
+    print(f"导入src.main耗时(含解释器启动): 最小 {min(totals) * 1000:.0f} ms / 每次 "
+          + ", ".join(f"{t * 1000:.0f}" for t in totals))
+    print(f"\n累计导入耗时最高的 {args.top} 个模块:")
+    print(f"{'累计(ms)':>10} {'自身(ms)':>10}  模块")
+    for cumulative_us, self_us, name in sorted(modules, reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>10.1f} {self_us / 1000:>10.1f}  {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+宠物等级计算基准测试
+
+对比原先逐级累加(每级一次浮点pow)的等级计算与累计经验查表+二分查找:
+- calculate_current_level_xp 单次调用(喂食/批量喂食/宠物信息)
+- calculate_levels 批量计算(NumPy向量化)
+并先校验两种实现在 0 ~ 满级经验范围内的结果完全一致。
+
+用法: python benchmarks/xp_levels.py [--pets 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 仅用于加载配置模块,不会连接任何服务
+os.environ.setdefault('TOKEN', 'benchmark')
+os.environ.setdefault('SUPABASE_KEY', 'benchmark')
+
+from src.utils.feeding_system import FeedingSystem  # noqa: E402
+
+
+def legacy_requirement(current_level):
+    if current_level < 1:
+        return 0
+    return round(FeedingSystem.XP_BASE * (current_level ** FeedingSystem.XP_GROWTH_POW)
+                 + FeedingSystem.XP_STEP * current_level)
+
+
+def legacy_total_xp_for_level(level):
+    if level <= 1:
+        return 0
+    total = 0
+    for current_level in range(1, level):
+        total += legacy_requirement(current_level)
+    return total
+
+
+def legacy_level_from_total_xp(total_xp):
+    if total_xp < 0:
+        return 1
+    level = 1
+    accumulated_xp = 0
+    while True:
+        next_level_xp = legacy_requirement(level)
+        if accumulated_xp + next_level_xp > total_xp:
+            break
+        accumulated_xp += next_level_xp
+        level += 1
+        if level > 200:
+            break
+    return level
+
+
+def legacy_current_level_xp(total_xp):
+    """优化前的calculate_current_level_xp,用作对照"""
+    level = legacy_level_from_total_xp(total_xp)
+    current_level_xp = total_xp - legacy_total_xp_for_level(level)
+    return level, current_level_xp, legacy_requirement(level)
+
+
+def verify(max_xp):
+    """校验所有等级边界附近和随机样本的结果一致"""
+    samples = set(range(-5, 500))
+    for level in range(1, FeedingSystem.MAX_LEVEL + 3):
+        boundary = legacy_total_xp_for_level(level)
+        samples.update((boundary - 1, boundary, boundary + 1))
+    rng = random.Random(0)
+    samples.update(rng.randrange(max_xp * 2) for _ in range(20000))
+    samples = sorted(samples)
+
+    mismatches = [xp for xp in samples if FeedingSystem.calculate_current_level_xp(xp) != legacy_current_level_xp(xp)]
+    levels, current, requirements = FeedingSystem.calculate_levels(samples)
+    vector_mismatches = [
+        xp for xp, level, cur, req in zip(samples, levels, current, requirements)
+        if (int(level), int(cur), int(req)) != legacy_current_level_xp(xp)
+    ]
+    for level in range(0, FeedingSystem.MAX_LEVEL + 10):
+        assert FeedingSystem.calculate_total_xp_for_level(level) == legacy_total_xp_for_level(level), level
+        assert FeedingSystem.calculate_level_xp_requirement(level) == legacy_requirement(level), level
+
+    print(f"校验 {len(samples)} 个经验值: 单次不一致 {len(mismatches)}, 批量不一致 {len(vector_mismatches)}")
+
+
+def bench(name, func, values):
+    start = time.perf_counter()
+    func(values)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<24} {elapsed * 1000:9.2f} ms | 每只 {elapsed / len(values) * 1e6:8.3f} µs")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pets', type=int, default=100_000)
+    args = parser.parse_args()
+
+    max_xp = FeedingSystem.calculate_total_xp_for_level(FeedingSystem.MAX_LEVEL + 1)
+    verify(max_xp)
+
+    # 经验分布偏向低等级,与实际宠物分布接近
+    rng = random.Random(42)
+    values = [int(max_xp * rng.random() ** 3) for _ in range(args.pets)]
+
+    legacy = bench('逐级累加', lambda xs: [legacy_current_level_xp(x) for x in xs], values)
+    table = bench('查表+二分', lambda xs: [FeedingSystem.calculate_current_level_xp(x) for x in xs], values)
+    FeedingSystem.calculate_levels([0])  # 预先导入NumPy并生成数组
+    vector = bench('NumPy批量', FeedingSystem.calculate_levels, values)
+
+    print(f"查表+二分提速 {legacy / table:.0f}x, NumPy批量提速 {legacy / vector:.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,13 @@
 #!/usr/bin/env python3
 # Daily Draw Bot - Entry Point
 
-from src.main import main
+# 最先导入,启动时间线从这里开始计时
+from src.utils import startup_profiler
 
 if __name__ == "__main__":
+    # 渲染/模拟进程使用spawn启动,会以__mp_main__重新执行本文件,
+    # 机器人只在主进程中导入,工作进程不会加载discord.py和命令模块
+    from src.main import main
+
+    startup_profiler.mark("导入src.main")
     main()
@@ -21,5 +21,31 @@ $$ LANGUAGE plpgsql;
 -- SELECT * FROM atomic_update_points(42, 100);  -- 增加100积分
 -- SELECT * FROM atomic_update_points(42, -50);  -- 减少50积分
 
+-- 批量原子性积分更新函数
+-- 多用户结算(如积分转账)在一条UPDATE语句内完成,同一用户的多个变化量先合并
+
+CREATE OR REPLACE FUNCTION atomic_apply_deltas(
+    p_user_ids INTEGER[],
+    p_deltas INTEGER[]
+)
+RETURNS TABLE(user_id INTEGER, new_points INTEGER) AS $$
+BEGIN
+    RETURN QUERY
+    UPDATE users u
+    SET points = GREATEST(0, u.points + d.total_delta)
+    FROM (
+        SELECT x.uid, SUM(x.delta)::INTEGER AS total_delta
+        FROM unnest(p_user_ids, p_deltas) AS x(uid, delta)
+        GROUP BY x.uid
+    ) d
+    WHERE u.id = d.uid
+    RETURNING u.id, u.points;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 使用示例:
+-- SELECT * FROM atomic_apply_deltas(ARRAY[42, 43], ARRAY[-100, 100]);  -- 42转给43共100积分
+
 -- 回滚函数 (如果需要删除):
 -- DROP FUNCTION IF EXISTS atomic_update_points(INTEGER, INTEGER);
+-- DROP FUNCTION IF EXISTS atomic_apply_deltas(INTEGER[], INTEGER[]);
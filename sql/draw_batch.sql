@@ -0,0 +1,51 @@
+-- 批量抽奖结算函数
+-- 将 !draw N 的扣费、奖励发放和抽奖计数合并为一次往返、一个事务完成
+-- 奖励在Python端本地抽取,这里只负责校验余额并原子性地写入净变化量
+
+CREATE OR REPLACE FUNCTION draw_batch(
+    p_user_id INTEGER,
+    p_count INTEGER,
+    p_cost INTEGER,
+    p_reward_total INTEGER,
+    p_draw_date DATE,
+    p_paid_draws_today INTEGER
+)
+RETURNS TABLE(success BOOLEAN, new_points INTEGER) AS $$
+DECLARE
+    v_points INTEGER;
+    v_total_cost INTEGER := p_count * p_cost;
+BEGIN
+    -- 锁定用户行,防止并发抽奖/转账在校验和更新之间修改余额
+    SELECT points INTO v_points
+    FROM users
+    WHERE id = p_user_id
+    FOR UPDATE;
+
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+
+    -- 余额不足时不做任何修改,返回当前积分
+    IF v_points < v_total_cost THEN
+        RETURN QUERY SELECT FALSE, v_points;
+        RETURN;
+    END IF;
+
+    -- 一次性写入净变化量和当日抽奖状态
+    RETURN QUERY
+    UPDATE users
+    SET points = GREATEST(0, points - v_total_cost + p_reward_total),
+        last_draw_date = p_draw_date,
+        paid_draws_today = p_paid_draws_today,
+        last_paid_draw_date = p_draw_date
+    WHERE id = p_user_id
+    RETURNING TRUE, points;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 使用示例:
+-- SELECT * FROM draw_batch(42, 10, 100, 1350, '2024-01-01', 10);  -- 付费抽10次,奖励共1350
+-- SELECT * FROM draw_batch(42, 1, 0, 50, '2024-01-01', 0);        -- 免费抽奖
+
+-- 回滚函数 (如果需要删除):
+-- DROP FUNCTION IF EXISTS draw_batch(INTEGER, INTEGER, INTEGER, INTEGER, DATE, INTEGER);
@@ -2,7 +2,8 @@ import discord
 import asyncio
 import datetime
 from src.db.database import get_connection
-from src.utils.helpers import now_est, get_weighted_reward
+from src.db import async_db
+from src.utils.helpers import now_est
 from src.utils.i18n import get_guild_locale, get_reward_message, t
 from src.config.config import DRAW_COST, MAX_PAID_DRAWS_PER_DAY
 from src.utils.cache import UserCache
@@ -30,7 +31,7 @@ async def draw(ctx, count: int = 1):
 
         if user_id is None:
             # 创建新用户
-            create_response = supabase.table('users').insert({
+            create_response = await async_db.execute(supabase.table('users').insert({
                 'guild_id': ctx.guild.id,
                 'discord_user_id': ctx.author.id,
                 'points': 0,
@@ -39,40 +40,46 @@ async def draw(ctx, count: int = 1):
                 'last_paid_draw_date': '1970-01-01',
                 'equipped_pet_id': None,
                 'last_pet_points_update': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
-            }).execute()
+            }))
             user_id = create_response.data[0]['id']
-
-        # 使用Redis检查免费抽奖（异步）
-        first_draw = await DrawLimiter.check_free_draw_available(guild_id, discord_user_id)
+            await UserCache.set_user_id(guild_id, discord_user_id, user_id)
 
         # 使用Redis获取用户积分
         points = await UserCache.get_points(guild_id, discord_user_id)
 
+        # 一次Redis往返完成免费抽奖判断和付费次数预占（异步）
+        reservation = await DrawLimiter.reserve_draws(guild_id, discord_user_id, count, MAX_PAID_DRAWS_PER_DAY)
+
     except Exception as e:
         await ctx.send(t("economy.common.query_failed", locale=locale, error=str(e)))
         return
 
+    first_draw = reservation.free
+    paid_draws_today = reservation.paid_count
+
     # 如果还有免费抽奖机会，只能抽1次
+    if reservation.free_pending:
+        await ctx.send(t("economy.draw.validation.complete_free_first", locale=locale))
+        return
+
     if first_draw:
-        if count > 1:
-            await ctx.send(t("economy.draw.validation.complete_free_first", locale=locale))
-            return
         # 当天第一次抽奖 - 免费！
         await ctx.send(t("economy.draw.free_start", locale=locale, mention=ctx.author.mention))
     else:
-        # 付费抽奖
-        paid_draws_today = await DrawLimiter.get_paid_draw_count(guild_id, discord_user_id)
+        # 付费抽奖(预占前的今日次数用于展示)
+        used_draws = reservation.paid_count - reservation.granted
         total_cost = count * DRAW_COST
 
         # 检查付费抽奖次数是否足够
-        if paid_draws_today + count > MAX_PAID_DRAWS_PER_DAY:
-            remaining_draws = MAX_PAID_DRAWS_PER_DAY - paid_draws_today
+        if reservation.granted < count:
+            await DrawLimiter.release_draws(guild_id, discord_user_id, reservation)
+            remaining_draws = MAX_PAID_DRAWS_PER_DAY - used_draws
             embed = discord.Embed(
                 title=t("economy.draw.paid_limit.title", locale=locale),
                 description=t(
                     "economy.draw.paid_limit.description",
                     locale=locale,
-                    used=paid_draws_today,
+                    used=used_draws,
                     remaining=remaining_draws,
                     requested=count
                 ),
@@ -83,6 +90,7 @@ async def draw(ctx, count: int = 1):
 
         # 检查积分是否足够
         if points < total_cost:
+            await DrawLimiter.release_draws(guild_id, discord_user_id, reservation)
             embed = discord.Embed(
                 title=t("economy.draw.insufficient.title", locale=locale),
                 description=t(
@@ -99,7 +107,7 @@ async def draw(ctx, count: int = 1):
             return
 
         # 确认抽奖
-        remaining_draws = MAX_PAID_DRAWS_PER_DAY - paid_draws_today
+        remaining_draws = MAX_PAID_DRAWS_PER_DAY - used_draws
         embed = discord.Embed(
             title=t("economy.draw.confirm.title", locale=locale),
             description=t(
@@ -108,7 +116,7 @@ async def draw(ctx, count: int = 1):
                 count=count,
                 cost=total_cost,
                 points=points,
-                used=paid_draws_today,
+                used=used_draws,
                 remaining=remaining_draws
             ),
             color=discord.Color.orange()
@@ -121,66 +129,43 @@ async def draw(ctx, count: int = 1):
         try:
             msg = await ctx.bot.wait_for("message", check=check, timeout=15)
         except asyncio.TimeoutError:
+            await DrawLimiter.release_draws(guild_id, discord_user_id, reservation)
             await ctx.send(t("economy.draw.cancel_timeout", locale=locale))
             return
 
         if msg.content.upper() != "Y":
+            await DrawLimiter.release_draws(guild_id, discord_user_id, reservation)
             await ctx.send(t("economy.draw.cancel_manual", locale=locale))
             return
 
-    # 执行抽奖
-    rewards = []
-    total_points = 0
+    # 执行抽奖:先在本地抽取全部奖励,再一次性结算
     today = now_est().date()
+    draw_cost = 0 if first_draw else DRAW_COST
 
-    for i in range(count):
-        # 如果是免费抽奖，跳过扣费和计数
-        if not first_draw:
-            # 付费抽奖：增加计数（异步）
-            increment_success = await DrawLimiter.increment_paid_draw(guild_id, discord_user_id, MAX_PAID_DRAWS_PER_DAY)
-            if not increment_success:
-                await ctx.send(t("economy.draw.limit_hit", locale=locale, index=i+1))
-                break
-
-            # 扣除积分
-            try:
-                await UserCache.update_points(guild_id, discord_user_id, user_id, -DRAW_COST)
-            except Exception as e:
-                # 扣除积分失败，回滚计数（异步）
-                from src.db.redis_client import redis_client
-                today_str = now_est().date()
-                paid_key = f'draw:paid:{guild_id}:{discord_user_id}:{today_str}'
-                await redis_client.decr(paid_key)
-                await ctx.send(t("economy.draw.deduct_error", locale=locale, index=i+1, error=str(e)))
-                break
-
-        # 获取奖励
-        reward = get_weighted_reward()
-        rewards.append(reward)
-        total_points += reward["points"]
-
-        # 增加奖励积分
-        try:
-            await UserCache.update_points(guild_id, discord_user_id, user_id, reward["points"])
-        except Exception as e:
-            await ctx.send(t("economy.draw.update_error", locale=locale, index=i+1, error=str(e)))
-            break
+    # 采样器依赖NumPy,首次抽奖时才导入,不影响启动耗时
+    from src.utils.reward_sampler import get_reward_sampler
+    rewards = get_reward_sampler().sample(count)
+    total_points = sum(reward["points"] for reward in rewards)
 
     # 更新数据库
     try:
-        if first_draw:
-            # 标记免费抽奖已使用（异步）
-            await DrawLimiter.mark_free_draw_used(guild_id, discord_user_id)
-
-        # 更新数据库记录
-        paid_draws_today = await DrawLimiter.get_paid_draw_count(guild_id, discord_user_id)
-        supabase.table('users').update({
-            'last_draw_date': str(today),
-            'paid_draws_today': paid_draws_today,
-            'last_paid_draw_date': str(today)
-        }).eq('id', user_id).execute()
+        new_points = await UserCache.settle_draw(
+            guild_id, discord_user_id, user_id,
+            count, draw_cost, total_points, today, paid_draws_today
+        )
     except Exception as e:
+        await DrawLimiter.release_draws(guild_id, discord_user_id, reservation)
+        # 结算可能已在数据库提交,删除积分缓存以便下次回源
+        await UserCache.invalidate_points_cache(guild_id, discord_user_id)
         await ctx.send(t("economy.draw.persist_error", locale=locale, error=str(e)))
+        return
+
+    if new_points is None:
+        # 确认期间积分被其他操作消耗,余额已不足
+        await DrawLimiter.release_draws(guild_id, discord_user_id, reservation)
+        await UserCache.invalidate_points_cache(guild_id, discord_user_id)
+        await ctx.send(t("economy.draw.deduct_error", locale=locale, index=1, error=t("economy.draw.insufficient.title", locale=locale)))
+        return
 
     # 显示结果
     if len(rewards) == 1:
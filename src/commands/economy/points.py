@@ -56,9 +56,11 @@ async def giftpoints(ctx, member: discord.Member, amount: int):
             await ctx.send(t("economy.gift.receiver_missing", locale=locale))
             return
 
-        # 执行积分转移
-        await UserCache.update_points(ctx.guild.id, ctx.author.id, sender_internal_id, -amount)
-        await UserCache.update_points(ctx.guild.id, member.id, receiver_internal_id, amount)
+        # 执行积分转移(双方在一次批量更新中结算)
+        await UserCache.apply_deltas([
+            (ctx.guild.id, ctx.author.id, sender_internal_id, -amount),
+            (ctx.guild.id, member.id, receiver_internal_id, amount)
+        ])
 
         # 发送成功消息
         embed = discord.Embed(
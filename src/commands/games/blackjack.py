@@ -4,9 +4,12 @@ import asyncio
 import random
 import datetime
 from src.db.database import get_connection
+from src.db import async_db
 from src.utils.helpers import get_user_internal_id_with_guild_and_discord_id
 from src.utils.i18n import get_guild_locale, t
 from src.utils.cache import UserCache
+from src.utils.leaderboard_cache import BLACKJACK_WIN_RESULTS
+from src.utils.ranking import RankingManager
 
 
 # 定义牌面和花色
@@ -370,7 +373,7 @@ class BlackjackView(discord.ui.View):
         """处理超时：返还积分"""
         try:
             supabase = get_connection()
-            user_internal_id = get_user_internal_id_with_guild_and_discord_id(
+            user_internal_id = await get_user_internal_id_with_guild_and_discord_id(
                 self.guild_id,
                 self.user_id
             )
@@ -468,7 +471,7 @@ class BlackjackView(discord.ui.View):
             await interaction.response.send_message(t("blackjack.messages.cannot_double_down", locale=self.locale), ephemeral=True)
             return
 
-        user_internal_id = get_user_internal_id_with_guild_and_discord_id(
+        user_internal_id = await get_user_internal_id_with_guild_and_discord_id(
             self.guild_id,
             self.user_id
         )
@@ -582,7 +585,7 @@ class BlackjackView(discord.ui.View):
             return
 
         # 扣除额外的下注金额
-        user_internal_id = get_user_internal_id_with_guild_and_discord_id(
+        user_internal_id = await get_user_internal_id_with_guild_and_discord_id(
             self.guild_id,
             self.user_id
         )
@@ -635,7 +638,7 @@ class BlackjackView(discord.ui.View):
             return
 
         # 扣除保险费用
-        user_internal_id = get_user_internal_id_with_guild_and_discord_id(
+        user_internal_id = await get_user_internal_id_with_guild_and_discord_id(
             self.guild_id,
             self.user_id
         )
@@ -697,7 +700,7 @@ class BlackjackView(discord.ui.View):
 
         # 返还一半下注金额
         surrender_return = self.game.bet_amount // 2
-        user_internal_id = get_user_internal_id_with_guild_and_discord_id(
+        user_internal_id = await get_user_internal_id_with_guild_and_discord_id(
             self.guild_id,
             self.user_id
         )
@@ -741,7 +744,7 @@ class BlackjackView(discord.ui.View):
         """
         try:
             supabase = get_connection()
-            user_internal_id = get_user_internal_id_with_guild_and_discord_id(
+            user_internal_id = await get_user_internal_id_with_guild_and_discord_id(
                 self.guild_id,
                 self.user_id
             )
@@ -785,7 +788,9 @@ class BlackjackView(discord.ui.View):
                 "surrendered": self.game.surrendered
             }
 
-            supabase.table('blackjack_games').insert(record_data).execute()
+            await async_db.execute(supabase.table('blackjack_games').insert(record_data))
+            if result_type in BLACKJACK_WIN_RESULTS:
+                await RankingManager.increment_scores(self.guild_id, self.user_id, {'blackjack_wins': 1})
 
         except Exception as e:
             print(f"保存游戏记录失败: {e}")
@@ -827,7 +832,7 @@ class BlackjackView(discord.ui.View):
         already_responded = interaction.response.is_done()
 
         # 计算奖励
-        user_internal_id = get_user_internal_id_with_guild_and_discord_id(
+        user_internal_id = await get_user_internal_id_with_guild_and_discord_id(
             self.guild_id,
             self.user_id
         )
@@ -991,12 +996,12 @@ async def blackjack(interaction: discord.Interaction, bet: str):
     locale = get_guild_locale(interaction.guild.id)
 
     # 获取用户内部ID
-    user_internal_id = get_user_internal_id_with_guild_and_discord_id(interaction.guild.id, interaction.user.id)
+    user_internal_id = await get_user_internal_id_with_guild_and_discord_id(interaction.guild.id, interaction.user.id)
 
     # 如果用户不存在，自动创建
     if not user_internal_id:
         try:
-            create_response = supabase.table('users').insert({
+            create_response = await async_db.execute(supabase.table('users').insert({
                 'guild_id': interaction.guild.id,
                 'discord_user_id': interaction.user.id,
                 'points': 0,
@@ -1005,8 +1010,9 @@ async def blackjack(interaction: discord.Interaction, bet: str):
                 'last_paid_draw_date': '1970-01-01',
                 'equipped_pet_id': None,
                 'last_pet_points_update': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
-            }).execute()
+            }))
             user_internal_id = create_response.data[0]['id']
+            await UserCache.set_user_id(interaction.guild.id, interaction.user.id, user_internal_id)
         except Exception as e:
             print(f"创建用户失败: {e}")
             await interaction.response.send_message(t("blackjack.command.user_info_failed", locale=locale), ephemeral=True)
@@ -1014,7 +1020,7 @@ async def blackjack(interaction: discord.Interaction, bet: str):
 
     # 检查用户积分
     try:
-        user_result = supabase.table('users').select('points').eq('id', user_internal_id).execute()
+        user_result = await async_db.execute(supabase.table('users').select('points').eq('id', user_internal_id))
         if not user_result.data:
             await interaction.response.send_message(t("blackjack.command.user_info_failed", locale=locale), ephemeral=True)
             return
@@ -1146,7 +1152,9 @@ async def blackjack(interaction: discord.Interaction, bet: str):
                 "surrendered": False
             }
 
-            supabase.table('blackjack_games').insert(record_data).execute()
+            await async_db.execute(supabase.table('blackjack_games').insert(record_data))
+            if result_type in BLACKJACK_WIN_RESULTS:
+                await RankingManager.increment_scores(interaction.guild.id, interaction.user.id, {'blackjack_wins': 1})
         except Exception as e:
             print(f"保存开局BlackJack游戏记录失败: {e}")
 
@@ -1173,7 +1181,7 @@ async def blackjack_stats(interaction: discord.Interaction):
     locale = get_guild_locale(interaction.guild.id)
 
     # 获取用户内部ID
-    user_internal_id = get_user_internal_id_with_guild_and_discord_id(
+    user_internal_id = await get_user_internal_id_with_guild_and_discord_id(
         interaction.guild.id,
         interaction.user.id
     )
@@ -1187,10 +1195,11 @@ async def blackjack_stats(interaction: discord.Interaction):
 
     try:
         # 查询该用户的所有游戏记录
-        games_result = supabase.table('blackjack_games') \
-            .select('*') \
-            .eq('user_id', user_internal_id) \
-            .execute()
+        games_result = await async_db.execute(
+            supabase.table('blackjack_games')
+            .select('*')
+            .eq('user_id', user_internal_id)
+        )
 
         if not games_result.data:
             await interaction.response.send_message(
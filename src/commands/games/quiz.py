@@ -3,6 +3,7 @@ import asyncio
 import random
 import datetime
 from src.db.database import get_connection
+from src.db import async_db
 from src.utils.helpers import get_user_internal_id_with_guild_and_discord_id
 from src.utils.cache import UserCache
 from src.utils.i18n import get_guild_locale, t
@@ -17,14 +18,13 @@ async def quizlist(ctx, language: str = "all"):
     try:
         # 根据语言参数筛选
         if language_key == "all":
-            result = supabase.table("quiz_questions").select("category, language").execute()
+            result = await async_db.execute(supabase.table("quiz_questions").select("category, language"))
         elif language_key in valid_languages:
-            result = (
+            result = await async_db.execute(
                 supabase
                 .table("quiz_questions")
                 .select("category, language")
                 .eq("language", language_key)
-                .execute()
             )
         else:
             options = ", ".join(sorted(valid_languages))
@@ -86,11 +86,11 @@ async def quiz(ctx, category, number):
 
     try:
         # 先尝试完全匹配
-        result = supabase.table("quiz_questions").select("question, option_a, option_b, option_c, option_d, answer, category").eq("category", category).execute()
+        result = await async_db.execute(supabase.table("quiz_questions").select("question, option_a, option_b, option_c, option_d, answer, category").eq("category", category))
 
         # 如果没有完全匹配，尝试模糊匹配（category:xxx）
         if not result.data:
-            result = supabase.table("quiz_questions").select("question, option_a, option_b, option_c, option_d, answer, category").like("category", f"{category}:%").execute()
+            result = await async_db.execute(supabase.table("quiz_questions").select("question, option_a, option_b, option_c, option_d, answer, category").like("category", f"{category}:%"))
 
             if result.data:
                 # 获取所有匹配的子类别
@@ -178,11 +178,11 @@ async def quiz(ctx, category, number):
                     supabase = get_connection()
 
                     # 获取用户内部ID
-                    user_internal_id = get_user_internal_id_with_guild_and_discord_id(ctx.guild.id, reply.author.id)
+                    user_internal_id = await get_user_internal_id_with_guild_and_discord_id(ctx.guild.id, reply.author.id)
 
                     # 如果用户不存在，自动创建
                     if not user_internal_id:
-                        create_response = supabase.table('users').insert({
+                        create_response = await async_db.execute(supabase.table('users').insert({
                             'guild_id': ctx.guild.id,
                             'discord_user_id': reply.author.id,
                             'points': 0,
@@ -191,8 +191,9 @@ async def quiz(ctx, category, number):
                             'last_paid_draw_date': '1970-01-01',
                             'equipped_pet_id': None,
                             'last_pet_points_update': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
-                        }).execute()
+                        }))
                         user_internal_id = create_response.data[0]['id']
+                        await UserCache.set_user_id(ctx.guild.id, reply.author.id, user_internal_id)
 
                     # 使用UserCache更新积分（与draw系统保持一致）
                     await UserCache.update_points(ctx.guild.id, reply.author.id, user_internal_id, 20)
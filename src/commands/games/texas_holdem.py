@@ -16,6 +16,7 @@ import discord
 from discord import app_commands
 
 from src.db.database import get_connection
+from src.db import async_db
 from src.utils.cache import UserCache
 from src.utils.helpers import get_user_internal_id_with_guild_and_discord_id
 from src.utils.i18n import get_guild_locale, t
@@ -684,11 +685,11 @@ class TexasHoldemView(discord.ui.View):
             print(f"德州扑克结算失败: {exc}")
 
         try:
-            self._save_game_record(payout, result_key, reason)
+            await self._save_game_record(payout, result_key, reason)
         except Exception as exc:
             print(f"保存德州扑克记录失败: {exc}")
 
-    def _save_game_record(self, payout: int, result_key: str, reason: str) -> None:
+    async def _save_game_record(self, payout: int, result_key: str, reason: str) -> None:
         supabase = get_connection()
         duration = int((datetime.datetime.now(datetime.timezone.utc) - self.game.started_at).total_seconds())
         player_cards = [_format_card(card) for card in self.game.player.hole_cards]
@@ -707,7 +708,7 @@ class TexasHoldemView(discord.ui.View):
             "ended_reason": reason
         }
         try:
-            insert_result = supabase.table("texas_holdem_games").insert(record_data).execute()
+            insert_result = await async_db.execute(supabase.table("texas_holdem_games").insert(record_data))
             game_id = insert_result.data[0]["id"] if insert_result.data else None
 
             # 保存行动日志
@@ -722,7 +723,7 @@ class TexasHoldemView(discord.ui.View):
                         "game_phase": log["game_phase"],
                         "created_at": log["recorded_at"]
                     })
-                supabase.table("texas_players_actions").insert(action_rows).execute()
+                await async_db.execute(supabase.table("texas_players_actions").insert(action_rows))
         except Exception as exc:
             print(f"记录德州扑克失败: {exc}")
 
@@ -888,14 +889,14 @@ async def texas_holdem(
     locale = get_guild_locale(interaction.guild.id)
     difficulty_value = difficulty.value if difficulty else "medium"
 
-    user_internal_id = get_user_internal_id_with_guild_and_discord_id(
+    user_internal_id = await get_user_internal_id_with_guild_and_discord_id(
         interaction.guild.id,
         interaction.user.id
     )
 
     if not user_internal_id:
         try:
-            response = supabase.table('users').insert({
+            response = await async_db.execute(supabase.table('users').insert({
                 'guild_id': interaction.guild.id,
                 'discord_user_id': interaction.user.id,
                 'points': 0,
@@ -904,8 +905,9 @@ async def texas_holdem(
                 'last_paid_draw_date': '1970-01-01',
                 'equipped_pet_id': None,
                 'last_pet_points_update': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
-            }).execute()
+            }))
             user_internal_id = response.data[0]['id']
+            await UserCache.set_user_id(interaction.guild.id, interaction.user.id, user_internal_id)
         except Exception as exc:
             print(f"创建用户失败: {exc}")
             await interaction.response.send_message(
@@ -915,7 +917,7 @@ async def texas_holdem(
             return
 
     try:
-        user_result = supabase.table('users').select('points').eq('id', user_internal_id).execute()
+        user_result = await async_db.execute(supabase.table('users').select('points').eq('id', user_internal_id))
         if not user_result.data:
             await interaction.response.send_message(
                 t("texas_holdem.messages.user_fetch_failed", locale=locale),
@@ -1003,7 +1005,7 @@ async def texas_holdem_stats_command(interaction: discord.Interaction):
     supabase = get_connection()
     locale = get_guild_locale(interaction.guild.id)
 
-    user_internal_id = get_user_internal_id_with_guild_and_discord_id(
+    user_internal_id = await get_user_internal_id_with_guild_and_discord_id(
         interaction.guild.id,
         interaction.user.id
     )
@@ -1016,10 +1018,11 @@ async def texas_holdem_stats_command(interaction: discord.Interaction):
         return
 
     try:
-        games_result = supabase.table("texas_holdem_games") \
-            .select("*") \
-            .eq("user_id", user_internal_id) \
-            .execute()
+        games_result = await async_db.execute(
+            supabase.table("texas_holdem_games")
+            .select("*")
+            .eq("user_id", user_internal_id)
+        )
 
         games = games_result.data or []
         if not games:
@@ -4,11 +4,13 @@ from discord import app_commands
 import random
 import datetime
 from src.db.database import get_connection
+from src.db import async_db
 from src.utils.ui import create_embed
 from src.utils.helpers import get_user_internal_id, get_user_data_sync
 from src.utils.i18n import get_guild_locale, t, get_context_locale, get_localized_pet_name
 from src.utils.draw_limiter import DrawLimiter
 from src.utils.cache import UserCache
+from src.utils.ranking import RankingManager
 
 class EggCommands(commands.Cog):
     def __init__(self, bot):
@@ -36,12 +38,12 @@ class EggCommands(commands.Cog):
 
 
     @staticmethod
-    def get_pet_names(locale=None):
+    async def get_pet_names(locale=None):
         """从数据库获取宠物名称"""
         supabase = get_connection()
 
         try:
-            result = supabase.table("pet_templates").select("id, en_name, cn_name, rarity").execute()
+            result = await async_db.execute(supabase.table("pet_templates").select("id, en_name, cn_name, rarity"))
 
             # 组织数据为字典格式
             pet_names = {}
@@ -59,12 +61,12 @@ class EggCommands(commands.Cog):
             return {}
 
     @staticmethod
-    def get_draw_probabilities():
+    async def get_draw_probabilities():
         """从数据库获取抽蛋概率配置"""
         supabase = get_connection()
 
         try:
-            result = supabase.table("egg_draw_probabilities").select("rarity, probability").execute()
+            result = await async_db.execute(supabase.table("egg_draw_probabilities").select("rarity, probability"))
 
             # 按指定顺序排序
             order = ['SSR', 'SR', 'R', 'C']
@@ -82,12 +84,12 @@ class EggCommands(commands.Cog):
             return []
 
     @staticmethod
-    def get_hatch_probabilities(egg_rarity):
+    async def get_hatch_probabilities(egg_rarity):
         """从数据库获取指定蛋稀有度的孵化概率配置"""
         supabase = get_connection()
 
         try:
-            result = supabase.table("egg_hatch_probabilities").select("pet_rarity, probability").eq("egg_rarity", egg_rarity).execute()
+            result = await async_db.execute(supabase.table("egg_hatch_probabilities").select("pet_rarity, probability").eq("egg_rarity", egg_rarity))
 
             # 按指定顺序排序
             order = ['SSR', 'SR', 'R', 'C']
@@ -157,7 +159,7 @@ async def handle_egg_draw(interaction: discord.Interaction):
     locale = get_guild_locale(interaction.guild.id if interaction.guild else None)
 
     try:
-        user_internal_id = get_user_internal_id(interaction)
+        user_internal_id = await get_user_internal_id(interaction)
         guild_id = interaction.guild.id
         discord_user_id = interaction.user.id
 
@@ -168,7 +170,7 @@ async def handle_egg_draw(interaction: discord.Interaction):
         pity_counter = await DrawLimiter.get_egg_pity_count(guild_id, discord_user_id)
 
         # 获取实际的抽蛋概率
-        draw_probabilities = EggCommands.get_draw_probabilities()
+        draw_probabilities = await EggCommands.get_draw_probabilities()
 
     except Exception as e:
         print(f"抽蛋功能错误: {e}")
@@ -217,12 +219,12 @@ async def handle_egg_hatch(interaction: discord.Interaction):
 
     try:
         # 获取用户ID并验证
-        user_id = get_user_internal_id(interaction)
+        user_id = await get_user_internal_id(interaction)
         if not user_id:
             return
 
         # 首先检查是否已经有蛋在孵化中
-        result = supabase.table("user_eggs").select("id, rarity, hatch_started_at, hatch_completed_at").eq("user_id", user_id).eq("status", "hatching").execute()
+        result = await async_db.execute(supabase.table("user_eggs").select("id, rarity, hatch_started_at, hatch_completed_at").eq("user_id", user_id).eq("status", "hatching"))
 
         incubating_egg = result.data[0] if result.data else None
 
@@ -277,7 +279,7 @@ async def handle_egg_hatch(interaction: discord.Interaction):
 
     try:
         # 查询用户的待孵化蛋
-        result = supabase.table("user_eggs").select("id, rarity, created_at").eq("user_id", user_id).eq("status", "pending").order("rarity", desc=True).order("created_at", desc=True).limit(25).execute()
+        result = await async_db.execute(supabase.table("user_eggs").select("id, rarity, created_at").eq("user_id", user_id).eq("status", "pending").order("rarity", desc=True).order("created_at", desc=True).limit(25))
 
         eggs = result.data
 
@@ -312,19 +314,20 @@ async def handle_egg_claim(interaction: discord.Interaction):
 
     try:
         # 获取用户ID并验证
-        user_id = get_user_internal_id(interaction)
+        user_id = await get_user_internal_id(interaction)
         if not user_id:
             return
 
         # 查询已完成孵化的蛋
         current_time = datetime.datetime.now(datetime.timezone.utc)
 
-        result = supabase.table("user_eggs") \
-        .select("id, rarity, hatch_completed_at") \
-        .eq("user_id", user_id) \
-        .eq("status", "hatching") \
-        .lte("hatch_completed_at", current_time.isoformat()) \
-        .execute()
+        result = await async_db.execute(
+            supabase.table("user_eggs")
+            .select("id, rarity, hatch_completed_at")
+            .eq("user_id", user_id)
+            .eq("status", "hatching")
+            .lte("hatch_completed_at", current_time.isoformat())
+        )
 
 
         ready_eggs = result.data
@@ -334,7 +337,7 @@ async def handle_egg_claim(interaction: discord.Interaction):
             return
 
         # 获取用户的传说蛋保底计数器
-        user_data = supabase.table("users").select("legendary_egg_pity_counter").eq("id", user_id).execute()
+        user_data = await async_db.execute(supabase.table("users").select("legendary_egg_pity_counter").eq("id", user_id))
         legendary_pity_counter = user_data.data[0].get("legendary_egg_pity_counter", 0) if user_data.data else 0
 
     except Exception as e:
@@ -354,7 +357,7 @@ async def handle_egg_claim(interaction: discord.Interaction):
 
     try:
         # 获取宠物名称数据
-        pet_names = EggCommands.get_pet_names(locale)
+        pet_names = await EggCommands.get_pet_names(locale)
 
         for egg in ready_eggs:
             egg_id = egg["id"]
@@ -380,7 +383,7 @@ async def handle_egg_claim(interaction: discord.Interaction):
                 legendary_pity_counter = 0  # 重置计数器
             else:
                 # 正常概率孵化
-                hatch_probabilities = EggCommands.get_hatch_probabilities(rarity)
+                hatch_probabilities = await EggCommands.get_hatch_probabilities(rarity)
 
                 # 使用概率决定宠物稀有度
                 rand = random.random() * 100
@@ -411,11 +414,11 @@ async def handle_egg_claim(interaction: discord.Interaction):
             initial_stars = random.randint(*EggCommands.INITIAL_STARS[pet_rarity])
 
             # 从数据库获取max_stars
-            rarity_config_response = supabase.table('pet_rarity_configs').select('max_stars').eq('rarity', pet_rarity).execute()
+            rarity_config_response = await async_db.execute(supabase.table('pet_rarity_configs').select('max_stars').eq('rarity', pet_rarity))
             max_stars = rarity_config_response.data[0]['max_stars'] if rarity_config_response.data else EggCommands.MAX_STARS[pet_rarity]
 
             # 从pet_templates表获取pet_template_id（需要通过cn_name和en_name查找）
-            pet_template_response = supabase.table('pet_templates').select('id, en_name, cn_name').eq('rarity', pet_rarity).execute()
+            pet_template_response = await async_db.execute(supabase.table('pet_templates').select('id, en_name, cn_name').eq('rarity', pet_rarity))
             pet_template_id = None
             for template in pet_template_response.data:
                 if get_localized_pet_name(template, locale) == pet_name:
@@ -438,17 +441,17 @@ async def handle_egg_claim(interaction: discord.Interaction):
             dislike_flavor = random.choice(remaining_flavors)
 
             # 添加到宠物库存
-            supabase.table("user_pets").insert({
+            await async_db.execute(supabase.table("user_pets").insert({
                 "user_id": user_id,
                 "pet_template_id": pet_template_id,
                 "stars": initial_stars,
                 "favorite_flavor": favorite_flavor,
                 "dislike_flavor": dislike_flavor,
                 "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
-            }).execute()
+            }))
 
             # 更新蛋状态为已领取
-            supabase.table("user_eggs").update({"status": "claimed"}).eq("id", egg_id).execute()
+            await async_db.execute(supabase.table("user_eggs").update({"status": "claimed"}).eq("id", egg_id))
 
             rarity_names = {'C': t("egg.rarity_names.C", locale=locale), 'R': t("egg.rarity_names.R", locale=locale), 'SR': t("egg.rarity_names.SR", locale=locale), 'SSR': t("egg.rarity_names.SSR", locale=locale)}
             rarity_emojis = {'C': '🤍', 'R': '💙', 'SR': '💜', 'SSR': '💛'}
@@ -463,7 +466,13 @@ async def handle_egg_claim(interaction: discord.Interaction):
             })
 
         # 更新数据库中的传说蛋保底计数器
-        supabase.table("users").update({"legendary_egg_pity_counter": legendary_pity_counter}).eq("id", user_id).execute()
+        await async_db.execute(supabase.table("users").update({"legendary_egg_pity_counter": legendary_pity_counter}).eq("id", user_id))
+
+        if claimed_pets:
+            await RankingManager.increment_scores(interaction.guild.id, interaction.user.id, {
+                'pets': len(claimed_pets),
+                'hatched_eggs': len(claimed_pets)
+            })
 
     except Exception as e:
         print(f"领取宠物错误: {e}")
@@ -508,21 +517,21 @@ async def egg_list(interaction: discord.Interaction):
         supabase = get_connection()
 
         # 获取用户ID并验证
-        user_id = get_user_internal_id(interaction)
+        user_id = await get_user_internal_id(interaction)
         if not user_id:
             return
 
         # 查询用户的蛋
-        eggs_response = supabase.table('user_eggs').select('id, rarity, created_at').eq('user_id', user_id).eq('status', 'pending').order('created_at', desc=True).execute()
+        eggs_response = await async_db.execute(supabase.table('user_eggs').select('id, rarity, created_at').eq('user_id', user_id).eq('status', 'pending').order('created_at', desc=True))
         eggs = [(row['id'], row['rarity'], row['created_at']) for row in eggs_response.data]
 
         # 查询孵化中的蛋
-        incubating_response = supabase.table('user_eggs').select('id, rarity, hatch_started_at, hatch_completed_at').eq('user_id', user_id).eq('status', 'hatching').order('hatch_completed_at').execute()
+        incubating_response = await async_db.execute(supabase.table('user_eggs').select('id, rarity, hatch_started_at, hatch_completed_at').eq('user_id', user_id).eq('status', 'hatching').order('hatch_completed_at'))
         incubating = [(row['id'], row['rarity'], row['hatch_started_at'], row['hatch_completed_at']) for row in incubating_response.data]
 
         # 查询可领取的蛋
         current_time = datetime.datetime.now(datetime.timezone.utc)
-        ready_response = supabase.table('user_eggs').select('*', count='exact').eq('user_id', user_id).eq('status', 'hatching').execute()
+        ready_response = await async_db.execute(supabase.table('user_eggs').select('*', count='exact').eq('user_id', user_id).eq('status', 'hatching'))
         ready_count = len([egg for egg in ready_response.data if egg.get('hatch_completed_at') and datetime.datetime.fromisoformat(egg['hatch_completed_at'].replace('Z', '+00:00')) <= current_time])
 
     except Exception as e:
@@ -665,10 +674,11 @@ class EggDrawView(discord.ui.View):
             await UserCache.update_points(guild_id, discord_user_id, user_id, -cost)
 
             # 带保底机制的抽蛋
-            results, new_pity = self.draw_eggs_with_pity(count, current_pity)
+            draw_probabilities = await EggCommands.get_draw_probabilities()
+            results, new_pity = self.draw_eggs_with_pity(count, current_pity, draw_probabilities)
 
             # 更新数据库中的保底计数
-            supabase.table('users').update({'egg_pity_counter': new_pity}).eq('id', user_id).execute()
+            await async_db.execute(supabase.table('users').update({'egg_pity_counter': new_pity}).eq('id', user_id))
 
             # 更新Redis中的保底计数（异步）
             if new_pity == 0:
@@ -692,7 +702,7 @@ class EggDrawView(discord.ui.View):
                 })
 
             if eggs_to_insert:
-                supabase.table('user_eggs').insert(eggs_to_insert).execute()
+                await async_db.execute(supabase.table('user_eggs').insert(eggs_to_insert))
 
         except Exception as e:
             await interaction.edit_original_response(content=t("egg.errors.draw_error", locale=locale, error=str(e)))
@@ -734,20 +744,18 @@ class EggDrawView(discord.ui.View):
         # 然后发送公开的结果消息
         await interaction.followup.send(embed=embed)
 
-    def draw_eggs_with_pity(self, count, current_pity):
+    def draw_eggs_with_pity(self, count, current_pity, draw_probabilities):
         """
         带保底机制的抽蛋系统
 
         Args:
             count: 抽取次数
             current_pity: 当前保底计数
+            draw_probabilities: 抽蛋概率配置 [(rarity, probability), ...]
 
         Returns:
             tuple: (results, new_pity) - 抽取结果列表和新的保底计数
         """
-        # 获取抽蛋概率配置
-        draw_probabilities = EggCommands.get_draw_probabilities()
-
         results = []
         pity = current_pity
 
@@ -852,11 +860,11 @@ class EggSelect(discord.ui.Select):
             start_time = datetime.datetime.now(datetime.timezone.utc)
             end_time = start_time + datetime.timedelta(hours=hatch_hours)
 
-            supabase.table('user_eggs').update({
+            await async_db.execute(supabase.table('user_eggs').update({
                 'status': 'hatching',
                 'hatch_started_at': start_time.isoformat(timespec='seconds'),
                 'hatch_completed_at': end_time.isoformat(timespec='seconds')
-            }).eq('id', egg_id).execute()
+            }).eq('id', egg_id))
 
         except Exception as e:
             await interaction.response.send_message(t("egg.errors.start_hatch_error", locale=self.locale, error=str(e)), ephemeral=True)
@@ -1,6 +1,7 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
+from src.db import async_db
 from src.utils.ui import create_embed
 from src.utils.helpers import get_user_internal_id
 from src.utils.i18n import get_guild_locale, t
@@ -31,13 +32,13 @@ class ForgeCommands(commands.Cog):
         'SSR': '💛'
     }
 
-    def get_user_fragments(self, user_id):
+    async def get_user_fragments(self, user_id):
         """获取用户碎片库存"""
         try:
             from src.db.database import get_supabase_client
             supabase = get_supabase_client()
 
-            response = supabase.table('user_pet_fragments').select('rarity, amount').eq('user_id', user_id).gt('amount', 0).execute()
+            response = await async_db.execute(supabase.table('user_pet_fragments').select('rarity, amount').eq('user_id', user_id).gt('amount', 0))
 
             fragments = {}
             for fragment in response.data:
@@ -255,7 +256,7 @@ async def handle_forge_view(interaction: discord.Interaction):
         locale = get_guild_locale(interaction.guild.id if interaction.guild else None)
 
         # 获取用户内部ID
-        user_internal_id = get_user_internal_id(interaction)
+        user_internal_id = await get_user_internal_id(interaction)
         if not user_internal_id:
             embed = create_embed(t("forge.errors.error_title", locale=locale), t("forge.errors.user_not_registered", locale=locale), discord.Color.red())
             await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -264,7 +265,7 @@ async def handle_forge_view(interaction: discord.Interaction):
         # 获取用户积分
         from src.db.database import get_supabase_client
         supabase = get_supabase_client()
-        user_response = supabase.table('users').select('points').eq('id', user_internal_id).execute()
+        user_response = await async_db.execute(supabase.table('users').select('points').eq('id', user_internal_id))
 
         if not user_response.data:
             embed = create_embed(t("forge.errors.error_title", locale=locale), t("forge.errors.cannot_get_user_data", locale=locale), discord.Color.red())
@@ -275,7 +276,7 @@ async def handle_forge_view(interaction: discord.Interaction):
 
         # 获取用户碎片库存
         forge_commands = ForgeCommands(None)
-        fragments = forge_commands.get_user_fragments(user_internal_id)
+        fragments = await forge_commands.get_user_fragments(user_internal_id)
 
         # 构建显示内容
         description = t("forge.view.user_forge.title", locale=locale, user=interaction.user.mention)
@@ -342,7 +343,7 @@ async def handle_forge_craft(interaction: discord.Interaction, from_rarity: str,
         locale = get_guild_locale(interaction.guild.id if interaction.guild else None)
 
         # 获取用户内部ID
-        user_internal_id = get_user_internal_id(interaction)
+        user_internal_id = await get_user_internal_id(interaction)
         if not user_internal_id:
             embed = create_embed(t("forge.errors.error_title", locale=locale), t("forge.errors.user_not_found_craft", locale=locale), discord.Color.red())
             await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -369,7 +370,7 @@ async def handle_forge_craft(interaction: discord.Interaction, from_rarity: str,
         # 获取用户数据
         from src.db.database import get_supabase_client
         supabase = get_supabase_client()
-        user_response = supabase.table('users').select('points').eq('id', user_internal_id).execute()
+        user_response = await async_db.execute(supabase.table('users').select('points').eq('id', user_internal_id))
 
         if not user_response.data:
             embed = create_embed(t("forge.errors.error_title", locale=locale), t("forge.errors.cannot_get_data_craft", locale=locale), discord.Color.red())
@@ -380,7 +381,7 @@ async def handle_forge_craft(interaction: discord.Interaction, from_rarity: str,
 
         # 获取用户碎片库存
         forge_commands = ForgeCommands(None)
-        fragments = forge_commands.get_user_fragments(user_internal_id)
+        fragments = await forge_commands.get_user_fragments(user_internal_id)
 
         # 计算最大可合成数量
         max_crafts, error_msg = forge_commands.calculate_max_crafts(from_rarity, to_rarity, fragments, user_points, locale)
@@ -401,7 +402,7 @@ async def handle_forge_craft(interaction: discord.Interaction, from_rarity: str,
             return
 
         # 执行合成
-        success, message = forge_commands.execute_forge(user_internal_id, from_rarity, to_rarity, quantity, locale)
+        success, message = await async_db.run_sync(forge_commands.execute_forge, user_internal_id, from_rarity, to_rarity, quantity, locale)
 
         # 清除积分缓存，确保check命令显示最新数据
         if success:
@@ -2,9 +2,11 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import datetime
+from src.db import async_db
 from src.utils.ui import create_embed
 from src.utils.helpers import get_user_internal_id
 from src.utils.cache import UserCache
+from src.utils.ranking import RankingManager
 from src.utils.i18n import get_guild_locale, t, get_context_locale, get_localized_pet_name, get_localized_food_name, get_localized_food_description
 
 class PetCommands(commands.Cog):
@@ -56,20 +58,20 @@ class PetCommands(commands.Cog):
             supabase = get_supabase_client()
 
             # 先查询是否存在
-            existing = supabase.table('user_pet_fragments').select('amount').eq('user_id', player_id).eq('rarity', rarity).execute()
+            existing = await async_db.execute(supabase.table('user_pet_fragments').select('amount').eq('user_id', player_id).eq('rarity', rarity))
 
             if existing.data:
                 # 更新现有记录
                 current_amount = existing.data[0]['amount']
                 new_amount = current_amount + amount
-                supabase.table('user_pet_fragments').update({'amount': new_amount}).eq('user_id', player_id).eq('rarity', rarity).execute()
+                await async_db.execute(supabase.table('user_pet_fragments').update({'amount': new_amount}).eq('user_id', player_id).eq('rarity', rarity))
             else:
                 # 插入新记录
-                supabase.table('user_pet_fragments').insert({
+                await async_db.execute(supabase.table('user_pet_fragments').insert({
                     'user_id': player_id,
                     'rarity': rarity,
                     'amount': amount
-                }).execute()
+                }))
 
         except Exception as e:
             print(f"Error adding fragments async: {str(e)}")
@@ -86,33 +88,33 @@ class PetCommands(commands.Cog):
         multiplier = stars + 1
         return int(adjusted_base_points * multiplier * hours)
     
-    def update_pet_points(self, user_id):
+    async def update_pet_points(self, user_id):
         """更新装备宠物的时间戳（用于积分计算）"""
         try:
             from src.db.database import get_supabase_client
             supabase = get_supabase_client()
             
             # 检查用户是否有装备的宠物
-            user_response = supabase.table('users').select('equipped_pet_id').eq('id', user_id).not_.is_('equipped_pet_id', None).execute()
+            user_response = await async_db.execute(supabase.table('users').select('equipped_pet_id').eq('id', user_id).not_.is_('equipped_pet_id', None))
             
             if not user_response.data:
                 return
             
             # 更新最后更新时间为当前时间
             now = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
-            supabase.table('users').update({'last_pet_points_update': now}).eq('id', user_id).execute()
+            await async_db.execute(supabase.table('users').update({'last_pet_points_update': now}).eq('id', user_id))
             
         except Exception as e:
             print(f"Error updating pet points timestamp: {str(e)}")
 
-    def calculate_pending_points(self, user_id):
+    async def calculate_pending_points(self, user_id):
         """基于时间差计算待领取的宠物积分（最多累积24小时）"""
         try:
             from src.db.database import get_supabase_client
             supabase = get_supabase_client()
             
             # 获取用户装备的宠物信息和上次更新时间
-            user_pet_response = supabase.table('users').select('equipped_pet_id, last_pet_points_update').eq('id', user_id).not_.is_('equipped_pet_id', None).execute()
+            user_pet_response = await async_db.execute(supabase.table('users').select('equipped_pet_id, last_pet_points_update').eq('id', user_id).not_.is_('equipped_pet_id', None))
             
             if not user_pet_response.data:
                 return 0
@@ -122,7 +124,7 @@ class PetCommands(commands.Cog):
             last_update = user_data['last_pet_points_update']
             
             # 获取宠物信息
-            pet_response = supabase.table('user_pets').select('pet_template_id, stars, level').eq('id', equipped_pet_id).execute()
+            pet_response = await async_db.execute(supabase.table('user_pets').select('pet_template_id, stars, level').eq('id', equipped_pet_id))
             
             if not pet_response.data:
                 return 0
@@ -133,7 +135,7 @@ class PetCommands(commands.Cog):
             level = pet_data['level']
             
             # 获取宠物模板信息
-            template_response = supabase.table('pet_templates').select('id, en_name, cn_name, rarity').eq('id', pet_template_id).execute()
+            template_response = await async_db.execute(supabase.table('pet_templates').select('id, en_name, cn_name, rarity').eq('id', pet_template_id))
             if not template_response.data:
                 return 0
             
@@ -182,14 +184,14 @@ class PetSelectView(discord.ui.View):
             supabase = get_supabase_client()
             
             # 查询用户的宠物
-            pets_response = supabase.table('user_pets').select('id, pet_template_id, stars').eq('user_id', self.user_id).limit(25).execute()
+            pets_response = await async_db.execute(supabase.table('user_pets').select('id, pet_template_id, stars').eq('user_id', self.user_id).limit(25))
             
             if not pets_response.data:
                 return False
             
             # 获取所有宠物模板信息
             template_ids = list(set([pet['pet_template_id'] for pet in pets_response.data]))
-            templates_response = supabase.table('pet_templates').select('id, en_name, cn_name, rarity').in_('id', template_ids).execute()
+            templates_response = await async_db.execute(supabase.table('pet_templates').select('id, en_name, cn_name, rarity').in_('id', template_ids))
 
             # 创建模板映射
             template_map = {template['id']: template for template in templates_response.data}
@@ -343,7 +345,7 @@ async def pet(interaction: discord.Interaction, action: str, page: int = 1):
         await handle_batch_dismantle_mode_selection(interaction)
     elif action in ["info", "upgrade", "dismantle", "equip", "feed"]:
         # 获取用户内部ID
-        user_internal_id = get_user_internal_id(interaction)
+        user_internal_id = await get_user_internal_id(interaction)
         if not user_internal_id:
             embed = create_embed(t("pet.errors.user_not_found.title", locale=locale), t("pet.errors.user_not_found.message", locale=locale), discord.Color.red())
             await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -396,14 +398,14 @@ async def handle_pet_list(interaction: discord.Interaction, page: int = 1):
         locale = get_context_locale(interaction)
 
         # 获取用户内部ID
-        user_internal_id = get_user_internal_id(interaction)
+        user_internal_id = await get_user_internal_id(interaction)
         if not user_internal_id:
             embed = create_embed(t("pet.errors.user_not_found.title", locale=locale), t("pet.errors.user_not_found.message", locale=locale), discord.Color.red())
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
         
         # 先获取所有宠物（不分页）
-        all_pets_response = supabase.table('user_pets').select('id, pet_template_id, stars, created_at').eq('user_id', user_internal_id).execute()
+        all_pets_response = await async_db.execute(supabase.table('user_pets').select('id, pet_template_id, stars, created_at').eq('user_id', user_internal_id))
 
         total_pets = len(all_pets_response.data) if all_pets_response.data else 0
 
@@ -418,12 +420,12 @@ async def handle_pet_list(interaction: discord.Interaction, page: int = 1):
 
         # 获取所有相关的宠物模板
         template_ids = list(set([pet['pet_template_id'] for pet in all_pets_response.data]))
-        templates_response = supabase.table('pet_templates').select('id, cn_name, en_name, rarity').in_('id', template_ids).execute()
+        templates_response = await async_db.execute(supabase.table('pet_templates').select('id, cn_name, en_name, rarity').in_('id', template_ids))
         templates_dict = {template['id']: template for template in templates_response.data}
 
         # 获取稀有度配置
         rarities = list(set([template['rarity'] for template in templates_response.data]))
-        rarity_configs_response = supabase.table('pet_rarity_configs').select('rarity, max_stars').in_('rarity', rarities).execute()
+        rarity_configs_response = await async_db.execute(supabase.table('pet_rarity_configs').select('rarity, max_stars').in_('rarity', rarities))
         rarity_configs_dict = {config['rarity']: config for config in rarity_configs_response.data}
 
         # 组合所有宠物数据
@@ -499,14 +501,14 @@ async def handle_pet_info(interaction: discord.Interaction, pet_id: int):
         locale = get_context_locale(interaction)
 
         # 获取用户内部ID
-        user_internal_id = get_user_internal_id(interaction)
+        user_internal_id = await get_user_internal_id(interaction)
         if not user_internal_id:
             embed = create_embed(t("pet.errors.user_not_found.title", locale=locale), t("pet.errors.user_not_found.message", locale=locale), discord.Color.red())
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
         
         # 查询宠物基本信息
-        pet_response = supabase.table('user_pets').select('id, pet_template_id, stars, created_at, level, xp_current, xp_total, satiety, favorite_flavor, dislike_flavor').eq('id', pet_id).eq('user_id', user_internal_id).execute()
+        pet_response = await async_db.execute(supabase.table('user_pets').select('id, pet_template_id, stars, created_at, level, xp_current, xp_total, satiety, favorite_flavor, dislike_flavor').eq('id', pet_id).eq('user_id', user_internal_id))
 
         if not pet_response.data:
             embed = create_embed(
@@ -519,7 +521,7 @@ async def handle_pet_info(interaction: discord.Interaction, pet_id: int):
         pet_data = pet_response.data[0]
         
         # 获取宠物模板信息
-        template_response = supabase.table('pet_templates').select('en_name, cn_name, rarity').eq('id', pet_data['pet_template_id']).execute()
+        template_response = await async_db.execute(supabase.table('pet_templates').select('en_name, cn_name, rarity').eq('id', pet_data['pet_template_id']))
         if not template_response.data:
             embed = create_embed(t("pet.upgrade.errors.template_not_found.title", locale=locale), t("pet.upgrade.errors.template_not_found.description", locale=locale), discord.Color.red())
             await interaction.response.send_message(embed=embed)
@@ -528,7 +530,7 @@ async def handle_pet_info(interaction: discord.Interaction, pet_id: int):
         template_data = template_response.data[0]
         
         # 获取稀有度配置
-        rarity_response = supabase.table('pet_rarity_configs').select('max_stars').eq('rarity', template_data['rarity']).execute()
+        rarity_response = await async_db.execute(supabase.table('pet_rarity_configs').select('max_stars').eq('rarity', template_data['rarity']))
         if not rarity_response.data:
             embed = create_embed(t("pet.upgrade.errors.rarity_config_not_found.title", locale=locale), t("pet.upgrade.errors.rarity_config_not_found.description", locale=locale), discord.Color.red())
             await interaction.response.send_message(embed=embed)
@@ -656,14 +658,14 @@ async def handle_pet_upgrade(interaction: discord.Interaction, pet_id: int):
         supabase = get_supabase_client()
 
         # 获取用户内部ID
-        user_internal_id = get_user_internal_id(interaction)
+        user_internal_id = await get_user_internal_id(interaction)
         if not user_internal_id:
             embed = create_embed(t("pet.errors.user_not_found.title", locale=locale), t("pet.errors.user_not_found.message", locale=locale), discord.Color.red())
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
         
         # 获取宠物信息
-        pet_response = supabase.table('user_pets').select('id, pet_template_id, stars').eq('id', pet_id).eq('user_id', user_internal_id).execute()
+        pet_response = await async_db.execute(supabase.table('user_pets').select('id, pet_template_id, stars').eq('id', pet_id).eq('user_id', user_internal_id))
 
         if not pet_response.data:
             embed = create_embed(
@@ -677,7 +679,7 @@ async def handle_pet_upgrade(interaction: discord.Interaction, pet_id: int):
         pet_data = pet_response.data[0]
         
         # 获取宠物模板信息
-        template_response = supabase.table('pet_templates').select('en_name, cn_name, rarity').eq('id', pet_data['pet_template_id']).execute()
+        template_response = await async_db.execute(supabase.table('pet_templates').select('en_name, cn_name, rarity').eq('id', pet_data['pet_template_id']))
         if not template_response.data:
             embed = create_embed(t("pet.upgrade.errors.template_not_found.title", locale=locale), t("pet.upgrade.errors.template_not_found.description", locale=locale), discord.Color.red())
             await interaction.response.send_message(embed=embed)
@@ -686,7 +688,7 @@ async def handle_pet_upgrade(interaction: discord.Interaction, pet_id: int):
         template_data = template_response.data[0]
         
         # 获取稀有度配置
-        rarity_response = supabase.table('pet_rarity_configs').select('max_stars').eq('rarity', template_data['rarity']).execute()
+        rarity_response = await async_db.execute(supabase.table('pet_rarity_configs').select('max_stars').eq('rarity', template_data['rarity']))
         if not rarity_response.data:
             embed = create_embed(t("pet.upgrade.errors.rarity_config_not_found.title", locale=locale), t("pet.upgrade.errors.rarity_config_not_found.description", locale=locale), discord.Color.red())
             await interaction.response.send_message(embed=embed)
@@ -712,7 +714,7 @@ async def handle_pet_upgrade(interaction: discord.Interaction, pet_id: int):
         required_points = cost['points']
         
         # 检查用户积分
-        user_response = supabase.table('users').select('points').eq('id', user_internal_id).execute()
+        user_response = await async_db.execute(supabase.table('users').select('points').eq('id', user_internal_id))
         if not user_response.data:
             embed = create_embed(
                 t("pet.upgrade.errors.cannot_get_resources.title", locale=locale),
@@ -725,7 +727,7 @@ async def handle_pet_upgrade(interaction: discord.Interaction, pet_id: int):
         points = user_response.data[0]['points']
         
         # 检查用户碎片
-        fragments_response = supabase.table('user_pet_fragments').select('amount').eq('user_id', user_internal_id).eq('rarity', rarity).execute()
+        fragments_response = await async_db.execute(supabase.table('user_pet_fragments').select('amount').eq('user_id', user_internal_id).eq('rarity', rarity))
         fragments = fragments_response.data[0]['amount'] if fragments_response.data else 0
         
         if points < required_points:
@@ -748,7 +750,7 @@ async def handle_pet_upgrade(interaction: discord.Interaction, pet_id: int):
         
         # 执行升星
         # 扣除积分
-        supabase.table('users').update({'points': points - required_points}).eq('id', user_internal_id).execute()
+        await async_db.execute(supabase.table('users').update({'points': points - required_points}).eq('id', user_internal_id))
 
         # 清除积分缓存，确保check命令显示最新数据
         guild_id = interaction.guild.id
@@ -756,10 +758,10 @@ async def handle_pet_upgrade(interaction: discord.Interaction, pet_id: int):
         await UserCache.invalidate_points_cache(guild_id, discord_user_id)
 
         # 扣除碎片
-        supabase.table('user_pet_fragments').update({'amount': fragments - required_fragments}).eq('user_id', user_internal_id).eq('rarity', rarity).execute()
+        await async_db.execute(supabase.table('user_pet_fragments').update({'amount': fragments - required_fragments}).eq('user_id', user_internal_id).eq('rarity', rarity))
         
         # 升星
-        supabase.table('user_pets').update({'stars': stars + 1}).eq('id', pet_id).execute()
+        await async_db.execute(supabase.table('user_pets').update({'stars': stars + 1}).eq('id', pet_id))
         
         new_stars = stars + 1
         star_display = '⭐' * new_stars
@@ -790,7 +792,7 @@ async def handle_pet_dismantle(interaction: discord.Interaction, pet_id: int):
         supabase = get_supabase_client()
         
         # 获取用户内部ID
-        user_internal_id = get_user_internal_id(interaction)
+        user_internal_id = await get_user_internal_id(interaction)
         if not user_internal_id:
             embed = create_embed(t("pet.errors.user_not_found.title", locale=locale), t("pet.errors.user_not_found.message", locale=locale), discord.Color.red())
             await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -799,7 +801,7 @@ async def handle_pet_dismantle(interaction: discord.Interaction, pet_id: int):
         locale = get_guild_locale(interaction.guild.id)
         
         # 检查宠物是否正在装备
-        user_response = supabase.table('users').select('equipped_pet_id').eq('id', user_internal_id).execute()
+        user_response = await async_db.execute(supabase.table('users').select('equipped_pet_id').eq('id', user_internal_id))
         if user_response.data and user_response.data[0]['equipped_pet_id'] == pet_id:
             embed = create_embed(
                 t("pet.errors.cannot_dismantle_equipped.title", locale=locale),
@@ -810,7 +812,7 @@ async def handle_pet_dismantle(interaction: discord.Interaction, pet_id: int):
             return
 
         # 获取宠物信息
-        pet_response = supabase.table('user_pets').select('pet_template_id, stars').eq('id', pet_id).eq('user_id', user_internal_id).execute()
+        pet_response = await async_db.execute(supabase.table('user_pets').select('pet_template_id, stars').eq('id', pet_id).eq('user_id', user_internal_id))
         
         if not pet_response.data:
             embed = create_embed(
@@ -826,7 +828,7 @@ async def handle_pet_dismantle(interaction: discord.Interaction, pet_id: int):
         stars = pet_data['stars']
         
         # 获取宠物模板信息
-        template_response = supabase.table('pet_templates').select('id, cn_name, en_name, rarity').eq('id', pet_template_id).execute()
+        template_response = await async_db.execute(supabase.table('pet_templates').select('id, cn_name, en_name, rarity').eq('id', pet_template_id))
         if not template_response.data:
             embed = create_embed(t("pet.upgrade.errors.template_not_found.title", locale=locale), t("pet.upgrade.errors.template_not_found.description", locale=locale), discord.Color.red())
             await interaction.response.send_message(embed=embed)
@@ -891,14 +893,14 @@ async def handle_pet_fragments(interaction: discord.Interaction):
         supabase = get_supabase_client()
         
         # 获取用户内部ID
-        user_internal_id = get_user_internal_id(interaction)
+        user_internal_id = await get_user_internal_id(interaction)
         if not user_internal_id:
             embed = create_embed(t("pet.errors.user_not_found.title", locale=locale), t("pet.errors.user_not_found.message", locale=locale), discord.Color.red())
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
         
         # 查询碎片库存
-        response = supabase.table('user_pet_fragments').select('rarity, amount').eq('user_id', user_internal_id).gt('amount', 0).execute()
+        response = await async_db.execute(supabase.table('user_pet_fragments').select('rarity, amount').eq('user_id', user_internal_id).gt('amount', 0))
         
         fragments = response.data
         
@@ -996,7 +998,9 @@ class DismantleConfirmView(discord.ui.View):
             supabase = get_supabase_client()
             
             # 删除宠物
-            delete_response = supabase.table('user_pets').delete().eq('id', self.pet_id).eq('user_id', self.user_internal_id).execute()
+            delete_response = await async_db.execute(supabase.table('user_pets').delete().eq('id', self.pet_id).eq('user_id', self.user_internal_id))
+            if delete_response.data:
+                await RankingManager.increment_scores(interaction.guild.id, interaction.user.id, {'pets': -1})
             
             if not delete_response.data:
                 embed = create_embed(
@@ -1008,20 +1012,20 @@ class DismantleConfirmView(discord.ui.View):
                 return
             
             # 检查是否已有该稀有度的碎片记录
-            fragment_response = supabase.table('user_pet_fragments').select('amount').eq('user_id', self.user_internal_id).eq('rarity', self.rarity).execute()
+            fragment_response = await async_db.execute(supabase.table('user_pet_fragments').select('amount').eq('user_id', self.user_internal_id).eq('rarity', self.rarity))
             
             if fragment_response.data:
                 # 更新现有碎片数量
                 current_amount = fragment_response.data[0]['amount']
                 new_amount = current_amount + self.fragments
-                supabase.table('user_pet_fragments').update({'amount': new_amount}).eq('user_id', self.user_internal_id).eq('rarity', self.rarity).execute()
+                await async_db.execute(supabase.table('user_pet_fragments').update({'amount': new_amount}).eq('user_id', self.user_internal_id).eq('rarity', self.rarity))
             else:
                 # 插入新的碎片记录
-                supabase.table('user_pet_fragments').insert({
+                await async_db.execute(supabase.table('user_pet_fragments').insert({
                     'user_id': self.user_internal_id,
                     'rarity': self.rarity,
                     'amount': self.fragments
-                }).execute()
+                }))
             
             # 添加积分（使用 UserCache 保证缓存一致性）
             if self.points > 0:
@@ -1074,14 +1078,14 @@ async def handle_pet_equip(interaction: discord.Interaction, pet_id: int):
         supabase = get_supabase_client()
         
         # 获取用户内部ID
-        user_internal_id = get_user_internal_id(interaction)
+        user_internal_id = await get_user_internal_id(interaction)
         if not user_internal_id:
             embed = create_embed(t("pet.errors.user_not_found.title", locale=locale), t("pet.errors.user_not_found.message", locale=locale), discord.Color.red())
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
         
         # 检查宠物是否存在且属于用户
-        pet_response = supabase.table('user_pets').select('pet_template_id, stars, level').eq('id', pet_id).eq('user_id', user_internal_id).execute()
+        pet_response = await async_db.execute(supabase.table('user_pets').select('pet_template_id, stars, level').eq('id', pet_id).eq('user_id', user_internal_id))
         
         if not pet_response.data:
             embed = create_embed(
@@ -1098,7 +1102,7 @@ async def handle_pet_equip(interaction: discord.Interaction, pet_id: int):
         level = pet_data['level']
 
         # 获取宠物模板信息
-        template_response = supabase.table('pet_templates').select('id, cn_name, en_name, rarity').eq('id', pet_template_id).execute()
+        template_response = await async_db.execute(supabase.table('pet_templates').select('id, cn_name, en_name, rarity').eq('id', pet_template_id))
         if not template_response.data:
             embed = create_embed(t("pet.upgrade.errors.template_not_found.title", locale=locale), t("pet.upgrade.errors.template_not_found.description", locale=locale), discord.Color.red())
             await interaction.response.send_message(embed=embed)
@@ -1109,7 +1113,7 @@ async def handle_pet_equip(interaction: discord.Interaction, pet_id: int):
         rarity = template_data['rarity']
 
         # 检查是否已经装备了这只宠物
-        equipped_response = supabase.table('users').select('equipped_pet_id').eq('id', user_internal_id).execute()
+        equipped_response = await async_db.execute(supabase.table('users').select('equipped_pet_id').eq('id', user_internal_id))
         
         current_equipped_id = None
         if equipped_response.data:
@@ -1138,7 +1142,7 @@ async def handle_pet_equip(interaction: discord.Interaction, pet_id: int):
     
     # 检查是否有待领取的积分
     pet_commands = PetCommands(None)
-    pending_points = pet_commands.calculate_pending_points(user_internal_id)
+    pending_points = await pet_commands.calculate_pending_points(user_internal_id)
     if pending_points > 0:
         embed = create_embed(
             t("pet.equip.claim_pending_points.title", locale=locale),
@@ -1151,19 +1155,19 @@ async def handle_pet_equip(interaction: discord.Interaction, pet_id: int):
     # 如果有其他宠物装备，先更新积分累积
     if current_equipped_id:
         pet_commands = PetCommands(None)
-        pet_commands.update_pet_points(user_internal_id)
+        await pet_commands.update_pet_points(user_internal_id)
     
     # 装备新宠物
     now = datetime.datetime.now(datetime.timezone.utc)
-    supabase.table('users').update({
+    await async_db.execute(supabase.table('users').update({
         'equipped_pet_id': pet_id,
         'last_pet_points_update': now.isoformat(timespec='seconds')
-    }).eq('id', user_internal_id).execute()
+    }).eq('id', user_internal_id))
     
     # 计算每小时积分和待领取积分
     pet_commands = PetCommands(None)
     hourly_points = pet_commands.calculate_pet_points(rarity, stars, 1, level)
-    pending_points = pet_commands.calculate_pending_points(user_internal_id)
+    pending_points = await pet_commands.calculate_pending_points(user_internal_id)
     
     star_display = '⭐' * stars if stars > 0 else '⚪'
     rarity_colors = {'C': '🤍', 'R': '💙', 'SR': '💜', 'SSR': '💛'}
@@ -1184,14 +1188,14 @@ async def handle_pet_unequip(interaction: discord.Interaction):
         supabase = get_supabase_client()
         
         # 获取用户内部ID
-        user_internal_id = get_user_internal_id(interaction)
+        user_internal_id = await get_user_internal_id(interaction)
         if not user_internal_id:
             embed = create_embed(t("pet.errors.user_not_found.title", locale=locale), t("pet.errors.user_not_found.message", locale=locale), discord.Color.red())
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
         
         # 查询用户装备的宠物
-        user_response = supabase.table('users').select('equipped_pet_id').eq('id', user_internal_id).execute()
+        user_response = await async_db.execute(supabase.table('users').select('equipped_pet_id').eq('id', user_internal_id))
         if not user_response.data:
             embed = create_embed(t("pet.errors.user_not_found.title", locale=locale), t("pet.unequip.user_data_error", locale=locale), discord.Color.red())
             await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -1209,7 +1213,7 @@ async def handle_pet_unequip(interaction: discord.Interaction):
             return
         
         # 获取装备宠物的详细信息
-        pet_response = supabase.table('user_pets').select('stars, pet_templates(cn_name, en_name, rarity)').eq('id', equipped_pet_id).execute()
+        pet_response = await async_db.execute(supabase.table('user_pets').select('stars, pet_templates(cn_name, en_name, rarity)').eq('id', equipped_pet_id))
         
         if not pet_response.data:
             embed = create_embed(
@@ -1240,7 +1244,7 @@ async def handle_pet_unequip(interaction: discord.Interaction):
     
     # 检查是否有待领取的积分
     pet_commands = PetCommands(None)
-    pending_points = pet_commands.calculate_pending_points(user_internal_id)
+    pending_points = await pet_commands.calculate_pending_points(user_internal_id)
     if pending_points > 0:
         embed = create_embed(
             t("pet.unequip.claim_pending_points.title", locale=locale),
@@ -1252,13 +1256,13 @@ async def handle_pet_unequip(interaction: discord.Interaction):
     
     # 更新积分累积
     pet_commands = PetCommands(None)
-    pet_commands.update_pet_points(user_internal_id)
+    await pet_commands.update_pet_points(user_internal_id)
     
     # 卸下宠物
-    supabase.table('users').update({
+    await async_db.execute(supabase.table('users').update({
         'equipped_pet_id': None,
         'last_pet_points_update': None
-    }).eq('id', user_internal_id).execute()
+    }).eq('id', user_internal_id))
     
     embed = create_embed(
         t("pet.unequip.success.title", locale=locale),
@@ -1275,14 +1279,14 @@ async def handle_pet_status(interaction: discord.Interaction):
         supabase = get_supabase_client()
         
         # 获取用户内部ID
-        user_internal_id = get_user_internal_id(interaction)
+        user_internal_id = await get_user_internal_id(interaction)
         if user_internal_id is None:
             embed = create_embed(t("pet.errors.user_not_found.title", locale=locale), t("pet.errors.user_not_found.message", locale=locale), discord.Color.red())
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
         
         # 查询用户信息
-        user_response = supabase.table('users').select('equipped_pet_id, points').eq('id', user_internal_id).execute()
+        user_response = await async_db.execute(supabase.table('users').select('equipped_pet_id, points').eq('id', user_internal_id))
         if not user_response.data:
             embed = create_embed(t("pet.errors.user_not_found.title", locale=locale), t("pet.status.user_data_error", locale=locale), discord.Color.red())
             await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -1302,7 +1306,7 @@ async def handle_pet_status(interaction: discord.Interaction):
             return
         
         # 获取宠物详细信息
-        pet_response = supabase.table('user_pets').select('pet_template_id, stars, level').eq('id', equipped_pet_id).execute()
+        pet_response = await async_db.execute(supabase.table('user_pets').select('pet_template_id, stars, level').eq('id', equipped_pet_id))
         
         if not pet_response.data:
             embed = create_embed(
@@ -1319,7 +1323,7 @@ async def handle_pet_status(interaction: discord.Interaction):
         level = pet_data['level']
 
         # 获取宠物模板信息
-        template_response = supabase.table('pet_templates').select('id, cn_name, en_name, rarity').eq('id', pet_template_id).execute()
+        template_response = await async_db.execute(supabase.table('pet_templates').select('id, cn_name, en_name, rarity').eq('id', pet_template_id))
         if not template_response.data:
             embed = create_embed(t("pet.upgrade.errors.template_not_found.title", locale=locale), t("pet.upgrade.errors.template_not_found.description", locale=locale), discord.Color.red())
             await interaction.response.send_message(embed=embed)
@@ -1332,7 +1336,7 @@ async def handle_pet_status(interaction: discord.Interaction):
         # 计算每小时积分和待领取积分
         pet_commands = PetCommands(None)
         hourly_points = pet_commands.calculate_pet_points(rarity, stars, 1, level)
-        pending_points = pet_commands.calculate_pending_points(user_internal_id)
+        pending_points = await pet_commands.calculate_pending_points(user_internal_id)
         
         star_display = '⭐' * stars if stars > 0 else '⚪'
         rarity_colors = {'C': '🤍', 'R': '💙', 'SR': '💜', 'SSR': '💛'}
@@ -1363,14 +1367,14 @@ async def handle_pet_claim_points(interaction: discord.Interaction):
         
         # 获取用户内部ID
         locale = get_guild_locale(interaction.guild.id)
-        user_internal_id = get_user_internal_id(interaction)
+        user_internal_id = await get_user_internal_id(interaction)
         if user_internal_id is None:
             embed = create_embed(t("pet.errors.user_not_found.title", locale=locale), t("pet.errors.user_not_found.message", locale=locale), discord.Color.red())
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
         
         # 查询用户信息
-        user_response = supabase.table('users').select('equipped_pet_id, points').eq('id', user_internal_id).execute()
+        user_response = await async_db.execute(supabase.table('users').select('equipped_pet_id, points').eq('id', user_internal_id))
         if not user_response.data:
             embed = create_embed(t("pet.errors.user_not_found.title", locale=locale), t("pet.claim.user_data_error", locale=locale), discord.Color.red())
             await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -1386,14 +1390,14 @@ async def handle_pet_claim_points(interaction: discord.Interaction):
         stars = None
         
         if equipped_pet_id:
-            pet_response = supabase.table('user_pets').select('pet_template_id, stars').eq('id', equipped_pet_id).execute()
+            pet_response = await async_db.execute(supabase.table('user_pets').select('pet_template_id, stars').eq('id', equipped_pet_id))
             if pet_response.data:
                 pet_data = pet_response.data[0]
                 pet_template_id = pet_data['pet_template_id']
                 stars = pet_data['stars']
                 
                 # 获取宠物模板信息
-                template_response = supabase.table('pet_templates').select('*').eq('id', pet_template_id).execute()
+                template_response = await async_db.execute(supabase.table('pet_templates').select('*').eq('id', pet_template_id))
                 if template_response.data:
                     template_data = template_response.data[0]
                     pet_name = get_localized_pet_name(template_data, get_context_locale(interaction))
@@ -1401,7 +1405,7 @@ async def handle_pet_claim_points(interaction: discord.Interaction):
     
         # 使用新方法计算待领取积分
         pet_commands = PetCommands(None)
-        pending_points = pet_commands.calculate_pending_points(user_internal_id)
+        pending_points = await pet_commands.calculate_pending_points(user_internal_id)
         
         if not equipped_pet_id:
             embed = create_embed(
@@ -1429,10 +1433,10 @@ async def handle_pet_claim_points(interaction: discord.Interaction):
         new_total_points = current_points + pending_points
         now = datetime.datetime.now(datetime.timezone.utc)
 
-        supabase.table('users').update({
+        await async_db.execute(supabase.table('users').update({
             'points': new_total_points,
             'last_pet_points_update': now.isoformat(timespec='seconds')
-        }).eq('id', user_internal_id).execute()
+        }).eq('id', user_internal_id))
 
         # 清除积分缓存，确保check命令显示最新数据
         guild_id = interaction.guild.id
@@ -1468,7 +1472,7 @@ async def handle_pet_feed(interaction: discord.Interaction, pet_id: int):
     from src.utils.helpers import get_user_internal_id
 
     # 获取用户内部ID
-    user_internal_id = get_user_internal_id(interaction)
+    user_internal_id = await get_user_internal_id(interaction)
     if not user_internal_id:
         embed = create_embed(t("pet.errors.user_not_found.title", locale=locale), t("pet.errors.user_not_found.message", locale=locale), discord.Color.red())
         await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -1478,7 +1482,7 @@ async def handle_pet_feed(interaction: discord.Interaction, pet_id: int):
     locale = get_guild_locale(interaction.guild.id)
     
     # 获取宠物喂食信息
-    pet_info = get_pet_feeding_info(pet_id, locale)
+    pet_info = await async_db.run_sync(get_pet_feeding_info, pet_id, locale)
     if not pet_info:
         embed = create_embed(t("pet.errors.user_not_found.title", locale=locale), t("pet.errors.pet_not_found_or_unauthorized_feed", locale=locale), discord.Color.red())
         await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -1491,13 +1495,15 @@ async def handle_pet_feed(interaction: discord.Interaction, pet_id: int):
         return
 
     # 显示宠物喂食界面
-    view = PetFeedingView(user_internal_id, pet_id, pet_info, interaction.guild.id if interaction.guild else None)
+    guild_id = interaction.guild.id if interaction.guild else None
+    food_options = await FoodSelectForFeeding.load_food_options(user_internal_id, guild_id)
+    view = PetFeedingView(user_internal_id, pet_id, pet_info, food_options, guild_id)
     embed = view.create_feeding_embed()
 
     await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
 class PetFeedingView(discord.ui.View):
-    def __init__(self, user_id: int, pet_id: int, pet_info: dict, guild_id: int = None):
+    def __init__(self, user_id: int, pet_id: int, pet_info: dict, food_options: list, guild_id: int = None):
         super().__init__(timeout=300)
         self.user_id = user_id
         self.pet_id = pet_id
@@ -1505,7 +1511,7 @@ class PetFeedingView(discord.ui.View):
         self.guild_id = guild_id
 
         # 添加食粮选择下拉菜单
-        self.add_item(FoodSelectForFeeding(user_id, pet_id, guild_id))
+        self.add_item(FoodSelectForFeeding(user_id, pet_id, food_options, guild_id))
 
     def create_feeding_embed(self) -> discord.Embed:
         """创建喂食界面embed"""
@@ -1573,32 +1579,31 @@ class PetFeedingView(discord.ui.View):
         return embed
 
 class FoodSelectForFeeding(discord.ui.Select):
-    def __init__(self, user_id: int, pet_id: int, guild_id: int = None):
+    def __init__(self, user_id: int, pet_id: int, options: list, guild_id: int = None):
         self.user_id = user_id
         self.pet_id = pet_id
         self.guild_id = guild_id
 
-        options = self._load_food_options()
-
         locale = get_guild_locale(guild_id)
         super().__init__(
             placeholder=t("pet.feed.select_food.placeholder", locale=locale),
             options=options
         )
 
-    def _load_food_options(self) -> list:
-        """加载用户的食粮选项"""
+    @staticmethod
+    async def load_food_options(user_id: int, guild_id: int = None) -> list:
+        """加载用户的食粮选项（需在构造下拉菜单前异步获取）"""
         from src.db.database import get_supabase_client
 
         supabase = get_supabase_client()
 
         # 查询用户食粮库存
-        response = supabase.table('user_food_inventory').select('''
+        response = await async_db.execute(supabase.table('user_food_inventory').select('''
             quantity,
             food_templates(*)
-        ''').eq('user_id', self.user_id).gt('quantity', 0).execute()
+        ''').eq('user_id', user_id).gt('quantity', 0))
 
-        locale = get_guild_locale(self.guild_id)
+        locale = get_guild_locale(guild_id)
         if not response.data:
             return [discord.SelectOption(
                 label=t("pet.feed.no_food_stock", locale=locale),
@@ -1667,14 +1672,14 @@ async def execute_feeding(interaction: discord.Interaction, user_id: int, pet_id
 
     try:
         # 检查食粮库存
-        inventory_response = supabase.table('user_food_inventory').select('quantity').eq('user_id', user_id).eq('food_template_id', food_template_id).execute()
+        inventory_response = await async_db.execute(supabase.table('user_food_inventory').select('quantity').eq('user_id', user_id).eq('food_template_id', food_template_id))
 
         if not inventory_response.data or inventory_response.data[0]['quantity'] <= 0:
             await interaction.response.send_message(t("pet.feed.insufficient_food_stock", locale=locale), ephemeral=True)
             return
 
         # 执行喂食
-        result = feed_pet(pet_id, food_template_id, locale)
+        result = await async_db.run_sync(feed_pet, pet_id, food_template_id, locale)
 
         if not result['success']:
             embed = create_embed(t("pet.feed.failure.title", locale=locale), result['message'], discord.Color.red())
@@ -1686,9 +1691,9 @@ async def execute_feeding(interaction: discord.Interaction, user_id: int, pet_id
         new_quantity = current_quantity - 1
 
         if new_quantity > 0:
-            supabase.table('user_food_inventory').update({'quantity': new_quantity}).eq('user_id', user_id).eq('food_template_id', food_template_id).execute()
+            await async_db.execute(supabase.table('user_food_inventory').update({'quantity': new_quantity}).eq('user_id', user_id).eq('food_template_id', food_template_id))
         else:
-            supabase.table('user_food_inventory').delete().eq('user_id', user_id).eq('food_template_id', food_template_id).execute()
+            await async_db.execute(supabase.table('user_food_inventory').delete().eq('user_id', user_id).eq('food_template_id', food_template_id))
 
         # 创建成功消息
         locale = get_guild_locale(interaction.guild.id)
@@ -1742,7 +1747,7 @@ async def pet_autocomplete(interaction: discord.Interaction, current: str) -> li
         from src.utils.helpers import get_user_internal_id
         from src.db.database import get_supabase_client
 
-        user_internal_id = get_user_internal_id(interaction)
+        user_internal_id = await get_user_internal_id(interaction)
         if not user_internal_id:
             return []
 
@@ -1750,14 +1755,14 @@ async def pet_autocomplete(interaction: discord.Interaction, current: str) -> li
         supabase = get_supabase_client()
 
         # 查询用户的宠物
-        pets_response = supabase.table('user_pets').select('id, pet_template_id, stars').eq('user_id', user_internal_id).order('stars', desc=True).limit(25).execute()
+        pets_response = await async_db.execute(supabase.table('user_pets').select('id, pet_template_id, stars').eq('user_id', user_internal_id).order('stars', desc=True).limit(25))
 
         if not pets_response.data:
             return []
 
         # 获取宠物模板信息
         template_ids = list(set([pet['pet_template_id'] for pet in pets_response.data]))
-        templates_response = supabase.table('pet_templates').select('id, cn_name, en_name, rarity').in_('id', template_ids).execute()
+        templates_response = await async_db.execute(supabase.table('pet_templates').select('id, cn_name, en_name, rarity').in_('id', template_ids))
 
         # 创建模板映射
         template_map = {template['id']: template for template in templates_response.data}
@@ -1863,7 +1868,7 @@ async def handle_auto_feeding(interaction: discord.Interaction, mode: str, quant
         locale = get_guild_locale(interaction.guild.id)
 
         # 获取用户内部ID
-        user_internal_id = get_user_internal_id(interaction)
+        user_internal_id = await get_user_internal_id(interaction)
         if not user_internal_id:
             embed = create_embed(t("pet.errors.user_not_found.title", locale=locale), t("pet.errors.user_not_found.message", locale=locale), discord.Color.red())
             await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -1875,7 +1880,7 @@ async def handle_auto_feeding(interaction: discord.Interaction, mode: str, quant
 
         if pet_id:
             # 验证指定的宠物是否属于用户
-            pet_response = supabase.table('user_pets').select('id').eq('id', int(pet_id)).eq('user_id', user_internal_id).execute()
+            pet_response = await async_db.execute(supabase.table('user_pets').select('id').eq('id', int(pet_id)).eq('user_id', user_internal_id))
             if not pet_response.data:
                 embed = create_embed(
                     t("pet.auto_feed.errors.pet_not_exist_title", locale=locale),
@@ -1887,7 +1892,7 @@ async def handle_auto_feeding(interaction: discord.Interaction, mode: str, quant
             target_pet_id = int(pet_id)
         else:
             # 获取装备的宠物
-            user_response = supabase.table('users').select('equipped_pet_id').eq('id', user_internal_id).execute()
+            user_response = await async_db.execute(supabase.table('users').select('equipped_pet_id').eq('id', user_internal_id))
 
             if not user_response.data or not user_response.data[0]['equipped_pet_id']:
                 embed = create_embed(
@@ -1904,7 +1909,7 @@ async def handle_auto_feeding(interaction: discord.Interaction, mode: str, quant
         await interaction.response.send_message(t("pet.feed.preparing_food", locale=locale), ephemeral=False)
 
         # 执行一键喂食
-        result = AutoFeedingSystem.auto_feed_pet(user_internal_id, target_pet_id, mode, quantity, locale)
+        result = await async_db.run_sync(AutoFeedingSystem.auto_feed_pet, user_internal_id, target_pet_id, mode, quantity, locale)
 
         if not result['success']:
             embed = create_embed(t("pet.feed.failure.title", locale=locale), result['message'], discord.Color.red())
@@ -1994,7 +1999,7 @@ async def handle_batch_dismantle_selection(interaction: discord.Interaction, pet
         supabase = get_supabase_client()
 
         # 获取用户内部ID
-        user_internal_id = get_user_internal_id(interaction)
+        user_internal_id = await get_user_internal_id(interaction)
         if not user_internal_id:
             embed = create_embed(
                 t("pet.errors.user_not_found.title", locale=get_guild_locale(interaction.guild.id)),
@@ -2017,11 +2022,11 @@ async def handle_batch_dismantle_selection(interaction: discord.Interaction, pet
             return
 
         # 获取装备的宠物ID，防止分解装备的宠物
-        user_response = supabase.table('users').select('equipped_pet_id').eq('id', user_internal_id).execute()
+        user_response = await async_db.execute(supabase.table('users').select('equipped_pet_id').eq('id', user_internal_id))
         equipped_pet_id = user_response.data[0]['equipped_pet_id'] if user_response.data else None
 
         # 获取选中宠物的详细信息
-        pets_response = supabase.table('user_pets').select('id, pet_template_id, stars').eq('user_id', user_internal_id).in_('id', pet_ids).execute()
+        pets_response = await async_db.execute(supabase.table('user_pets').select('id, pet_template_id, stars').eq('user_id', user_internal_id).in_('id', pet_ids))
 
         if not pets_response.data or len(pets_response.data) != len(pet_ids):
             embed = create_embed(
@@ -2062,7 +2067,7 @@ async def handle_batch_dismantle_selection(interaction: discord.Interaction, pet
 
         # 获取宠物模板信息
         template_ids = list(set([pet['pet_template_id'] for pet in valid_pets]))
-        templates_response = supabase.table('pet_templates').select('id, cn_name, en_name, rarity').in_('id', template_ids).execute()
+        templates_response = await async_db.execute(supabase.table('pet_templates').select('id, cn_name, en_name, rarity').in_('id', template_ids))
 
         template_map = {template['id']: template for template in templates_response.data}
 
@@ -2246,7 +2251,7 @@ class BatchDismantleConfirmView(discord.ui.View):
             total_fragments_by_rarity = {'C': 0, 'R': 0, 'SR': 0, 'SSR': 0}
 
             # 验证所有宠物仍然可以被分解（防止并发操作）
-            user_response = supabase.table('users').select('equipped_pet_id').eq('id', self.user_internal_id).execute()
+            user_response = await async_db.execute(supabase.table('users').select('equipped_pet_id').eq('id', self.user_internal_id))
             current_equipped_pet_id = user_response.data[0]['equipped_pet_id'] if user_response.data else None
 
             for pet in self.pet_details:
@@ -2256,7 +2261,7 @@ class BatchDismantleConfirmView(discord.ui.View):
 
                 try:
                     # 删除宠物记录
-                    supabase.table('user_pets').delete().eq('id', pet['id']).eq('user_id', self.user_internal_id).execute()
+                    await async_db.execute(supabase.table('user_pets').delete().eq('id', pet['id']).eq('user_id', self.user_internal_id))
 
                     # 异步添加碎片
                     await pet_commands.add_fragments_async(self.user_internal_id, pet['rarity'], pet['fragments'])
@@ -2280,6 +2285,9 @@ class BatchDismantleConfirmView(discord.ui.View):
                     total_points_earned
                 )
 
+            if dismantled_pets:
+                await RankingManager.increment_scores(interaction.guild.id, interaction.user.id, {'pets': -len(dismantled_pets)})
+
             # 如果所有操作都失败了
             if not dismantled_pets:
                 embed = create_embed(
@@ -2398,7 +2406,7 @@ async def handle_batch_dismantle_mode_selection(interaction: discord.Interaction
     """处理批量分解模式选择"""
     try:
         # 获取用户内部ID
-        user_internal_id = get_user_internal_id(interaction)
+        user_internal_id = await get_user_internal_id(interaction)
         if not user_internal_id:
             embed = create_embed(
                 t("pet.errors.user_not_found.title", locale=get_context_locale(interaction)),
@@ -2707,11 +2715,11 @@ class BatchDismantleAutoView(discord.ui.View):
             query = supabase.table('user_pets').select('id, pet_template_id, stars').eq('user_id', self.user_internal_id)
 
             # 获取装备的宠物ID
-            user_response = supabase.table('users').select('equipped_pet_id').eq('id', self.user_internal_id).execute()
+            user_response = await async_db.execute(supabase.table('users').select('equipped_pet_id').eq('id', self.user_internal_id))
             equipped_pet_id = user_response.data[0]['equipped_pet_id'] if user_response.data else None
 
             # 获取所有用户宠物
-            pets_response = query.execute()
+            pets_response = await async_db.execute(query)
 
             if not pets_response.data:
                 embed = create_embed(
@@ -2726,7 +2734,7 @@ class BatchDismantleAutoView(discord.ui.View):
             pet_ids = [pet['id'] for pet in pets_response.data]
             template_ids = [pet['pet_template_id'] for pet in pets_response.data]
 
-            templates_response = supabase.table('pet_templates').select('id, cn_name, en_name, rarity').in_('id', template_ids).execute()
+            templates_response = await async_db.execute(supabase.table('pet_templates').select('id, cn_name, en_name, rarity').in_('id', template_ids))
             template_map = {template['id']: template for template in templates_response.data}
 
             # 应用筛选条件
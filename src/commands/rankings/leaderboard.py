@@ -1,56 +1,25 @@
 import discord
 from discord import File, app_commands
-from io import BytesIO
-from PIL import Image, ImageDraw, ImageFont
+import asyncio
 import os
-import json
-from src.utils.ranking import RankingManager
-from src.db.database import get_connection
-from src.utils.i18n import get_default_locale, get_guild_locale, get_all_localizations, t
-
-def create_circle_avatar(avatar_img, size=80):
-    """将头像裁剪为圆形"""
-    mask = Image.new('L', (size, size), 0)
-    draw = ImageDraw.Draw(mask)
-    draw.ellipse((0, 0, size, size), fill=255)
-
-    avatar_circle = Image.new('RGBA', (size, size), (0, 0, 0, 0))
-    avatar_circle.paste(avatar_img, (0, 0))
-    avatar_circle.putalpha(mask)
-
-    return avatar_circle
-
-def create_gradient_background(width, height):
-    """创建渐变背景"""
-    base = Image.new('RGB', (width, height), '#1a1a2e')
-    overlay = Image.new('RGB', (width, height), '#16213e')
-
-    # 创建渐变效果
-    for y in range(height):
-        alpha = int(255 * (y / height))
-        for x in range(width):
-            r1, g1, b1 = base.getpixel((x, 0))
-            r2, g2, b2 = overlay.getpixel((x, 0))
-            r = int(r1 + (r2 - r1) * alpha / 255)
-            g = int(g1 + (g2 - g1) * alpha / 255)
-            b = int(b1 + (b2 - b1) * alpha / 255)
-            base.putpixel((x, y), (r, g, b))
-
-    return base
-
-def draw_rounded_rectangle(draw, xy, radius, fill, outline=None, width=1):
-    """绘制圆角矩形"""
-    x1, y1, x2, y2 = xy
-
-    # 绘制圆角
-    draw.pieslice([x1, y1, x1 + radius * 2, y1 + radius * 2], 180, 270, fill=fill, outline=outline, width=width)
-    draw.pieslice([x2 - radius * 2, y1, x2, y1 + radius * 2], 270, 360, fill=fill, outline=outline, width=width)
-    draw.pieslice([x1, y2 - radius * 2, x1 + radius * 2, y2], 90, 180, fill=fill, outline=outline, width=width)
-    draw.pieslice([x2 - radius * 2, y2 - radius * 2, x2, y2], 0, 90, fill=fill, outline=outline, width=width)
-
-    # 绘制矩形部分
-    draw.rectangle([x1 + radius, y1, x2 - radius, y2], fill=fill, outline=outline, width=width)
-    draw.rectangle([x1, y1 + radius, x2, y2 - radius], fill=fill, outline=outline, width=width)
+from io import BytesIO
+from src.utils import font_registry, render_service
+from src.utils.ranking import COUNTER_RANKINGS, RankingManager
+from src.utils.global_ranking import GLOBAL_SCOPE, GlobalRanking
+from src.utils.leaderboard_cache import LeaderboardCache
+from src.utils.lru import LRUCache
+from src.utils.i18n import SUPPORTED_LOCALES, get_default_locale, get_guild_locale, get_all_localizations, t
+
+# 排行榜展示的人数
+LEADERBOARD_SIZE = 10
+# "我的附近"视图中上下各展示的名次数
+LEADERBOARD_AROUND_RADIUS = 4
+# 本地成员缓存未命中时,同时向Discord请求的成员/头像数量
+MEMBER_FETCH_CONCURRENCY = 5
+AVATAR_FETCH_CONCURRENCY = 5
+AVATAR_SIZE = 128
+# 头像按头像哈希缓存,头像变更后哈希随之改变,因此可以长期保存
+_avatar_cache = LRUCache(int(os.getenv("AVATAR_CACHE_SIZE", 1000)), 24 * 3600)
 
 async def get_ranking_data(guild_id: int, type: str, limit: int = 30):
     """
@@ -64,8 +33,6 @@ async def get_ranking_data(guild_id: int, type: str, limit: int = 30):
     Returns:
         list: [(user_id, value), ...] 格式的排行榜数据
     """
-    supabase = get_connection()
-
     try:
         if type == "points":
             # 积分排行榜（使用Redis缓存）
@@ -75,38 +42,9 @@ async def get_ranking_data(guild_id: int, type: str, limit: int = 30):
                 rows = await RankingManager.get_top_rankings(guild_id, limit=limit)
             return rows
 
-        elif type == "pets":
-            # 宠物数量排行榜
-            result = supabase.rpc('get_pet_count_ranking', {
-                'p_guild_id': guild_id,
-                'p_limit': limit
-            }).execute()
-
-            if result.data:
-                return [(int(row['discord_user_id']), row['pet_count']) for row in result.data]
-            return []
-
-        elif type == "hatched_eggs":
-            # 已孵化蛋数量排行榜
-            result = supabase.rpc('get_hatched_eggs_ranking', {
-                'p_guild_id': guild_id,
-                'p_limit': limit
-            }).execute()
-
-            if result.data:
-                return [(int(row['discord_user_id']), row['hatched_count']) for row in result.data]
-            return []
-
-        elif type == "blackjack_wins":
-            # 21点胜场排行榜
-            result = supabase.rpc('get_blackjack_wins_ranking', {
-                'p_guild_id': guild_id,
-                'p_limit': limit
-            }).execute()
-
-            if result.data:
-                return [(int(row['discord_user_id']), row['total_wins']) for row in result.data]
-            return []
+        elif type in COUNTER_RANKINGS:
+            # 宠物数量 / 已孵化蛋数量 / 21点胜场排行榜（Redis增量维护）
+            return await RankingManager.get_counter_rankings(guild_id, type, limit=limit)
 
         return []
 
@@ -145,33 +83,164 @@ def get_ranking_config(type: str, locale: str):
     return config
 
 
-def load_font(path: str, size: int):
-    try:
-        return ImageFont.truetype(path, size) if os.path.exists(path) else ImageFont.load_default()
-    except Exception:
-        return ImageFont.load_default()
+def get_board_title(config: dict, locale: str, global_board: bool = False) -> str:
+    """服务器排行榜直接使用类型标题,全局排行榜加上全局标识"""
+    if global_board:
+        return t("leaderboard.status.global_title", locale=locale, title=config['title'])
+    return config['title']
 
 
 def get_locale_fonts(locale: str):
-    metadata_path = f"src/res/fonts/{locale}/metadata.json"
-    if not os.path.exists(metadata_path):
-        metadata_path = f"src/res/fonts/{get_default_locale()}/metadata.json"
-    try:
-        with open(metadata_path, "r", encoding="utf-8") as fh:
-            data = json.load(fh)
-    except Exception:
-        data = {}
-    return {
-        "title": data.get("title", "src/res/Comic Sans MS.ttf"),
-        "rank": data.get("rank", "src/res/Arial Rounded Bold.ttf"),
-        "name": data.get("name", "src/res/SnellRoundhand.ttc"),
-        "value": data.get("value", "src/res/Arial Rounded Bold.ttf")
-    }
+    return font_registry.get_locale_fonts(locale, get_default_locale())
+
+async def resolve_members(guild: discord.Guild, user_ids: list, limit: int = LEADERBOARD_SIZE) -> list:
+    """
+    按排名顺序解析仍在服务器中的成员
+
+    优先使用本地成员缓存(get_member),未命中的再并发调用fetch_member,
+    每轮只请求凑满limit所需的数量,已离开服务器的用户跳过
+
+    Args:
+        guild: Discord服务器
+        user_ids: 按排名排序的Discord用户ID
+        limit: 需要的成员数量
+
+    Returns:
+        list: [(index, member), ...],index为user_ids中的位置
+    """
+    semaphore = asyncio.Semaphore(MEMBER_FETCH_CONCURRENCY)
+
+    async def fetch(user_id):
+        async with semaphore:
+            try:
+                return await guild.fetch_member(user_id)
+            except discord.NotFound:
+                # 用户不在服务器中，跳过
+                return None
+            except Exception:
+                # 其他错误也跳过该用户
+                return None
+
+    resolved = {}
+    position = 0
+    while position < len(user_ids) and len(resolved) < limit:
+        # 假设待请求的成员都存在,只扫描到刚好凑满limit的位置
+        pending = []
+        while position < len(user_ids) and len(resolved) + len(pending) < limit:
+            member = guild.get_member(user_ids[position])
+            if member:
+                resolved[position] = member
+            else:
+                pending.append(position)
+            position += 1
+
+        if pending:
+            members = await asyncio.gather(*(fetch(user_ids[index]) for index in pending))
+            for index, member in zip(pending, members):
+                if member:
+                    resolved[index] = member
+
+    return sorted(resolved.items())[:limit]
+
+
+async def resolve_users(client: discord.Client, user_ids: list) -> list:
+    """
+    解析全局排行榜中的用户(不要求在当前服务器中)
+
+    Args:
+        client: 机器人客户端
+        user_ids: 按排名排序的Discord用户ID
+
+    Returns:
+        list: [(index, user), ...],无法获取的用户跳过
+    """
+    semaphore = asyncio.Semaphore(MEMBER_FETCH_CONCURRENCY)
+
+    async def fetch(user_id):
+        user = client.get_user(user_id)
+        if user:
+            return user
+        async with semaphore:
+            try:
+                return await client.fetch_user(user_id)
+            except Exception:
+                return None
+
+    users = await asyncio.gather(*(fetch(user_id) for user_id in user_ids))
+    return [(index, user) for index, user in enumerate(users) if user]
+
+
+async def fetch_avatars(members: list) -> list:
+    """
+    并发下载成员头像,按头像哈希缓存
+
+    Args:
+        members: Discord成员列表
+
+    Returns:
+        list: 与members顺序一致的头像字节(下载失败时为b'')
+    """
+    semaphore = asyncio.Semaphore(AVATAR_FETCH_CONCURRENCY)
+
+    async def fetch(member):
+        asset = member.display_avatar.replace(size=AVATAR_SIZE)
+        cache_key = (asset.key, AVATAR_SIZE)
+        cached = _avatar_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        async with semaphore:
+            try:
+                data = await asset.read()
+            except Exception as e:
+                print(f"下载头像失败: {e}")
+                return b''
+        _avatar_cache.set(cache_key, data)
+        return data
+
+    return await asyncio.gather(*(fetch(member) for member in members))
+
+
+async def build_entries(interaction: discord.Interaction, rows: list, config: dict,
+                        highlight_id: int = None, global_board: bool = False) -> list:
+    """
+    将 [(名次, user_id, 数值), ...] 转换为渲染条目,保留排行榜中的绝对名次
+
+    已离开服务器的用户跳过(窗口视图不向后补位,保证查询只读取窗口内的数据);
+    全局排行榜按用户解析,不要求在当前服务器中
+    """
+    user_ids = [user_id for _, user_id, _ in rows]
+    if global_board:
+        resolved = await resolve_users(interaction.client, user_ids)
+    else:
+        resolved = await resolve_members(interaction.guild, user_ids, limit=len(rows))
+    members = [member for _, member in resolved]
+    avatars = await fetch_avatars(members)
+
+    return [
+        {
+            'rank': rows[index][0],
+            'avatar_bytes': avatar_bytes,
+            'name': member.name,
+            'value_text': config['value_format'](rows[index][2]),
+            'highlight': member.id == highlight_id
+        }
+        for (index, member), avatar_bytes in zip(resolved, avatars)
+    ]
+
 
-async def leaderboard(interaction: discord.Interaction, type: str = "points"):
+async def leaderboard(interaction: discord.Interaction, type: str = "points", page: int = 1,
+                      around_me: bool = False, global_board: bool = False):
     # 延迟响应，因为生成图片可能需要时间
     await interaction.response.defer()
 
+    if around_me:
+        await leaderboard_around_me(interaction, type, global_board)
+        return
+    if page > 1 or global_board:
+        await leaderboard_page(interaction, type, page, global_board)
+        return
+
     try:
         # 获取当前服务器ID
         guild_id = interaction.guild.id
@@ -180,6 +249,12 @@ async def leaderboard(interaction: discord.Interaction, type: str = "points"):
         # 获取排行榜配置
         config = get_ranking_config(type, locale)
 
+        # 排行数据自上次渲染后没有变化时直接发送缓存图片
+        version, cached_image, filename = await LeaderboardCache.get(guild_id, type, locale)
+        if cached_image is not None:
+            await interaction.followup.send(file=File(fp=BytesIO(cached_image), filename=filename))
+            return
+
         # 获取更多排名数据以应对部分用户已离开服务器的情况
         rows = await get_ranking_data(guild_id, type, limit=30)
 
@@ -194,130 +269,115 @@ async def leaderboard(interaction: discord.Interaction, type: str = "points"):
         await interaction.followup.send(t("leaderboard.status.error", locale=locale, error=str(e)))
         return
 
+    resolved = await resolve_members(interaction.guild, [user_id for user_id, _ in rows])
+    members = [member for _, member in resolved]
+    avatars = await fetch_avatars(members)
+
     entries = []
-    rank = 1
-    for user_id, value in rows:
-        # 检查用户是否仍在服务器中
-        try:
-            member = await interaction.guild.fetch_member(user_id)
-            if member:
-                avatar_bytes = await member.display_avatar.replace(size=128).read()
-                avatar = Image.open(BytesIO(avatar_bytes)).convert("RGBA").resize((80, 80))
-                entries.append({
-                    'rank': rank,
-                    'avatar': avatar,
-                    'name': member.name,
-                    'value': value
-                })
-                rank += 1
-
-                # 已经收集够10个在服务器中的成员，停止
-                if len(entries) >= 10:
-                    break
-        except discord.NotFound:
-            # 用户不在服务器中，跳过
-            continue
-        except Exception:
-            # 其他错误也跳过该用户
-            continue
+    for rank, ((index, member), avatar_bytes) in enumerate(zip(resolved, avatars), start=1):
+        entries.append({
+            'rank': rank,
+            'avatar_bytes': avatar_bytes,
+            'name': member.name,
+            'value_text': config['value_format'](rows[index][1])
+        })
 
     if not entries:
         await interaction.followup.send(t("leaderboard.status.no_members", locale=locale))
         return
 
-    # 字体设置
-    font_map = get_locale_fonts(locale)
-    title_font = load_font(font_map['title'], 32)
-    rank_font = load_font(font_map['rank'], 16)
-    name_font = load_font(font_map['name'], 18)
-    points_font = load_font(font_map['value'], 14)
-    # 图片尺寸
-    width = 700
-    card_height = 100
-    card_spacing = 15
-    padding = 40
-    title_height = 80
-
-    height = title_height + padding * 2 + (card_height + card_spacing) * len(entries)
-
-    # 创建渐变背景
-    img = create_gradient_background(width, height)
-    draw = ImageDraw.Draw(img)
-
-    # 绘制标题
-    title = config['title']
-    title_bbox = draw.textbbox((0, 0), title, font=title_font)
-    title_width = title_bbox[2] - title_bbox[0]
-    title_x = (width - title_width) // 2
-    draw.text((title_x, padding), title, fill='#FFD700', font=title_font)
-
-    # 绘制每个排名卡片
-    y = padding + title_height
-    for entry in entries:
-        rank = entry['rank']
-        avatar = entry['avatar']
-        name = entry['name']
-        value = entry['value']
-
-        # 前三名使用特殊颜色
-        if rank == 1:
-            card_color = '#2E3440'  # 金色调
-            text_color = '#FFD700'
-            rank_color = '#FFD700'
-        elif rank == 2:
-            card_color = '#2E3440'  # 银色调
-            text_color = '#C0C0C0'
-            rank_color = '#C0C0C0'
-        elif rank == 3:
-            card_color = '#2E3440'  # 铜色调
-            text_color = '#CD7F32'
-            rank_color = '#CD7F32'
+    # 在渲染进程中绘图,避免阻塞事件循环
+    image = await render_service.render_leaderboard(config['title'], entries, get_locale_fonts(locale))
+    filename = f"ranking.{image.extension}"
+    await LeaderboardCache.store(guild_id, type, locale, version, image.data, filename)
+    await interaction.followup.send(file=File(fp=BytesIO(image.data), filename=filename))
+
+async def leaderboard_page(interaction: discord.Interaction, type: str, page: int, global_board: bool = False):
+    """分页查看服务器或全局排行榜(ZCARD + 窗口ZREVRANGE,与服务器人数无关)"""
+    guild_id = interaction.guild.id
+    locale = get_guild_locale(guild_id)
+    scope = GLOBAL_SCOPE if global_board else guild_id
+
+    try:
+        config = get_ranking_config(type, locale)
+
+        # 先按排行榜人数修正页码,超出范围的请求与最后一页共用同一张缓存图片
+        ranking_key = GlobalRanking.ranking_key(type) if global_board else RankingManager.ranking_key(guild_id, type)
+        page = await RankingManager.clamp_page(ranking_key, page, LEADERBOARD_SIZE)
+
+        version, cached_image, filename = await LeaderboardCache.get(scope, type, locale, page=page)
+        if cached_image is not None:
+            await interaction.followup.send(file=File(fp=BytesIO(cached_image), filename=filename))
+            return
+
+        if global_board:
+            total, rows = await GlobalRanking.get_page(type, page, LEADERBOARD_SIZE)
+        else:
+            total, rows = await RankingManager.get_rankings_page(guild_id, type, page, LEADERBOARD_SIZE)
+        if not rows:
+            await interaction.followup.send(
+                t("leaderboard.status.no_data_type", locale=locale, label=config['value_label'])
+            )
+            return
+
+        # 读取期间人数可能变化,以实际返回的名次为准(分页视图与默认Top榜的key互不重叠)
+        page = (rows[0][0] - 1) // LEADERBOARD_SIZE + 1
+        pages = (total - 1) // LEADERBOARD_SIZE + 1
+        entries = await build_entries(interaction, rows, config, global_board=global_board)
+        if not entries:
+            await interaction.followup.send(t("leaderboard.status.no_members", locale=locale))
+            return
+
+        title = get_board_title(config, locale, global_board)
+        title = t("leaderboard.status.page_title", locale=locale, title=title, page=page, pages=pages)
+        image = await render_service.render_leaderboard(title, entries, get_locale_fonts(locale))
+        filename = f"ranking.{image.extension}"
+        await LeaderboardCache.store(scope, type, locale, version, image.data, filename, page=page)
+        await interaction.followup.send(file=File(fp=BytesIO(image.data), filename=filename))
+
+    except Exception as e:
+        await interaction.followup.send(t("leaderboard.status.error", locale=locale, error=str(e)))
+
+async def leaderboard_around_me(interaction: discord.Interaction, type: str, global_board: bool = False):
+    """查看自己上下各 LEADERBOARD_AROUND_RADIUS 名的排行(ZREVRANK + 窗口ZREVRANGE)"""
+    guild_id = interaction.guild.id
+    locale = get_guild_locale(guild_id)
+
+    try:
+        config = get_ranking_config(type, locale)
+
+        if global_board:
+            rank, total, rows = await GlobalRanking.get_around(
+                interaction.user.id, type, LEADERBOARD_AROUND_RADIUS
+            )
         else:
-            card_color = '#2E3440'
-            text_color = '#ECEFF4'
-            rank_color = '#88C0D0'
-
-        # 绘制卡片背景（圆角矩形）
-        card_x1 = padding
-        card_y1 = y
-        card_x2 = width - padding
-        card_y2 = y + card_height
-        draw_rounded_rectangle(draw, (card_x1, card_y1, card_x2, card_y2), 15, card_color)
-
-        # 绘制排名
-        rank_text = str(rank)
-        rank_bbox = draw.textbbox((0, 0), rank_text, font=rank_font)
-        rank_width = rank_bbox[2] - rank_bbox[0]
-        rank_x = card_x1 + 25
-        rank_y = card_y1 + (card_height - (rank_bbox[3] - rank_bbox[1])) // 2
-        draw.text((rank_x, rank_y), rank_text, fill=rank_color, font=rank_font)
-
-        # 绘制圆形头像
-        circle_avatar = create_circle_avatar(avatar, 80)
-        avatar_x = rank_x + rank_width + 20
-        avatar_y = card_y1 + 10
-        img.paste(circle_avatar, (avatar_x, avatar_y), circle_avatar)
-
-        # 绘制用户名
-        name_x = avatar_x + 100
-        name_y = card_y1 + 20
-        # 限制用户名长度
-        if len(name) > 15:
-            name = name[:15] + '...'
-        draw.text((name_x, name_y), name, fill=text_color, font=name_font)
-
-        # 绘制数值（积分/宠物数量/战力等）
-        value_text = config['value_format'](value)
-        value_x = name_x
-        value_y = card_y1 + 60
-        draw.text((value_x, value_y), value_text, fill='#88C0D0', font=points_font)
-
-        y += card_height + card_spacing
-
-    buffer = BytesIO()
-    img.save(buffer, format="PNG")
-    buffer.seek(0)
-    await interaction.followup.send(file=File(fp=buffer, filename="ranking.png"))
+            rank, total, rows = await RankingManager.get_rankings_around(
+                guild_id, interaction.user.id, type, LEADERBOARD_AROUND_RADIUS
+            )
+        if rank < 0:
+            await interaction.followup.send(
+                t("leaderboard.status.not_ranked", locale=locale, label=config['value_label'])
+            )
+            return
+
+        entries = await build_entries(
+            interaction, rows, config, highlight_id=interaction.user.id, global_board=global_board
+        )
+        if not entries:
+            await interaction.followup.send(t("leaderboard.status.no_members", locale=locale))
+            return
+
+        # 每个用户的窗口不同,不做图片缓存
+        title = get_board_title(config, locale, global_board)
+        title = t("leaderboard.status.around_title", locale=locale, title=title)
+        image = await render_service.render_leaderboard(title, entries, get_locale_fonts(locale))
+        await interaction.followup.send(
+            t("leaderboard.status.your_rank", locale=locale, rank=f"{rank:,}", total=f"{total:,}"),
+            file=File(fp=BytesIO(image.data), filename=f"ranking.{image.extension}")
+        )
+
+    except Exception as e:
+        await interaction.followup.send(t("leaderboard.status.error", locale=locale, error=str(e)))
 
 async def leaderboard_type_autocomplete(interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
     """为leaderboard命令的type参数提供基于服务器语言的自动补全"""
@@ -349,13 +409,22 @@ async def leaderboard_type_autocomplete(interaction: discord.Interaction, curren
 
 def setup(bot):
     """注册斜杠命令"""
+    # 渲染进程启动时预加载所有语言的字体
+    render_service.configure([get_locale_fonts(code) for code in SUPPORTED_LOCALES])
+
     @bot.tree.command(name="leaderboard", description="View server rankings")
     @app_commands.describe(
-        type="Select ranking type"
+        type="Select ranking type",
+        page="Page number",
+        around_me="Show the ranks around you",
+        global_board="Show the ranking across all servers"
     )
+    @app_commands.rename(global_board="global")
     @app_commands.autocomplete(type=leaderboard_type_autocomplete)
-    async def leaderboard_command(interaction: discord.Interaction, type: str = "points"):
-        await leaderboard(interaction, type)
+    async def leaderboard_command(interaction: discord.Interaction, type: str = "points",
+                                  page: app_commands.Range[int, 1] = 1, around_me: bool = False,
+                                  global_board: bool = False):
+        await leaderboard(interaction, type, page, around_me, global_board)
 
     leaderboard_command.description_localizations = get_all_localizations("leaderboard.command.description")
 
@@ -367,3 +436,6 @@ def setup(bot):
                 break
 
     _set_param(leaderboard_command, "type", "leaderboard.command.param_type")
+    _set_param(leaderboard_command, "page", "leaderboard.command.param_page")
+    _set_param(leaderboard_command, "around_me", "leaderboard.command.param_around_me")
+    _set_param(leaderboard_command, "global", "leaderboard.command.param_global")
@@ -4,8 +4,9 @@ from discord import app_commands
 from typing import List, Dict
 from datetime import datetime
 from zoneinfo import ZoneInfo
+from src.db import async_db
 from src.utils.ui import create_embed
-from src.utils.helpers import get_user_internal_id, get_user_internal_id_with_guild_and_discord_id
+from src.utils.helpers import get_user_internal_id_with_guild_and_discord_id
 from src.utils.i18n import get_default_locale, get_guild_locale, get_all_localizations, t, get_context_locale, get_localized_food_name, get_localized_food_description
 
 # 稀有度颜色映射
@@ -25,26 +26,6 @@ FLAVOR_EMOJIS = {
     'UMAMI': '🍄'
 }
 
-def get_user_internal_id(interaction):
-    """从interaction获取用户内部ID"""
-    from src.utils.helpers import get_user_internal_id_with_guild_and_discord_id
-    import asyncio
-
-    # 因为这是一个同步函数调用异步函数，我们需要获取当前的事件循环
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            # 如果事件循环正在运行，我们不能直接调用run_until_complete
-            # 这种情况下应该使用异步版本
-            return None
-        else:
-            return get_user_internal_id_with_guild_and_discord_id(
-                guild_id=interaction.guild.id,
-                discord_user_id=interaction.user.id
-            )
-    except:
-        return None
-
 class ShopCommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -61,10 +42,10 @@ async def get_today_shop_items(locale: str = None) -> List[Dict]:
         locale = get_default_locale()
 
     # 获取今日商品目录
-    catalog_response = supabase.table('daily_shop_catalog').select('''
+    catalog_response = await async_db.execute(supabase.table('daily_shop_catalog').select('''
         food_template_id,
         food_templates(*)
-    ''').eq('refresh_date', today.isoformat()).execute()
+    ''').eq('refresh_date', today.isoformat()))
 
     if not catalog_response.data:
         return []
@@ -233,7 +214,7 @@ async def shop(interaction: discord.Interaction, action: str, item: str = None,
     locale = get_guild_locale(interaction.guild.id if interaction.guild else None)
 
     # 获取用户内部ID
-    user_internal_id = get_user_internal_id_with_guild_and_discord_id(
+    user_internal_id = await get_user_internal_id_with_guild_and_discord_id(
         guild_id=interaction.guild.id,
         discord_user_id=interaction.user.id
     )
@@ -259,9 +240,9 @@ async def shop(interaction: discord.Interaction, action: str, item: str = None,
         today = datetime.now(ZoneInfo("America/New_York")).date()
 
         try:
-            user_resp = supabase.table('users').select(
+            user_resp = await async_db.execute(supabase.table('users').select(
                 'points, food_purchased_today, last_food_purchase_date'
-            ).eq('id', user_internal_id).execute()
+            ).eq('id', user_internal_id))
             if user_resp.data:
                 user_data = user_resp.data[0]
                 user_points = user_data.get('points', 0)
@@ -400,7 +381,7 @@ async def inventory(interaction: discord.Interaction, item_type: str = "food"):
         return
 
     # 获取用户内部ID
-    user_internal_id = get_user_internal_id_with_guild_and_discord_id(
+    user_internal_id = await get_user_internal_id_with_guild_and_discord_id(
         guild_id=interaction.guild.id,
         discord_user_id=interaction.user.id
     )
@@ -417,10 +398,10 @@ async def inventory(interaction: discord.Interaction, item_type: str = "food"):
     supabase = get_supabase_client()
 
     # 查询用户食粮库存
-    response = supabase.table('user_food_inventory').select('''
+    response = await async_db.execute(supabase.table('user_food_inventory').select('''
         quantity,
         food_templates(*)
-    ''').eq('user_id', user_internal_id).gt('quantity', 0).execute()
+    ''').eq('user_id', user_internal_id).gt('quantity', 0))
 
     if not response.data:
         embed = create_embed(
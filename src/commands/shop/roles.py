@@ -2,6 +2,7 @@ import discord
 import asyncio
 from discord import app_commands
 from src.db.database import get_connection
+from src.db import async_db
 from src.utils.ui import RolePageView
 from src.utils.cache import UserCache
 from src.utils.i18n import get_default_locale, get_guild_locale, get_all_localizations, t
@@ -14,11 +15,11 @@ async def addtag(ctx, price, role):
     try:
         # 使用upsert来实现INSERT ... ON DUPLICATE KEY UPDATE的功能
         # 添加guild_id以实现服务器隔离
-        supabase.table("tags").upsert({
+        await async_db.execute(supabase.table("tags").upsert({
             "guild_id": str(ctx.guild.id),
             "role_id": str(role.id),
             "price": price
-        }, on_conflict="guild_id,role_id").execute()
+        }, on_conflict="guild_id,role_id"))
 
         await ctx.send(t("shop_module.roles.add.success", locale=locale, role=role.name, price=price))
     except Exception as e:
@@ -32,7 +33,7 @@ async def roleshop(ctx):
 
     try:
         # 只显示当前服务器的身份组
-        result = supabase.table("tags").select("role_id, price").eq("guild_id", str(ctx.guild.id)).order("price").execute()
+        result = await async_db.execute(supabase.table("tags").select("role_id, price").eq("guild_id", str(ctx.guild.id)).order("price"))
         rows = [(int(row["role_id"]), row["price"]) for row in result.data]
 
         if not rows:
@@ -58,7 +59,7 @@ async def buytag(ctx, role_name):
 
     try:
         # 获取身份组价格(只查询当前服务器的身份组)
-        tag_result = supabase.table("tags").select("price").eq("guild_id", str(ctx.guild.id)).eq("role_id", str(role.id)).execute()
+        tag_result = await async_db.execute(supabase.table("tags").select("price").eq("guild_id", str(ctx.guild.id)).eq("role_id", str(role.id)))
         if not tag_result.data:
             await ctx.send(t("shop_module.roles.buy.not_available", locale=locale))
             return
@@ -106,7 +107,7 @@ async def removetag(ctx, role: discord.Role):
 
     try:
         # 删除指定的身份组
-        result = supabase.table("tags").delete().eq("guild_id", str(ctx.guild.id)).eq("role_id", str(role.id)).execute()
+        result = await async_db.execute(supabase.table("tags").delete().eq("guild_id", str(ctx.guild.id)).eq("role_id", str(role.id)))
 
         if result.data:
             await ctx.send(t("shop_module.roles.remove.success", locale=locale, role=role.name))
@@ -123,9 +124,9 @@ async def updatetagprice(ctx, role: discord.Role, new_price: int):
 
     try:
         # 更新身份组价格
-        result = supabase.table("tags").update({
+        result = await async_db.execute(supabase.table("tags").update({
             "price": new_price
-        }).eq("guild_id", str(ctx.guild.id)).eq("role_id", str(role.id)).execute()
+        }).eq("guild_id", str(ctx.guild.id)).eq("role_id", str(role.id)))
 
         if result.data:
             await ctx.send(t("shop_module.roles.update.success", locale=locale, role=role.name, price=new_price))
@@ -141,7 +142,7 @@ async def listtags(ctx):
     locale = get_guild_locale(ctx.guild.id if ctx.guild else None)
 
     try:
-        result = supabase.table("tags").select("role_id, price").eq("guild_id", str(ctx.guild.id)).order("price").execute()
+        result = await async_db.execute(supabase.table("tags").select("role_id, price").eq("guild_id", str(ctx.guild.id)).order("price"))
 
         if not result.data:
             await ctx.send(t("shop_module.roles.list.empty", locale=locale))
@@ -182,7 +183,7 @@ async def tag_shop(interaction: discord.Interaction):
 
     try:
         # 只显示当前服务器的身份组
-        result = supabase.table("tags").select("role_id, price").eq("guild_id", str(interaction.guild.id)).order("price").execute()
+        result = await async_db.execute(supabase.table("tags").select("role_id, price").eq("guild_id", str(interaction.guild.id)).order("price"))
         rows = [(int(row["role_id"]), row["price"]) for row in result.data]
 
         if not rows:
@@ -225,7 +226,7 @@ async def tag_buy(interaction: discord.Interaction, role_name: str):
 
     try:
         # 获取身份组价格(只查询当前服务器的身份组)
-        tag_result = supabase.table("tags").select("price").eq("guild_id", str(guild.id)).eq("role_id", str(role.id)).execute()
+        tag_result = await async_db.execute(supabase.table("tags").select("price").eq("guild_id", str(guild.id)).eq("role_id", str(role.id)))
         if not tag_result.data:
             await interaction.response.send_message(t("shop_module.roles.buy.not_available", locale=locale), ephemeral=True)
             return
@@ -1,8 +1,17 @@
 import discord
+import asyncio
 import datetime
-from src.db.database import get_connection, is_guild_subscribed
+from src.db.database import get_connection
+from src.db import async_db
 from src.utils.helpers import now_est, get_user_internal_id_with_guild_and_discord_id
 from src.utils.i18n import get_guild_locale, get_reward_message, t
+from src.utils.subscription_cache import SubscriptionCache
+
+# 抽奖模拟上限(NumPy向量化,千万次约1秒)
+TESTDRAW_MAX_TIMES = 10_000_000
+# 抽蛋模拟的玩家数和每位玩家的抽数
+TESTDRAW_EGG_PLAYERS = 100_000
+TESTDRAW_EGG_PULLS = 50
 
 async def rewardinfo(ctx):
     """显示奖品信息"""
@@ -39,53 +48,120 @@ async def rewardinfo(ctx):
         await ctx.send(t("common.unknown_error", locale=locale))
 
 async def testdraw(ctx, times=100):
-    """测试抽奖概率分布"""
-    from src.utils.helpers import get_weighted_reward
-    from src.config.config import REWARD_SYSTEM
+    """测试抽奖概率分布(在工作进程中运行蒙特卡洛模拟)"""
+    from src.utils import economy_sim
+    from src.commands.pets.eggs import EggCommands
+    from src.config.config import REWARD_SYSTEM, DRAW_COST
 
     try:
-        # 模拟抽奖，使用与实际抽奖相同的逻辑
-        results = {}
-        for _ in range(times):
-            reward = get_weighted_reward()
-            points = reward["points"]
-            results[points] = results.get(points, 0) + 1
+        locale = get_guild_locale(ctx.guild.id if ctx.guild else None)
+        times = max(1, min(times, TESTDRAW_MAX_TIMES))
+
+        # 获取抽蛋和孵化概率配置
+        draw_probabilities = await EggCommands.get_draw_probabilities()
+        hatch_results = await asyncio.gather(
+            *(EggCommands.get_hatch_probabilities(rarity) for rarity in economy_sim.RARITIES)
+        )
+        hatch_probabilities = dict(zip(economy_sim.RARITIES, hatch_results))
+
+        params = {
+            'rewards': {
+                'rewards': [
+                    {'points': r["points"], 'probability': r["probability"]}
+                    for r in REWARD_SYSTEM
+                ],
+                'n': times,
+                'cost': DRAW_COST,
+            },
+            'eggs': {
+                'draw_probabilities': draw_probabilities,
+                'hatch_probabilities': hatch_probabilities,
+                'players': TESTDRAW_EGG_PLAYERS,
+                'pulls': TESTDRAW_EGG_PULLS,
+                'single_cost': EggCommands.SINGLE_DRAW_COST,
+            } if draw_probabilities else None,
+        }
+        report = await economy_sim.run_in_worker(params)
+        reward_report = report['rewards']
 
         # 生成结果
-        locale = get_guild_locale(ctx.guild.id if ctx.guild else None)
         embed = discord.Embed(
             title=t("admin.testdraw.title", locale=locale, times=times),
             color=0x00ff00
         )
 
         # 按积分从高到低排序
-        for points in sorted(results.keys(), reverse=True):
-            count = results[points]
+        for reward_info, count in sorted(
+            zip(REWARD_SYSTEM, reward_report['counts']),
+            key=lambda x: x[0]["points"],
+            reverse=True
+        ):
+            if count == 0:
+                continue
+
             percentage = (count / times) * 100
+            name = t(
+                "admin.testdraw.field_name",
+                locale=locale,
+                emoji=reward_info['emoji'],
+                points=reward_info["points"],
+                message=get_reward_message(reward_info, locale)
+            )
+            value = t(
+                "admin.testdraw.field_value",
+                locale=locale,
+                count=count,
+                percentage=f"{percentage:.1f}",
+                expected=reward_info["probability"]
+            )
+            embed.add_field(
+                name=name,
+                value=value,
+                inline=True
+            )
+
+        embed.add_field(
+            name=t("admin.testdraw.stats_name", locale=locale),
+            value=t(
+                "admin.testdraw.stats_value",
+                locale=locale,
+                ev=f"{reward_report['ev_per_paid_draw']:.2f}",
+                theoretical_ev=f"{reward_report['theoretical_ev']:.2f}",
+                std=f"{reward_report['std']:.1f}",
+                chi_square=f"{reward_report['chi_square']:.2f}",
+                dof=reward_report['dof'],
+                p_value=f"{reward_report['p_value']:.3f}"
+            ),
+            inline=False
+        )
 
-            # 查找对应的奖励信息
-            reward_info = next((r for r in REWARD_SYSTEM if r["points"] == points), None)
-            if reward_info:
-                name = t(
-                    "admin.testdraw.field_name",
+        egg_report = report.get('eggs')
+        if egg_report:
+            total_eggs = max(1, sum(egg_report['egg_distribution'].values()))
+            egg_cost = egg_report['expected_cost_to_ssr_pet']
+            egg_pulls = egg_report['expected_pulls_to_ssr_pet']
+            embed.add_field(
+                name=t(
+                    "admin.testdraw.egg_name",
                     locale=locale,
-                    emoji=reward_info['emoji'],
-                    points=points,
-                    message=get_reward_message(reward_info, locale)
-                )
-                expected_prob = reward_info["probability"]
-                value = t(
-                    "admin.testdraw.field_value",
+                    players=egg_report['players'],
+                    pulls=egg_report['pulls']
+                ),
+                value=t(
+                    "admin.testdraw.egg_value",
                     locale=locale,
-                    count=count,
-                    percentage=f"{percentage:.1f}",
-                    expected=expected_prob
-                )
-                embed.add_field(
-                    name=name,
-                    value=value,
-                    inline=True
-                )
+                    ssr_egg_rate=f"{egg_report['egg_distribution']['SSR'] / total_eggs * 100:.2f}",
+                    ssr_pet_rate=f"{egg_report['pet_distribution']['SSR'] / total_eggs * 100:.2f}",
+                    pity_triggers=egg_report['egg_pity_triggers'],
+                    legendary_triggers=egg_report['legendary_pity_triggers'],
+                    max_streak=egg_report['max_pity_streak'],
+                    egg_cost=f"{egg_report['expected_cost_to_ssr_egg']:.0f}",
+                    egg_pulls=f"{egg_report['expected_pulls_to_ssr_egg']:.1f}",
+                    pet_cost=f"{egg_cost:.0f}" if egg_cost is not None else "-",
+                    pet_pulls=f"{egg_pulls:.1f}" if egg_pulls is not None else "-"
+                ),
+                inline=False
+            )
 
         await ctx.send(embed=embed)
 
@@ -99,12 +175,12 @@ async def check_subscription(ctx):
     supabase = get_connection()
 
     try:
-        # 检查订阅状态
-        is_active = is_guild_subscribed(ctx.guild.id)
         locale = get_guild_locale(ctx.guild.id if ctx.guild else None)
 
-        # 获取详细信息
-        result = supabase.table("guild_subscriptions").select("*").eq("guild_id", ctx.guild.id).execute()
+        # 获取详细信息(直接查询数据库,顺便刷新所有进程的订阅缓存)
+        result = await async_db.execute(supabase.table("guild_subscriptions").select("*").eq("guild_id", ctx.guild.id))
+        is_active = bool(result.data and result.data[0].get('is_active', False))
+        await SubscriptionCache.store(ctx.guild.id, is_active)
 
         embed = discord.Embed(
             title=t("admin.subscription.title", locale=locale),
@@ -154,3 +230,52 @@ async def check_subscription(ctx):
         print(f"检查订阅状态失败: {e}")
         locale = get_guild_locale(ctx.guild.id if ctx.guild else None)
         await ctx.send(t("admin.subscription.error", locale=locale, error=str(e)))
+
+async def rebuild_ranking(ctx, ranking_type="all"):
+    """从数据库全量重建当前服务器的排行榜"""
+    from src.utils.ranking import RankingManager, COUNTER_RANKINGS
+
+    locale = get_guild_locale(ctx.guild.id if ctx.guild else None)
+    available = ['points', *COUNTER_RANKINGS]
+    if ranking_type == "all":
+        ranking_types = available
+    elif ranking_type in available:
+        ranking_types = [ranking_type]
+    else:
+        await ctx.send(t(
+            "admin.ranking.invalid_type",
+            locale=locale,
+            type=ranking_type,
+            types=", ".join(f"`{name}`" for name in ['all', *available])
+        ))
+        return
+
+    try:
+        message = await ctx.send(t("admin.ranking.rebuilding", locale=locale, types=", ".join(ranking_types)))
+        failed = []
+        for name in ranking_types:
+            if not await RankingManager.rebuild_ranking(ctx.guild.id, name):
+                failed.append(name)
+
+        if failed:
+            await message.edit(content=t("admin.ranking.failed", locale=locale, types=", ".join(failed)))
+        else:
+            await message.edit(content=t("admin.ranking.rebuilt", locale=locale, types=", ".join(ranking_types)))
+
+    except Exception as e:
+        print(f"重建排行榜失败: {e}")
+        await ctx.send(t("common.unknown_error", locale=locale))
+
+async def reconcile_ranking(ctx):
+    """抽样检查当前服务器积分排行榜的漂移并修复"""
+    from src.utils.ranking import RankingManager
+
+    locale = get_guild_locale(ctx.guild.id if ctx.guild else None)
+    try:
+        stats = await RankingManager.reconcile_points(ctx.guild.id)
+        key = "admin.ranking.reconcile_rebuilt" if stats['rebuilt'] else "admin.ranking.reconcile_done"
+        await ctx.send(t(key, locale=locale, checked=stats['checked'], repaired=stats['repaired']))
+
+    except Exception as e:
+        print(f"检查排行榜漂移失败: {e}")
+        await ctx.send(t("common.unknown_error", locale=locale))
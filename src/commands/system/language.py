@@ -8,6 +8,7 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
+from src.db import async_db
 from src.utils.i18n import (
     SUPPORTED_LOCALES,
     format_supported_locales,
@@ -18,6 +19,7 @@ from src.utils.i18n import (
     set_guild_locale,
     t,
 )
+from src.utils.locale_cache import GuildLocaleCache
 
 
 def _apply_language_change(guild_id: int, locale: Optional[str]):
@@ -56,7 +58,10 @@ async def set_language_prefix(ctx: commands.Context, locale: Optional[str] = Non
         await ctx.send(t("language.missing_permissions", locale=get_guild_locale(ctx.guild.id)))
         return
 
-    success, key, params, response_locale = _apply_language_change(ctx.guild.id, locale)
+    success, key, params, response_locale = await async_db.run_sync(_apply_language_change, ctx.guild.id, locale)
+    if success:
+        # 同步到Redis并通知其他进程
+        await GuildLocaleCache.publish(ctx.guild.id, response_locale)
     message = t(key, locale=response_locale, **params)
 
     if key in {"language.current", "language.unsupported"}:
@@ -104,7 +109,10 @@ async def language_command(interaction: discord.Interaction, locale: app_command
         return
 
     selected_locale = locale.value
-    success, key, params, response_locale = _apply_language_change(guild.id, selected_locale)
+    success, key, params, response_locale = await async_db.run_sync(_apply_language_change, guild.id, selected_locale)
+    if success:
+        # 同步到Redis并通知其他进程
+        await GuildLocaleCache.publish(guild.id, response_locale)
     message = t(key, locale=response_locale, **params)
 
     await interaction.response.send_message(message)
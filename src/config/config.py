@@ -14,6 +14,8 @@ PREFIX = os.getenv("PREFIX", "!")
 # 抽奖配置
 DRAW_COST = 100  # 每次抽奖的费用
 MAX_PAID_DRAWS_PER_DAY = 30 # 每天允许的最大付费抽奖次数
+# 每日抽奖状态的Redis存储方式: keys(每用户独立key) 或 hash(每服务器每天一个hash,省内存)
+DRAW_STATE_STORAGE = os.getenv("DRAW_STATE_STORAGE", "keys")
 
 # 多语言配置
 DEFAULT_LOCALE = os.getenv("DEFAULT_LOCALE", "en-US")
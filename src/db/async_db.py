@@ -0,0 +1,114 @@
+"""
+异步数据库访问层
+Supabase Python客户端是同步的,直接在async函数里调用.execute()会阻塞事件循环,
+一次慢查询就会拖住心跳和所有服务器的命令。这里把同步调用放到有界线程池中执行,
+慢查询只会拖慢发起它的那个命令。
+"""
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# 线程池大小即同时在途的数据库请求上限
+DB_MAX_WORKERS = int(os.getenv('DB_MAX_WORKERS', 16))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# 运行统计,便于观察排队情况
+_stats: Dict[str, float] = {
+    'calls': 0,
+    'in_flight': 0,
+    'max_in_flight': 0,
+    'total_seconds': 0.0,
+}
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """获取数据库专用线程池(延迟创建)"""
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=DB_MAX_WORKERS,
+                    thread_name_prefix='db'
+                )
+    return _executor
+
+
+def shutdown_executor(wait: bool = True):
+    """关闭线程池(用于进程退出或基准测试)"""
+    global _executor
+
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
+
+
+async def run_sync(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    在数据库线程池中执行同步函数
+
+    适用于内部包含多次同步Supabase调用的辅助函数(如喂食、锻造)
+
+    Args:
+        func: 同步函数
+        *args, **kwargs: 传给函数的参数
+
+    Returns:
+        函数返回值
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(func, *args, **kwargs)
+
+    _stats['calls'] += 1
+    _stats['in_flight'] += 1
+    _stats['max_in_flight'] = max(_stats['max_in_flight'], _stats['in_flight'])
+    started = time.perf_counter()
+    try:
+        return await loop.run_in_executor(get_executor(), call)
+    finally:
+        _stats['in_flight'] -= 1
+        _stats['total_seconds'] += time.perf_counter() - started
+
+
+async def execute(query) -> Any:
+    """
+    执行已构建好的PostgREST查询
+
+    用法: result = await async_db.execute(supabase.table('users').select('id').eq('id', 1))
+
+    Args:
+        query: 任何带有execute()方法的查询构建器
+
+    Returns:
+        查询响应(与query.execute()相同)
+    """
+    return await run_sync(query.execute)
+
+
+async def rpc(name: str, params: Optional[Dict[str, Any]] = None) -> Any:
+    """
+    异步调用Supabase RPC函数
+
+    Args:
+        name: 数据库函数名
+        params: 函数参数
+
+    Returns:
+        RPC响应
+    """
+    from src.db.database import get_connection
+
+    return await execute(get_connection().rpc(name, params or {}))
+
+
+def get_stats() -> Dict[str, float]:
+    """返回线程池调用统计的快照"""
+    return dict(_stats)
@@ -1,19 +1,25 @@
-from supabase import create_client, Client
 from src.config.config import DB_CONFIG
 import datetime
-from typing import Optional, Dict, Any, List
+from typing import TYPE_CHECKING, Optional, Dict, Any, List
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 # 全局Supabase客户端实例
-_supabase_client: Optional[Client] = None
+_supabase_client: Optional["Client"] = None
 
-def get_connection() -> Client:
+def get_connection() -> "Client":
     """
     获取Supabase客户端连接
     返回Supabase客户端实例，保持与原MySQL接口的兼容性
+
+    supabase依赖较重,首次调用时才导入(启动时由main在线程池中预热)
     """
     global _supabase_client
     
     if _supabase_client is None:
+        from supabase import create_client
+
         _supabase_client = create_client(
             DB_CONFIG["url"], 
             DB_CONFIG["key"]
@@ -21,7 +27,7 @@ def get_connection() -> Client:
     
     return _supabase_client
 
-def get_supabase_client() -> Client:
+def get_supabase_client() -> "Client":
     """
     获取Supabase客户端的别名函数
     """
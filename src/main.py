@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 # 每日抽奖机器人 - 主入口点
 
+import asyncio
 import discord
 from discord.ext import commands
 import os
@@ -12,8 +13,14 @@ from src.commands.shop import roles as shop_roles, items as shop_commands
 from src.commands.games import quiz as quiz_commands, blackjack as blackjack_commands, texas_holdem as texas_commands
 from src.commands.rankings import leaderboard as ranking_commands
 from src.commands.system import help_module as help_commands, admin as debug_commands, language as language_commands
-from src.db.database import is_guild_subscribed
-from src.utils.i18n import get_guild_locale, t
+from src.utils.cache import InvalidationBus
+from src.utils.subscription_cache import SubscriptionCache
+from src.utils.locale_cache import GuildLocaleCache
+from src.utils.command_sync import sync_if_changed
+from src.utils.i18n import t
+from src.utils import startup_profiler
+from src.db import async_db
+from src.db.database import get_connection
 
 # 设置机器人
 intents = discord.Intents.default()
@@ -21,6 +28,27 @@ intents.message_content = True
 intents.members = True
 bot = commands.Bot(command_prefix=PREFIX, intents=intents, help_command=None)
 
+
+async def _warm_up_database():
+    """在线程池中导入supabase并创建客户端,与网关登录并行进行"""
+    try:
+        with startup_profiler.section("Supabase客户端预热"):
+            await async_db.run_sync(get_connection)
+    except Exception as e:
+        print(f"预热数据库连接时出错: {e}")
+
+
+_background_tasks = set()
+
+
+async def _setup_hook():
+    startup_profiler.mark("setup_hook")
+    task = asyncio.create_task(_warm_up_database())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+bot.setup_hook = _setup_hook
+
 @bot.check
 async def check_guild_subscription(ctx):
     """
@@ -36,9 +64,11 @@ async def check_guild_subscription(ctx):
         await ctx.send(t("common.guild_only"))
         return False
 
-    # 检查服务器订阅状态
-    locale = get_guild_locale(ctx.guild.id)
-    if not is_guild_subscribed(ctx.guild.id):
+    # 预热服务器语言缓存,命令内部同步的get_guild_locale不再阻塞事件循环
+    locale = await GuildLocaleCache.prime(ctx.guild.id)
+
+    # 检查服务器订阅状态(缓存命中时无需任何网络往返)
+    if not await SubscriptionCache.is_subscribed(ctx.guild.id):
         await ctx.send(t("common.subscription_required", locale=locale))
         return False
 
@@ -57,12 +87,14 @@ async def check_interaction_guild_subscription(interaction: discord.Interaction)
         await interaction.response.send_message(t("common.guild_only"), ephemeral=True)
         return False
 
+    # 预热服务器语言缓存,命令内部同步的get_guild_locale不再阻塞事件循环
+    locale = await GuildLocaleCache.prime(interaction.guild.id)
+
     # 检查服务器订阅状态
     if command_name in {"settings language"}:
         return True
 
-    if not is_guild_subscribed(interaction.guild.id):
-        locale = get_guild_locale(interaction.guild.id)
+    if not await SubscriptionCache.is_subscribed(interaction.guild.id):
         await interaction.response.send_message(t("common.subscription_required", locale=locale), ephemeral=True)
         return False
 
@@ -86,9 +118,18 @@ async def on_command_error(ctx, error):
         # 处理其他错误
         print(f"命令错误: {error}")
 
+# on_ready在每次网关重连后都会触发,初始化只需执行一次
+_ready_initialized = False
+
 @bot.event
 async def on_ready():
+    global _ready_initialized
+
     print(f"已登录为 {bot.user}")
+    if _ready_initialized:
+        return
+    _ready_initialized = True
+    startup_profiler.mark("on_ready")
 
     # 注册斜杠命令（避免重复注册）
     setup_functions = [
@@ -105,8 +146,6 @@ async def on_ready():
 
     for module_name, setup_func in setup_functions:
         try:
-            # 检查命令是否已经注册，避免重复
-            existing_commands = [cmd.name for cmd in bot.tree.get_commands()]
             setup_func(bot)
             print(f"已注册 {module_name} 斜杠命令")
         except Exception as e:
@@ -115,13 +154,22 @@ async def on_ready():
                 print(f"{module_name} 命令已存在，跳过重复注册")
             else:
                 print(f"注册 {module_name} 斜杠命令时出错: {e}")
+    startup_profiler.mark("注册斜杠命令")
 
+    # 命令树哈希未变化时跳过全局同步(受速率限制)
     try:
-        synced = await bot.tree.sync()
-        print(f"同步了 {len(synced)} 个斜杠命令")
+        with startup_profiler.section("同步斜杠命令"):
+            synced_count = await sync_if_changed(bot)
+        if synced_count is None:
+            print("斜杠命令未变化，跳过同步")
+        else:
+            print(f"同步了 {synced_count} 个斜杠命令")
     except Exception as e:
         print(f"同步斜杠命令时出错: {e}")
 
+    # 启动跨进程缓存失效订阅
+    InvalidationBus.start()
+
     # 启动喂食系统定时任务
     try:
         from src.utils.scheduler import start_feeding_scheduler
@@ -129,6 +177,8 @@ async def on_ready():
         print("已启动喂食系统定时任务")
     except Exception as e:
         print(f"启动定时任务时出错: {e}")
+    startup_profiler.mark("启动定时任务")
+    startup_profiler.report_once()
 
 
 # 注册抽奖命令
@@ -156,6 +206,16 @@ async def testdraw(ctx, times: int = 100):
 async def check_subscription(ctx):
     await debug_commands.check_subscription(ctx)
 
+@bot.command(name="rebuildranking")
+@commands.has_permissions(administrator=True)
+async def rebuildranking(ctx, ranking_type: str = "all"):
+    await debug_commands.rebuild_ranking(ctx, ranking_type)
+
+@bot.command(name="checkranking")
+@commands.has_permissions(administrator=True)
+async def checkranking(ctx):
+    await debug_commands.reconcile_ranking(ctx)
+
 # 注册角色和积分管理命令
 @bot.command(name="addtag")
 @commands.has_permissions(administrator=True)
@@ -215,6 +275,7 @@ async def help_command(interaction: discord.Interaction):
 
 def main():
     # 运行机器人
+    startup_profiler.mark("bot.run")
     bot.run(TOKEN)
 
 if __name__ == "__main__":
@@ -4,19 +4,113 @@
 """
 import asyncio
 import logging
-from typing import Optional
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
 from src.db.redis_client import redis_client
 from src.db.database import get_connection
+from src.db import async_db
+from src.utils.lru import LRUCache
+from src.utils.leaderboard_cache import LeaderboardCache, VERSION_TTL
 
 logger = logging.getLogger(__name__)
 
+# 不存在用户的负缓存标记和有效期(秒)
+NEGATIVE_MARKER = 'none'
+NEGATIVE_TTL = 60
+
+# RPC函数不存在时PostgREST/Postgres返回的错误码,只有这种情况才降级到逐步更新
+MISSING_FUNCTION_CODES = ('PGRST202', '42883')
+
+# 合并请求的发起者被取消时交给等待者的标记,等待者据此重新发起加载
+_LEADER_CANCELLED = object()
+
+
+def _is_missing_function(error: Exception) -> bool:
+    """
+    判断RPC错误是否为函数不存在
+
+    其他错误(网络超时等)可能发生在服务端已经提交之后,降级重试会重复扣费或重复加分
+    """
+    code = getattr(error, 'code', None)
+    if code in MISSING_FUNCTION_CODES:
+        return True
+    return any(missing in str(error) for missing in MISSING_FUNCTION_CODES)
+
+# 进程内用户ID映射LRU的容量和有效期(秒)
+USER_ID_LRU_SIZE = int(os.getenv('USER_ID_LRU_SIZE', 50000))
+USER_ID_LRU_TTL = int(os.getenv('USER_ID_LRU_TTL', 3600))
+
 
 class UserCache:
     """用户数据缓存层"""
 
     # 标记Supabase是否支持atomic_update_points RPC,避免反复失败日志
     _rpc_supported: Optional[bool] = None
+    # 标记Supabase是否支持draw_batch RPC
+    _draw_batch_supported: Optional[bool] = None
+    # 标记Supabase是否支持atomic_apply_deltas RPC
+    _batch_rpc_supported: Optional[bool] = None
+
+    # 正在进行中的数据库加载(按缓存键合并并发请求)
+    _inflight: Dict[str, asyncio.Future] = {}
+
+    # 用户ID映射一旦存在就不会改变,在Redis前再加一层进程内LRU
+    _id_lru = LRUCache(USER_ID_LRU_SIZE, USER_ID_LRU_TTL)
+
+    # 缓存统计
+    _stats: Dict[str, int] = {
+        'local_hits': 0,
+        'hits': 0,
+        'misses': 0,
+        'negative_hits': 0,
+        'coalesced': 0,
+    }
+
+    @staticmethod
+    async def _single_flight(key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        按key合并并发的缓存未命中请求,同一时刻只有一个请求访问数据库
+
+        Args:
+            key: 缓存键
+            loader: 实际加载数据的协程函数
+
+        Returns:
+            loader的返回值(并发请求共享同一结果)
+        """
+        future = UserCache._inflight.get(key)
+        while future is not None:
+            UserCache._stats['coalesced'] += 1
+            result = await asyncio.shield(future)
+            if result is not _LEADER_CANCELLED:
+                return result
+            # 发起者被取消(例如交互超时),第一个醒来的等待者接替加载,其余等待者合并到新的请求上
+            future = UserCache._inflight.get(key)
+
+        future = asyncio.get_running_loop().create_future()
+        UserCache._inflight[key] = future
+        try:
+            result = await loader()
+        except asyncio.CancelledError:
+            # 只取消发起者自己,不把取消传播给没有被取消的等待者
+            future.set_result(_LEADER_CANCELLED)
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 标记异常已被读取,没有等待者时避免"exception never retrieved"日志
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            UserCache._inflight.pop(key, None)
+
+    @staticmethod
+    def get_stats() -> Dict[str, int]:
+        """返回缓存命中/未命中/合并请求计数的快照"""
+        return dict(UserCache._stats)
 
     @staticmethod
     async def get_user_id(guild_id: int, discord_user_id: int) -> int:
@@ -30,33 +124,70 @@ class UserCache:
         Returns:
             用户内部ID,如果不存在返回None
         """
+        guild_id = int(guild_id)
+        discord_user_id = int(discord_user_id)
         cache_key = f'user:id:{guild_id}:{discord_user_id}'
 
+        # 1. 进程内LRU(不需要任何网络往返)
+        local_id = UserCache._id_lru.get(cache_key)
+        if local_id is not None:
+            UserCache._stats['local_hits'] += 1
+            return local_id
+
         try:
-            # 1. 尝试从Redis获取（异步）
+            # 2. 尝试从Redis获取（异步）
             cached_id = await redis_client.get(cache_key)
+            if cached_id == NEGATIVE_MARKER:
+                UserCache._stats['negative_hits'] += 1
+                return None
             if cached_id is not None:
-                return int(cached_id)
+                UserCache._stats['hits'] += 1
+                user_id = int(cached_id)
+                UserCache._id_lru.set(cache_key, user_id)
+                return user_id
         except Exception as e:
             logger.warning(f"Redis查询失败,降级到数据库: {e}")
 
-        # 2. 缓存未命中,查询数据库
-        supabase = get_connection()
-        result = supabase.table('users').select('id').eq('guild_id', guild_id).eq('discord_user_id', discord_user_id).execute()
+        UserCache._stats['misses'] += 1
 
-        if not result.data:
-            return None
+        async def load():
+            # 3. 缓存未命中,查询数据库
+            supabase = get_connection()
+            result = await async_db.execute(supabase.table('users').select('id').eq('guild_id', guild_id).eq('discord_user_id', discord_user_id))
 
-        user_id = result.data[0]['id']
+            # 4. 写入缓存(存在的用户24小时有效,不存在的用户写入短期负缓存,负缓存不进入LRU)
+            user_id = result.data[0]['id'] if result.data else None
+            if user_id is not None:
+                UserCache._id_lru.set(cache_key, user_id)
+            try:
+                if user_id is None:
+                    await redis_client.setex(cache_key, NEGATIVE_TTL, NEGATIVE_MARKER)
+                else:
+                    await redis_client.setex(cache_key, 86400, user_id)
+            except Exception as e:
+                logger.error(f"Redis写入失败: {e}")
+
+            return user_id
+
+        return await UserCache._single_flight(cache_key, load)
+
+    @staticmethod
+    async def set_user_id(guild_id: int, discord_user_id: int, user_id: int):
+        """
+        写入用户ID映射(新建用户后调用,覆盖可能存在的负缓存)
 
-        # 3. 写入缓存(24小时有效)
+        Args:
+            guild_id: 服务器ID
+            discord_user_id: Discord用户ID
+            user_id: 用户内部ID
+        """
+        cache_key = f'user:id:{int(guild_id)}:{int(discord_user_id)}'
+        UserCache._id_lru.set(cache_key, user_id)
         try:
             await redis_client.setex(cache_key, 86400, user_id)
         except Exception as e:
             logger.error(f"Redis写入失败: {e}")
 
-        return user_id
-
     @staticmethod
     async def get_points(guild_id: int, discord_user_id: int) -> int:
         """
@@ -75,105 +206,263 @@ class UserCache:
             # 1. 尝试从Redis获取（异步）
             cached_points = await redis_client.get(cache_key)
             if cached_points is not None:
+                UserCache._stats['hits'] += 1
                 return int(cached_points)
         except Exception as e:
             logger.warning(f"Redis查询失败,降级到数据库: {e}")
 
-        # 2. 缓存未命中,查询数据库
-        supabase = get_connection()
-        result = supabase.table('users').select('points').eq('guild_id', guild_id).eq('discord_user_id', discord_user_id).execute()
+        UserCache._stats['misses'] += 1
+
+        async def load():
+            # 2. 缓存未命中,查询数据库
+            supabase = get_connection()
+            result = await async_db.execute(supabase.table('users').select('points').eq('guild_id', guild_id).eq('discord_user_id', discord_user_id))
 
-        if not result.data:
-            return 0
+            # 3. 写入缓存(1小时有效;不存在的用户按0分短期缓存)
+            points = result.data[0]['points'] if result.data else 0
+            try:
+                await redis_client.setex(cache_key, 3600 if result.data else NEGATIVE_TTL, points)
+            except Exception as e:
+                logger.error(f"Redis写入失败: {e}")
+
+            return points
+
+        return await UserCache._single_flight(cache_key, load)
+
+    @staticmethod
+    async def _write_points_cache(entries: List[Tuple[int, int, int]]):
+        """
+        在一个Redis事务管道中同时写入积分缓存和排行榜,并递增积分排行榜版本号
 
-        points = result.data[0]['points']
+        一次往返完成,且积分缓存和排行榜不会出现只更新了一半的情况
+
+        Args:
+            entries: [(guild_id, discord_user_id, new_points), ...]
+        """
+        if not entries:
+            return
 
-        # 3. 写入缓存(1小时有效)
         try:
-            await redis_client.setex(cache_key, 3600, points)
+            async with redis_client.pipeline(transaction=True) as pipe:
+                for guild_id, discord_user_id, new_points in entries:
+                    pipe.setex(f'user:points:{guild_id}:{discord_user_id}', 3600, new_points)
+                    pipe.zadd(f'ranking:{guild_id}', {str(discord_user_id): new_points})
+                for guild_id in {entry[0] for entry in entries}:
+                    version_key = LeaderboardCache.version_key(guild_id, 'points')
+                    pipe.incr(version_key)
+                    pipe.expire(version_key, VERSION_TTL)
+                await pipe.execute()
         except Exception as e:
-            logger.error(f"Redis写入失败: {e}")
-
-        return points
+            # 缓存失败不影响业务,记录日志即可
+            logger.error(f"Redis更新积分缓存和排行榜失败: {e}")
 
     @staticmethod
-    async def update_points(guild_id: int, discord_user_id: int, user_id: int, delta: int) -> int:
+    async def _apply_delta_db(user_id: int, delta: int) -> int:
         """
-        更新用户积分(同步更新缓存和数据库)
-
-        使用数据库原子操作避免并发问题
+        在数据库中原子性更新单个用户积分
 
         Args:
-            guild_id: 服务器ID
-            discord_user_id: Discord用户ID
             user_id: 用户内部ID
-            delta: 积分变化量(正数为增加,负数为减少)
+            delta: 积分变化量
 
         Returns:
             更新后的积分值
         """
         supabase = get_connection()
 
-        new_points = None
-
         # 1. 尽量使用RPC完成原子更新
         if UserCache._rpc_supported is not False:
             try:
-                rpc_result = supabase.rpc('atomic_update_points', {
+                rpc_result = await async_db.execute(supabase.rpc('atomic_update_points', {
                     'p_user_id': user_id,
                     'p_delta': delta
-                }).execute()
+                }))
 
                 if rpc_result.data and len(rpc_result.data) > 0 and 'new_points' in rpc_result.data[0]:
-                    new_points = rpc_result.data[0]['new_points']
                     UserCache._rpc_supported = True
-                else:
-                    raise ValueError(f"RPC调用返回空结果: user_id={user_id}")
+                    return rpc_result.data[0]['new_points']
+                raise ValueError(f"RPC调用返回空结果: user_id={user_id}")
             except Exception as rpc_error:
                 if UserCache._rpc_supported is not False:
                     logger.warning(f"RPC调用失败,降级到CAS更新: {rpc_error}")
                 UserCache._rpc_supported = False
 
         # 2. RPC不可用时,使用CAS重试避免并发丢失
-        if new_points is None:
-            max_attempts = 5
-            for attempt in range(1, max_attempts + 1):
-                result = supabase.table('users').select('points').eq('id', user_id).execute()
+        max_attempts = 5
+        for attempt in range(1, max_attempts + 1):
+            result = await async_db.execute(supabase.table('users').select('points').eq('id', user_id))
 
-                if not result.data:
-                    raise ValueError(f"用户不存在: user_id={user_id}")
+            if not result.data:
+                raise ValueError(f"用户不存在: user_id={user_id}")
 
-                current_points = result.data[0]['points']
-                candidate_points = max(0, current_points + delta)
+            current_points = result.data[0]['points']
+            candidate_points = max(0, current_points + delta)
 
-                update_result = supabase.table('users').update({
-                    'points': candidate_points
-                }).eq('id', user_id).eq('points', current_points).execute()
+            update_result = await async_db.execute(supabase.table('users').update({
+                'points': candidate_points
+            }).eq('id', user_id).eq('points', current_points))
 
-                if update_result.data:
-                    new_points = candidate_points
-                    break
+            if update_result.data:
+                return candidate_points
 
-                if attempt == max_attempts:
-                    raise ValueError(f"积分更新冲突过多,请稍后重试: user_id={user_id}")
+            if attempt == max_attempts:
+                raise ValueError(f"积分更新冲突过多,请稍后重试: user_id={user_id}")
 
-                # 等待片刻再尝试,让其他事务完成
-                await asyncio.sleep(0.05)
+            # 等待片刻再尝试,让其他事务完成
+            await asyncio.sleep(0.05)
 
-        # 2. 更新缓存（异步）
-        cache_key = f'user:points:{guild_id}:{discord_user_id}'
-        try:
-            await redis_client.setex(cache_key, 3600, new_points)
-        except Exception as e:
-            logger.error(f"Redis更新失败: {e}")
-            # 缓存失败不影响业务,记录日志即可
+    @staticmethod
+    async def update_points(guild_id: int, discord_user_id: int, user_id: int, delta: int) -> int:
+        """
+        更新用户积分(同步更新缓存和数据库)
 
-        # 3. 更新排行榜(如果已实现)
-        try:
-            ranking_key = f'ranking:{guild_id}'
-            await redis_client.zadd(ranking_key, {str(discord_user_id): new_points})
-        except Exception as e:
-            logger.error(f"排行榜更新失败: {e}")
+        使用数据库原子操作避免并发问题
+
+        Args:
+            guild_id: 服务器ID
+            discord_user_id: Discord用户ID
+            user_id: 用户内部ID
+            delta: 积分变化量(正数为增加,负数为减少)
+
+        Returns:
+            更新后的积分值
+        """
+        new_points = await UserCache._apply_delta_db(user_id, delta)
+
+        # 积分缓存和排行榜一次往返更新
+        await UserCache._write_points_cache([(guild_id, discord_user_id, new_points)])
+
+        return new_points
+
+    @staticmethod
+    async def apply_deltas(deltas: List[Tuple[int, int, int, int]]) -> Dict[int, int]:
+        """
+        批量更新多个用户的积分
+
+        数据库侧一次RPC往返(atomic_apply_deltas),缓存侧一次Redis管道往返。
+        同一用户出现多次时会先合并变化量。
+        只有RPC不存在时才降级为逐个更新,其他错误直接抛出,避免重复加减积分。
+
+        Args:
+            deltas: [(guild_id, discord_user_id, user_id, delta), ...]
+
+        Returns:
+            {user_id: 更新后的积分值}
+        """
+        if not deltas:
+            return {}
+
+        # 合并同一用户的变化量,记录用户对应的缓存键
+        merged: Dict[int, int] = {}
+        owners: Dict[int, Tuple[int, int]] = {}
+        for guild_id, discord_user_id, user_id, delta in deltas:
+            merged[user_id] = merged.get(user_id, 0) + delta
+            owners[user_id] = (guild_id, discord_user_id)
+
+        new_points: Dict[int, int] = {}
+
+        # 1. 尽量使用批量RPC在一条语句内完成
+        if UserCache._batch_rpc_supported is not False:
+            try:
+                supabase = get_connection()
+                user_ids = list(merged)
+                rpc_result = await async_db.execute(supabase.rpc('atomic_apply_deltas', {
+                    'p_user_ids': user_ids,
+                    'p_deltas': [merged[user_id] for user_id in user_ids]
+                }))
+
+                if not rpc_result.data:
+                    raise ValueError(f"RPC调用返回空结果: user_ids={user_ids}")
+
+                UserCache._batch_rpc_supported = True
+                new_points = {row['user_id']: row['new_points'] for row in rpc_result.data}
+            except Exception as rpc_error:
+                if not _is_missing_function(rpc_error):
+                    raise
+                logger.warning(f"数据库未部署atomic_apply_deltas,降级到逐个更新: {rpc_error}")
+                UserCache._batch_rpc_supported = False
+
+        # 2. RPC不可用时,并发执行单用户原子更新
+        if not new_points:
+            user_ids = list(merged)
+            results = await asyncio.gather(
+                *(UserCache._apply_delta_db(user_id, merged[user_id]) for user_id in user_ids)
+            )
+            new_points = dict(zip(user_ids, results))
+
+        # 3. 积分缓存和排行榜一次往返更新
+        await UserCache._write_points_cache([
+            (*owners[user_id], points) for user_id, points in new_points.items()
+        ])
+
+        return new_points
+
+    @staticmethod
+    async def settle_draw(guild_id: int, discord_user_id: int, user_id: int,
+                          count: int, cost: int, reward_total: int,
+                          draw_date, paid_draws_today: int) -> Optional[int]:
+        """
+        一次性结算批量抽奖(扣费 + 奖励 + 当日抽奖状态)
+
+        优先调用draw_batch RPC在一个事务内完成,RPC不存在时降级为
+        update_points净变化量 + 一次users更新;其他错误直接抛出,避免重复扣费
+
+        Args:
+            guild_id: 服务器ID
+            discord_user_id: Discord用户ID
+            user_id: 用户内部ID
+            count: 抽奖次数
+            cost: 单次抽奖费用(免费抽奖为0)
+            reward_total: 本次所有奖励积分之和
+            draw_date: 抽奖日期(美东时间)
+            paid_draws_today: 结算后的今日付费抽奖次数
+
+        Returns:
+            更新后的积分值,余额不足时返回None
+        """
+        supabase = get_connection()
+        new_points = None
+
+        # 1. 尽量使用RPC在一次往返内完成校验和结算
+        if UserCache._draw_batch_supported is not False:
+            try:
+                rpc_result = await async_db.execute(supabase.rpc('draw_batch', {
+                    'p_user_id': user_id,
+                    'p_count': count,
+                    'p_cost': cost,
+                    'p_reward_total': reward_total,
+                    'p_draw_date': str(draw_date),
+                    'p_paid_draws_today': paid_draws_today
+                }))
+
+                if not rpc_result.data:
+                    raise ValueError(f"RPC调用返回空结果: user_id={user_id}")
+
+                UserCache._draw_batch_supported = True
+                row = rpc_result.data[0]
+                if not row['success']:
+                    return None
+                new_points = row['new_points']
+            except Exception as rpc_error:
+                if not _is_missing_function(rpc_error):
+                    raise
+                logger.warning(f"数据库未部署draw_batch,降级到逐步更新: {rpc_error}")
+                UserCache._draw_batch_supported = False
+
+        # 2. RPC不可用时,按净变化量更新积分(内部已更新缓存和排行榜)
+        if new_points is None:
+            new_points = await UserCache.update_points(
+                guild_id, discord_user_id, user_id, reward_total - count * cost
+            )
+            await async_db.execute(supabase.table('users').update({
+                'last_draw_date': str(draw_date),
+                'paid_draws_today': paid_draws_today,
+                'last_paid_draw_date': str(draw_date)
+            }).eq('id', user_id))
+            return new_points
+
+        # 3. 积分缓存和排行榜一次往返更新
+        await UserCache._write_points_cache([(guild_id, discord_user_id, new_points)])
 
         return new_points
 
@@ -201,8 +490,84 @@ class UserCache:
             guild_id: 服务器ID
             discord_user_id: Discord用户ID
         """
-        cache_key = f'user:id:{guild_id}:{discord_user_id}'
+        cache_key = f'user:id:{int(guild_id)}:{int(discord_user_id)}'
+        UserCache._id_lru.pop(cache_key)
         try:
             await redis_client.delete(cache_key)
         except Exception as e:
             logger.error(f"删除缓存失败: {e}")
+
+
+# 失效订阅的轮询间隔(秒),需小于Redis客户端的socket_timeout
+SUBSCRIBE_POLL_TIMEOUT = 1.0
+
+
+class InvalidationBus:
+    """基于Redis pub/sub的跨进程缓存失效通知(每个进程一个订阅连接)"""
+
+    # 频道 -> 处理函数(参数为消息内容)
+    _handlers: Dict[str, Callable[[str], None]] = {}
+    _task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def register(channel: str, handler: Callable[[str], None]):
+        """
+        注册失效通知处理函数(需在start之前调用)
+
+        Args:
+            channel: Redis频道名
+            handler: 收到消息时调用的同步函数
+        """
+        InvalidationBus._handlers[channel] = handler
+
+    @staticmethod
+    async def publish(channel: str, message: str):
+        """
+        广播失效通知(本进程也会收到)
+
+        Args:
+            channel: Redis频道名
+            message: 消息内容
+        """
+        try:
+            await redis_client.publish(channel, message)
+        except Exception as e:
+            logger.error(f"发布缓存失效通知失败: {e}")
+
+    @staticmethod
+    def start():
+        """启动订阅任务(重复调用无副作用)"""
+        if InvalidationBus._task is None or InvalidationBus._task.done():
+            InvalidationBus._task = asyncio.create_task(InvalidationBus._listen())
+
+    @staticmethod
+    async def _listen():
+        """订阅所有已注册频道,断线后自动重连"""
+        while True:
+            pubsub = redis_client.pubsub()
+            try:
+                await pubsub.subscribe(*InvalidationBus._handlers)
+                while True:
+                    # 共享连接池设置了socket_timeout,阻塞式listen()在没有消息时会超时断开;
+                    # 改为短超时轮询,无消息时返回None属于正常情况
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=SUBSCRIBE_POLL_TIMEOUT
+                    )
+                    if message is None or message.get('type') != 'message':
+                        continue
+                    handler = InvalidationBus._handlers.get(message['channel'])
+                    if handler:
+                        try:
+                            handler(message['data'])
+                        except Exception as e:
+                            logger.error(f"处理缓存失效通知失败: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"缓存失效订阅中断,5秒后重连: {e}")
+                await asyncio.sleep(5)
+            finally:
+                try:
+                    await pubsub.reset()
+                except Exception:
+                    pass
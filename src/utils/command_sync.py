@@ -0,0 +1,102 @@
+"""
+斜杠命令同步
+对已注册的命令树(含本地化名称/描述)计算稳定哈希并保存在Redis中,
+只有命令树发生变化时才调用受速率限制的全局 tree.sync()。
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, Optional
+
+from src.db.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+# 设置为1时忽略哈希强制同步(例如在Discord后台手动删除过命令)
+FORCE_COMMAND_SYNC = os.getenv("FORCE_COMMAND_SYNC", "0") == "1"
+
+_LOCALIZATION_ATTRS = ('name_localizations', 'description_localizations')
+
+
+def _localizations(obj) -> Dict[str, Any]:
+    """读取手动设置在命令/参数上的本地化字典"""
+    result = {}
+    for attr in _LOCALIZATION_ATTRS:
+        value = getattr(obj, attr, None)
+        if value:
+            result[attr] = {str(locale): text for locale, text in dict(value).items()}
+    return result
+
+
+def _command_payload(command, tree) -> Dict[str, Any]:
+    """生成单个命令(或命令组)的可比较描述"""
+    try:
+        payload = command.to_dict(tree)
+    except TypeError:
+        # 旧版discord.py的to_dict不接受tree参数
+        payload = command.to_dict()
+
+    payload['_localizations'] = _localizations(command)
+    parameters = getattr(command, 'parameters', None) or []
+    payload['_parameter_localizations'] = {
+        param.name: _localizations(param) for param in parameters
+    }
+    subcommands = getattr(command, 'commands', None) or []
+    payload['_subcommands'] = sorted(
+        (_command_payload(sub, tree) for sub in subcommands),
+        key=lambda item: item.get('name', '')
+    )
+    return payload
+
+
+def compute_tree_hash(tree) -> str:
+    """
+    计算全局命令树的哈希
+
+    Args:
+        tree: discord.app_commands.CommandTree
+
+    Returns:
+        sha256十六进制字符串,与命令注册顺序无关
+    """
+    commands = sorted(
+        (_command_payload(command, tree) for command in tree.get_commands()),
+        key=lambda item: (item.get('type', 1), item.get('name', ''))
+    )
+    encoded = json.dumps(commands, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def _hash_key(application_id) -> str:
+    return f'command_tree:hash:{application_id}'
+
+
+async def sync_if_changed(bot) -> Optional[int]:
+    """
+    命令树变化时才同步到Discord
+
+    Args:
+        bot: 已注册全部斜杠命令的机器人实例
+
+    Returns:
+        同步的命令数量;哈希未变化而跳过时返回None
+    """
+    tree_hash = compute_tree_hash(bot.tree)
+    key = _hash_key(bot.application_id)
+
+    if not FORCE_COMMAND_SYNC:
+        try:
+            if await redis_client.get(key) == tree_hash:
+                return None
+        except Exception as e:
+            logger.warning(f"读取命令树哈希失败,直接同步: {e}")
+
+    synced = await bot.tree.sync()
+
+    try:
+        await redis_client.set(key, tree_hash)
+    except Exception as e:
+        logger.error(f"保存命令树哈希失败: {e}")
+
+    return len(synced)
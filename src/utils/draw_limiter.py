@@ -4,12 +4,111 @@
 """
 from src.db.redis_client import redis_client
 from src.utils.helpers import now_est, EASTERN_TZ
+from src.config.config import DRAW_STATE_STORAGE
 from datetime import datetime, timedelta
+from typing import NamedTuple, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+class DrawReservation(NamedTuple):
+    """reserve_draws的结果"""
+    free: bool          # 本次为免费抽奖(已标记为已使用)
+    free_pending: bool  # 免费抽奖尚未使用但请求了多次,未做任何修改
+    granted: int        # 预占成功的付费抽奖次数
+    paid_count: int     # 预占后今日付费抽奖总次数
+
+
+# 抽奖状态读写的Lua辅助函数
+# field为空字符串时使用每用户独立key(keys模式),否则使用服务器级hash的字段(hash模式)
+_STATE_LUA_HELPERS = """
+local function state_get(key, field)
+    if field == '' then
+        return redis.call('GET', key)
+    end
+    return redis.call('HGET', key, field)
+end
+
+local function state_exists(key, field)
+    if field == '' then
+        return redis.call('EXISTS', key)
+    end
+    return redis.call('HEXISTS', key, field)
+end
+
+local function state_set(key, field, value, ttl)
+    if field == '' then
+        if ttl then
+            redis.call('SET', key, value, 'EX', ttl)
+        else
+            redis.call('SET', key, value, 'KEEPTTL')
+        end
+    else
+        redis.call('HSET', key, field, value)
+        if ttl then
+            redis.call('EXPIRE', key, ttl)
+        end
+    end
+end
+
+local function state_delete(key, field)
+    if field == '' then
+        return redis.call('DEL', key)
+    end
+    return redis.call('HDEL', key, field)
+end
+"""
+
+# 免费抽奖判断 + 付费次数预占
+# KEYS[1]=免费抽奖标记 KEYS[2]=付费抽奖计数
+# ARGV[1]=免费抽奖字段 ARGV[2]=付费计数字段
+# ARGV[3]=请求次数 ARGV[4]=每日上限 ARGV[5]=到美东午夜的TTL
+# 返回 {free(1免费/-1需先免费/0付费), 预占次数, 预占后付费总次数}
+RESERVE_DRAWS_SCRIPT = _STATE_LUA_HELPERS + """
+local requested = tonumber(ARGV[3])
+local max_draws = tonumber(ARGV[4])
+local ttl = tonumber(ARGV[5])
+
+local current = tonumber(state_get(KEYS[2], ARGV[2]) or '0')
+
+if state_exists(KEYS[1], ARGV[1]) == 0 then
+    if requested > 1 then
+        return {-1, 0, current}
+    end
+    state_set(KEYS[1], ARGV[1], '1', ttl)
+    return {1, 0, current}
+end
+
+local granted = math.min(requested, max_draws - current)
+if granted <= 0 then
+    return {0, 0, current}
+end
+
+local new_count = current + granted
+state_set(KEYS[2], ARGV[2], new_count, ttl)
+return {0, granted, new_count}
+"""
+
+# 归还预占额度
+# ARGV[1]=免费抽奖字段 ARGV[2]=付费计数字段
+# ARGV[3]=是否归还免费抽奖 ARGV[4]=归还的付费次数
+RELEASE_DRAWS_SCRIPT = _STATE_LUA_HELPERS + """
+if tonumber(ARGV[3]) == 1 then
+    state_delete(KEYS[1], ARGV[1])
+end
+
+local amount = tonumber(ARGV[4])
+if amount > 0 then
+    local current = state_get(KEYS[2], ARGV[2])
+    if current then
+        state_set(KEYS[2], ARGV[2], math.max(0, tonumber(current) - amount), nil)
+    end
+end
+return 1
+"""
+
+
 class DrawLimiter:
     """抽奖限流控制器（异步版本）"""
 
@@ -32,53 +131,49 @@ class DrawLimiter:
         return max(1, int((tomorrow_midnight - now).total_seconds()))
 
     @staticmethod
-    async def check_free_draw_available(guild_id: int, discord_user_id: int) -> bool:
+    def _state_location(kind: str, guild_id: int, discord_user_id: int) -> Tuple[str, str]:
         """
-        检查今日免费抽奖是否可用
+        计算抽奖状态的存储位置
+
+        - keys模式: draw:{kind}:{guild}:{user}:{date} 独立key,字段为空
+        - hash模式: draw:{kind}:{guild}:{date} 服务器级hash,字段为用户ID
 
         Args:
+            kind: 'free' 或 'paid'
             guild_id: 服务器ID
             discord_user_id: Discord用户ID
 
         Returns:
-            True表示可以抽奖,False表示今天已经抽过
+            (key, field)
         """
-        try:
-            today = now_est().date()
-            key = f'draw:free:{guild_id}:{discord_user_id}:{today}'
-
-            # 如果key存在,说明今天已抽过（异步）
-            return await redis_client.exists(key) == 0
-        except Exception as e:
-            logger.error(f"检查免费抽奖失败: {e}")
-            # Redis失败时,返回True允许抽奖(降级策略)
-            return True
+        today = now_est().date()
+        if DRAW_STATE_STORAGE == 'hash':
+            return f'draw:{kind}:{guild_id}:{today}', str(discord_user_id)
+        return f'draw:{kind}:{guild_id}:{discord_user_id}:{today}', ''
 
     @staticmethod
-    async def mark_free_draw_used(guild_id: int, discord_user_id: int) -> bool:
+    async def check_free_draw_available(guild_id: int, discord_user_id: int) -> bool:
         """
-        标记今日免费抽奖已使用
+        检查今日免费抽奖是否可用
 
         Args:
             guild_id: 服务器ID
             discord_user_id: Discord用户ID
 
         Returns:
-            是否成功标记
+            True表示可以抽奖,False表示今天已经抽过
         """
         try:
-            today = now_est().date()
-            key = f'draw:free:{guild_id}:{discord_user_id}:{today}'
-
-            # 计算到次日0点的秒数
-            ttl = DrawLimiter.get_ttl_to_midnight_est()
+            key, field = DrawLimiter._state_location('free', guild_id, discord_user_id)
 
-            # 设置标记,自动过期（异步）
-            await redis_client.setex(key, ttl, '1')
-            return True
+            # 如果标记存在,说明今天已抽过（异步）
+            if field:
+                return not await redis_client.hexists(key, field)
+            return await redis_client.exists(key) == 0
         except Exception as e:
-            logger.error(f"标记免费抽奖失败: {e}")
-            return False
+            logger.error(f"检查免费抽奖失败: {e}")
+            # Redis失败时,返回True允许抽奖(降级策略)
+            return True
 
     @staticmethod
     async def get_paid_draw_count(guild_id: int, discord_user_id: int) -> int:
@@ -93,65 +188,79 @@ class DrawLimiter:
             今日已抽奖次数
         """
         try:
-            today = now_est().date()
-            key = f'draw:paid:{guild_id}:{discord_user_id}:{today}'
+            key, field = DrawLimiter._state_location('paid', guild_id, discord_user_id)
 
-            count = await redis_client.get(key)
+            count = await (redis_client.hget(key, field) if field else redis_client.get(key))
             return int(count) if count else 0
         except Exception as e:
             logger.error(f"获取付费抽奖次数失败: {e}")
             return 0
 
     @staticmethod
-    async def increment_paid_draw(guild_id: int, discord_user_id: int, max_draws: int = 20) -> bool:
+    async def reserve_draws(guild_id: int, discord_user_id: int, requested: int, max_draws: int = 20) -> DrawReservation:
         """
-        增加付费抽奖计数,返回是否成功(是否已达上限)
+        一次Redis往返完成抽奖额度判断和预占
+
+        - 今日免费抽奖未使用且只抽1次: 直接标记免费抽奖已使用
+        - 今日免费抽奖未使用但请求多次: 不做任何修改,提示先完成免费抽奖
+        - 否则: 原子性预占 min(requested, 剩余次数) 次付费抽奖
 
         Args:
             guild_id: 服务器ID
             discord_user_id: Discord用户ID
-            max_draws: 每日最大抽奖次数
+            requested: 请求的抽奖次数
+            max_draws: 每日最大付费抽奖次数
 
         Returns:
-            True表示成功增加计数,False表示已达上限
+            DrawReservation
+
+        Raises:
+            Redis异常: 无法确认额度时直接失败,不绕过每日付费抽奖上限
         """
         try:
-            today = now_est().date()
-            key = f'draw:paid:{guild_id}:{discord_user_id}:{today}'
-
-            # 使用Lua脚本确保原子性
-            lua_script = """
-            local key = KEYS[1]
-            local max_draws = tonumber(ARGV[1])
-            local ttl = tonumber(ARGV[2])
-
-            local current = redis.call('GET', key)
-            if current == false then
-                current = 0
-            else
-                current = tonumber(current)
-            end
-
-            if current >= max_draws then
-                return -1  -- 已达上限
-            end
-
-            local new_count = current + 1
-            redis.call('SET', key, new_count, 'EX', ttl)
-            return new_count
-            """
-
-            # 计算TTL
+            free_key, free_field = DrawLimiter._state_location('free', guild_id, discord_user_id)
+            paid_key, paid_field = DrawLimiter._state_location('paid', guild_id, discord_user_id)
             ttl = DrawLimiter.get_ttl_to_midnight_est()
 
-            # 执行脚本（异步）
-            result = await redis_client.eval(lua_script, 1, key, max_draws, ttl)
+            free, granted, paid_count = await redis_client.eval(
+                RESERVE_DRAWS_SCRIPT, 2, free_key, paid_key,
+                free_field, paid_field, requested, max_draws, ttl
+            )
+            return DrawReservation(
+                free=free == 1,
+                free_pending=free == -1,
+                granted=int(granted),
+                paid_count=int(paid_count)
+            )
+        except Exception as e:
+            logger.error(f"预占抽奖额度失败: {e}")
+            # Redis是每日额度的唯一记录,无法预占时拒绝抽奖,
+            # 否则既会绕过上限,也会把数据库中的paid_draws_today覆盖为本次请求数
+            raise
 
-            return result != -1  # -1表示失败,其他表示成功
+    @staticmethod
+    async def release_draws(guild_id: int, discord_user_id: int, reservation: DrawReservation):
+        """
+        归还预占的抽奖额度(用户取消或结算失败时调用)
+
+        Args:
+            guild_id: 服务器ID
+            discord_user_id: Discord用户ID
+            reservation: reserve_draws返回的预占结果
+        """
+        if not reservation.free and reservation.granted <= 0:
+            return
+
+        try:
+            free_key, free_field = DrawLimiter._state_location('free', guild_id, discord_user_id)
+            paid_key, paid_field = DrawLimiter._state_location('paid', guild_id, discord_user_id)
+
+            await redis_client.eval(
+                RELEASE_DRAWS_SCRIPT, 2, free_key, paid_key,
+                free_field, paid_field, 1 if reservation.free else 0, reservation.granted
+            )
         except Exception as e:
-            logger.error(f"增加付费抽奖计数失败: {e}")
-            # Redis失败时,返回True允许抽奖(降级策略)
-            return True
+            logger.error(f"归还抽奖额度失败: {e}")
 
     @staticmethod
     async def get_egg_pity_count(guild_id: int, discord_user_id: int) -> int:
@@ -0,0 +1,262 @@
+"""
+经济系统蒙特卡洛模拟
+使用NumPy向量化模拟积分抽奖、抽蛋(50抽保底)和传说蛋孵化保底,
+计算期望收益、方差、卡方拟合优度以及首个SSR的期望花费。
+
+积分抽奖通过与 !draw 相同的 RewardSampler 别名表采样,
+卡方检验因此验证的是线上实际使用的采样器,而不是NumPy自身。
+
+本模块只依赖NumPy和标准库,所有配置都以参数传入,
+因此可以在独立的工作进程中运行而不会阻塞机器人事件循环。
+"""
+import math
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.utils.process_pool import SpawnPool
+from src.utils.reward_sampler import RewardSampler
+
+# 稀有度顺序与EggCommands中的概率排序保持一致
+RARITIES = ['SSR', 'SR', 'R', 'C']
+_SSR = 0
+
+# 单次模拟的分块大小,避免千万级抽奖一次性占用过多内存
+_CHUNK_SIZE = 1_000_000
+
+
+def chi_square_p_value(statistic: float, dof: int) -> float:
+    """
+    卡方分布右尾概率(Wilson-Hilferty近似,避免引入SciPy)
+
+    Args:
+        statistic: 卡方统计量
+        dof: 自由度
+
+    Returns:
+        p值
+    """
+    if dof <= 0:
+        return 1.0
+    if statistic <= 0:
+        return 1.0
+    z = ((statistic / dof) ** (1 / 3) - (1 - 2 / (9 * dof))) / math.sqrt(2 / (9 * dof))
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def simulate_rewards(rewards: Sequence[Dict[str, Any]], n: int,
+                     cost: int, seed: Optional[int] = None) -> Dict[str, Any]:
+    """
+    模拟积分抽奖(使用线上抽奖的别名表采样器)
+
+    Args:
+        rewards: 奖励表,每项包含points和probability(百分比,无需归一化)
+        n: 模拟抽奖次数
+        cost: 单次付费抽奖费用
+        seed: 随机种子
+
+    Returns:
+        包含各奖励次数、期望值、方差和卡方检验结果的字典
+    """
+    rng = np.random.default_rng(seed)
+    sampler = RewardSampler(rewards, rng)
+    values = np.asarray([reward['points'] for reward in rewards], dtype=np.float64)
+    # 期望分布取配置中的概率,与采样器的别名表相互独立
+    probs = np.asarray(sampler.probabilities, dtype=np.float64)
+
+    counts = np.zeros(len(values), dtype=np.int64)
+    remaining = n
+    while remaining > 0:
+        size = min(remaining, _CHUNK_SIZE)
+        counts += np.bincount(sampler.sample_indices(size), minlength=len(values))
+        remaining -= size
+
+    # 由次数直接计算样本均值和方差,无需保留每次抽奖结果
+    mean = float((counts * values).sum() / n)
+    variance = float((counts * (values - mean) ** 2).sum() / max(1, n - 1))
+
+    expected_counts = probs * n
+    mask = expected_counts > 0
+    chi_square = float((((counts - expected_counts) ** 2)[mask] / expected_counts[mask]).sum())
+    dof = int(mask.sum()) - 1
+
+    theoretical_mean = float((probs * values).sum())
+    theoretical_variance = float((probs * (values - theoretical_mean) ** 2).sum())
+
+    return {
+        'n': n,
+        'counts': counts.tolist(),
+        'mean_reward': mean,
+        'ev_per_paid_draw': mean - cost,
+        'variance': variance,
+        'std': math.sqrt(variance),
+        'theoretical_ev': theoretical_mean - cost,
+        'theoretical_variance': theoretical_variance,
+        'chi_square': chi_square,
+        'dof': dof,
+        'p_value': chi_square_p_value(chi_square, dof),
+    }
+
+
+def _cumulative_table(probabilities: Sequence[Tuple[str, float]]) -> Tuple[np.ndarray, np.ndarray]:
+    """将[(rarity, probability%), ...]转换为累积概率表和稀有度下标"""
+    cumulative = np.cumsum([float(p) for _, p in probabilities]) if probabilities else np.zeros(0)
+    indices = np.asarray([RARITIES.index(r) for r, _ in probabilities], dtype=np.int8)
+    return cumulative, indices
+
+
+def _sample_rarity(rng: np.random.Generator, cumulative: np.ndarray, indices: np.ndarray,
+                   size: int, fallback) -> np.ndarray:
+    """
+    按累积概率抽取稀有度,与游戏中的 rand < cumulative 逻辑一致
+
+    概率之和不足100%时,落在剩余区间的结果使用fallback(可以是数组)
+    """
+    rand = rng.random(size) * 100
+    slot = np.searchsorted(cumulative, rand, side='right')
+    result = np.broadcast_to(np.asarray(fallback, dtype=np.int8), (size,)).copy()
+    hit = slot < len(cumulative)
+    result[hit] = indices[slot[hit]]
+    return result
+
+
+def simulate_eggs(draw_probabilities: Sequence[Tuple[str, float]],
+                  hatch_probabilities: Dict[str, Sequence[Tuple[str, float]]],
+                  players: int, pulls: int, single_cost: int,
+                  pity_limit: int = 50, max_pulls: int = 1000,
+                  seed: Optional[int] = None) -> Dict[str, Any]:
+    """
+    模拟抽蛋与孵化,并统计首个SSR的花费
+
+    每个模拟玩家从0保底开始连续单抽,抽到的蛋按顺序孵化:
+    - 抽蛋保底: 保底计数达到 pity_limit-1 时必出SSR蛋(与draw_eggs_with_pity一致)
+    - 传说蛋孵化保底: 传说蛋孵化未出SSR后,下一次必出SSR(与handle_egg_claim一致)
+
+    Args:
+        draw_probabilities: 抽蛋概率 [(rarity, probability%), ...]
+        hatch_probabilities: 各蛋稀有度的孵化概率 {egg_rarity: [(pet_rarity, probability%), ...]}
+        players: 模拟玩家数
+        pulls: 统计稀有度分布的抽数
+        single_cost: 单抽费用
+        pity_limit: 保底抽数
+        max_pulls: 首个SSR宠物统计的最大抽数
+        seed: 随机种子
+
+    Returns:
+        包含蛋/宠物稀有度分布、保底触发次数和首个SSR期望花费的字典
+    """
+    rng = np.random.default_rng(seed)
+    draw_cumulative, draw_indices = _cumulative_table(draw_probabilities)
+    hatch_tables = {
+        RARITIES.index(rarity): _cumulative_table(table)
+        for rarity, table in hatch_probabilities.items()
+        if rarity in RARITIES
+    }
+
+    pity = np.zeros(players, dtype=np.int32)
+    legendary_pity = np.zeros(players, dtype=np.int32)
+    first_ssr_egg = np.full(players, -1, dtype=np.int32)
+    first_ssr_pet = np.full(players, -1, dtype=np.int32)
+
+    egg_counts = np.zeros(len(RARITIES), dtype=np.int64)
+    pet_counts = np.zeros(len(RARITIES), dtype=np.int64)
+    egg_pity_triggers = 0
+    legendary_pity_triggers = 0
+    max_streak = 0
+
+    step = 0
+    while step < max_pulls and (step < pulls or (first_ssr_pet < 0).any()):
+        # 抽蛋(含50抽保底)
+        forced = pity >= pity_limit - 1
+        eggs = _sample_rarity(rng, draw_cumulative, draw_indices, players, RARITIES.index('C'))
+        eggs[forced] = _SSR
+        is_ssr_egg = eggs == _SSR
+        max_streak = max(max_streak, int(pity.max()) + 1)
+        pity = np.where(is_ssr_egg, 0, pity + 1)
+
+        # 孵化(传说蛋保底)
+        pets = eggs.copy()
+        for egg_rarity, (cumulative, indices) in hatch_tables.items():
+            mask = eggs == egg_rarity
+            if mask.any():
+                pets[mask] = _sample_rarity(rng, cumulative, indices, int(mask.sum()), egg_rarity)
+
+        forced_hatch = is_ssr_egg & (legendary_pity >= 1)
+        pets[forced_hatch] = _SSR
+        legendary_pity = np.where(
+            is_ssr_egg,
+            np.where(pets == _SSR, 0, legendary_pity + 1),
+            legendary_pity
+        )
+
+        if step < pulls:
+            egg_counts += np.bincount(eggs, minlength=len(RARITIES))
+            pet_counts += np.bincount(pets, minlength=len(RARITIES))
+            egg_pity_triggers += int(forced.sum())
+            legendary_pity_triggers += int(forced_hatch.sum())
+
+        first_ssr_egg[(first_ssr_egg < 0) & is_ssr_egg] = step + 1
+        first_ssr_pet[(first_ssr_pet < 0) & (pets == _SSR)] = step + 1
+        step += 1
+
+    found = first_ssr_pet > 0
+    pulls_to_pet = first_ssr_pet[found]
+
+    return {
+        'players': players,
+        'pulls': pulls,
+        'egg_distribution': {r: int(c) for r, c in zip(RARITIES, egg_counts)},
+        'pet_distribution': {r: int(c) for r, c in zip(RARITIES, pet_counts)},
+        'egg_pity_triggers': egg_pity_triggers,
+        'legendary_pity_triggers': legendary_pity_triggers,
+        'max_pity_streak': max_streak,
+        'expected_pulls_to_ssr_egg': float(first_ssr_egg.mean()),
+        'expected_cost_to_ssr_egg': float(first_ssr_egg.mean()) * single_cost,
+        'expected_pulls_to_ssr_pet': float(pulls_to_pet.mean()) if found.any() else None,
+        'expected_cost_to_ssr_pet': float(pulls_to_pet.mean()) * single_cost if found.any() else None,
+        'ssr_pet_not_found': int((~found).sum()),
+    }
+
+
+def run_economy_report(params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    运行完整的经济模拟(在工作进程中调用)
+
+    Args:
+        params: 由调用方组装的纯数据参数,包含 rewards/egg 两部分
+
+    Returns:
+        {'rewards': ..., 'eggs': ...}
+    """
+    report = {'rewards': simulate_rewards(**params['rewards'])}
+    if params.get('eggs'):
+        report['eggs'] = simulate_eggs(**params['eggs'])
+    return report
+
+
+# 模拟专用的进程池(单个工作进程)
+_pool = SpawnPool(1)
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """获取模拟专用的进程池(延迟创建)"""
+    return _pool.get_executor()
+
+
+def shutdown_executor(wait: bool = True):
+    """关闭模拟进程池"""
+    _pool.shutdown(wait=wait)
+
+
+async def run_in_worker(params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    在工作进程中运行经济模拟
+
+    Args:
+        params: 传给run_economy_report的参数
+
+    Returns:
+        模拟报告
+    """
+    return await _pool.run(run_economy_report, params)
@@ -3,11 +3,15 @@
 包含经验计算、等级管理、饱食度管理等功能
 """
 
+import bisect
+import functools
+import itertools
 import random
 import math
 from datetime import datetime, timezone
 from typing import Dict, List, Optional, Tuple
 from enum import Enum
+from src.db import async_db
 from src.utils.i18n import get_localized_food_name, get_localized_pet_name, get_default_locale
 
 class FlavorType(Enum):
@@ -44,22 +48,49 @@ class FeedingSystem:
     XP_BASE = 20           # 基础经验需求
     XP_GROWTH_POW = 1.45    # 成长指数
     XP_STEP = 2            # 步进值
+    MAX_LEVEL = 200        # 查表的最高等级(经验足够时等级为 MAX_LEVEL + 1,与原逐级累加实现一致)
+
+    # 类定义后由 build_xp_tables 生成的不可变查表:
+    # _XP_REQUIREMENTS[l]: 从l级升到l+1级所需经验(l = 0..MAX_LEVEL+1)
+    # _XP_CUMULATIVE[l-1]: 达到l级的累计总经验(l = 1..MAX_LEVEL+1),严格递增,可直接二分查找
+    _XP_REQUIREMENTS: Tuple[int, ...] = ()
+    _XP_CUMULATIVE: Tuple[int, ...] = ()
+
+    @staticmethod
+    def _xp_requirement_formula(current_level: int) -> int:
+        """XP_Require(current_level) = Base * (current_level^GrowthPow) + Step * current_level"""
+        base = FeedingSystem.XP_BASE
+        growth_pow = FeedingSystem.XP_GROWTH_POW
+        step = FeedingSystem.XP_STEP
+
+        return round(base * (current_level ** growth_pow) + step * current_level)
+
+    @staticmethod
+    def build_xp_tables() -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+        """
+        按当前经验参数生成 (每级升级需求, 累计经验) 查表
+
+        Returns:
+            (_XP_REQUIREMENTS, _XP_CUMULATIVE)
+        """
+        top_level = FeedingSystem.MAX_LEVEL + 1
+        requirements = [0] + [FeedingSystem._xp_requirement_formula(level) for level in range(1, top_level + 1)]
+        cumulative = list(itertools.accumulate(requirements[1:top_level], initial=0))
+        return tuple(requirements), tuple(cumulative)
 
     @staticmethod
     def calculate_level_xp_requirement(current_level: int) -> int:
         """
         计算从当前等级升级到下一等级所需的经验值
         例如：输入1，返回从1级升到2级需要的经验
-        基于公式: XP_Require(current_level) = Base * ((current_level+1)^GrowthPow) + Step * current_level
         """
         if current_level < 1:
             return 0
 
-        base = FeedingSystem.XP_BASE
-        growth_pow = FeedingSystem.XP_GROWTH_POW
-        step = FeedingSystem.XP_STEP
-
-        return round(base * (current_level ** growth_pow) + step * current_level)
+        requirements = FeedingSystem._XP_REQUIREMENTS
+        if current_level < len(requirements):
+            return requirements[current_level]
+        return FeedingSystem._xp_requirement_formula(current_level)
 
     @staticmethod
     def calculate_total_xp_for_level(level: int) -> int:
@@ -67,60 +98,56 @@ class FeedingSystem:
         if level <= 1:
             return 0
 
-        total = 0
-        # 从1级开始，累加每次升级所需的经验
-        for current_level in range(1, level):
+        cumulative = FeedingSystem._XP_CUMULATIVE
+        if level <= len(cumulative):
+            return cumulative[level - 1]
+
+        # 超出查表范围时在表尾继续累加
+        total = cumulative[-1]
+        for current_level in range(len(cumulative), level):
             total += FeedingSystem.calculate_level_xp_requirement(current_level)
         return total
 
     @staticmethod
     def calculate_level_from_total_xp(total_xp: int) -> int:
-        """根据总经验计算当前等级"""
+        """根据总经验计算当前等级(在累计经验表上二分查找)"""
         if total_xp < 0:
             return 1
 
-        level = 1
-        accumulated_xp = 0
-
-        while True:
-            # 检查从当前等级升级到下一等级需要的经验
-            next_level_xp = FeedingSystem.calculate_level_xp_requirement(level)
-
-            # 如果总经验不足以升级到下一级，返回当前等级
-            if accumulated_xp + next_level_xp > total_xp:
-                break
-
-            # 否则累加经验并升级
-            accumulated_xp += next_level_xp
-            level += 1
-
-            # 防止无限循环
-            if level > 200:  # 假设最大等级为200
-                break
-
-        return level
+        # 累计经验不超过total_xp的等级数即为当前等级
+        return bisect.bisect_right(FeedingSystem._XP_CUMULATIVE, total_xp)
 
     @staticmethod
     def calculate_current_level_xp(total_xp: int) -> Tuple[int, int, int]:
         """
         根据总经验计算当前等级信息
-        返回: (当前等级, 当前等级已获得经验, 升到下一级还需要的经验)
+        返回: (当前等级, 当前等级已获得经验, 从当前等级升级所需的总经验)
         """
         level = FeedingSystem.calculate_level_from_total_xp(total_xp)
 
-        # 计算到达当前等级所需的总经验
-        level_start_xp = FeedingSystem.calculate_total_xp_for_level(level)
-
         # 当前等级已获得的经验
-        current_level_xp = total_xp - level_start_xp
+        current_level_xp = total_xp - FeedingSystem._XP_CUMULATIVE[level - 1]
+
+        return level, current_level_xp, FeedingSystem._XP_REQUIREMENTS[level]
+
+    @staticmethod
+    def calculate_levels(total_xps):
+        """
+        批量计算多只宠物的等级信息(NumPy向量化二分查找)
 
-        # 升级到下一等级需要的总经验（输入当前等级）
-        next_level_total_requirement = FeedingSystem.calculate_level_xp_requirement(level)
+        Args:
+            total_xps: 总经验序列或数组
 
-        # 还需要的经验 = 升级总需求 - 当前已有经验
-        remaining_xp = max(0, next_level_total_requirement - current_level_xp)
+        Returns:
+            (等级数组, 当前等级已获得经验数组, 升级所需总经验数组),
+            逐个元素与calculate_current_level_xp的结果一致
+        """
+        import numpy as np
 
-        return level, current_level_xp, next_level_total_requirement
+        requirements, cumulative = _xp_arrays()
+        total_xps = np.asarray(total_xps, dtype=np.int64)
+        levels = np.maximum(np.searchsorted(cumulative, total_xps, side='right'), 1)
+        return levels, total_xps - cumulative[levels - 1], requirements[levels]
 
     @staticmethod
     def calculate_feeding_xp(food_base_xp: int, food_xp_flow: int,
@@ -184,7 +211,7 @@ class FeedingSystem:
 
         try:
             # 1. 获取食物信息
-            food_response = supabase.table('food_templates').select('*').eq('id', food_template_id).execute()
+            food_response = await async_db.execute(supabase.table('food_templates').select('*').eq('id', food_template_id))
             if not food_response.data:
                 return False, "食物不存在！"
 
@@ -192,9 +219,9 @@ class FeedingSystem:
             total_price = food_data['price'] * quantity
 
             # 2. 检查用户积分和购买限制
-            user_response = supabase.table('users').select(
+            user_response = await async_db.execute(supabase.table('users').select(
                 'points, food_purchased_today, last_food_purchase_date'
-            ).eq('id', user_id).execute()
+            ).eq('id', user_id))
             if not user_response.data:
                 return False, "用户不存在！"
 
@@ -217,20 +244,20 @@ class FeedingSystem:
                 return False, f"每日食粮购买限制！今日已购买 {food_purchased_today} 份，最多购买 {FeedingSystem.MAX_DAILY_FOOD_PURCHASES} 份。还可购买 {remaining} 份。"
 
             # 3. 检查商品是否在今日目录中
-            catalog_response = supabase.table('daily_shop_catalog').select('food_template_id').eq(
+            catalog_response = await async_db.execute(supabase.table('daily_shop_catalog').select('food_template_id').eq(
                 'refresh_date', today.isoformat()
-            ).eq('food_template_id', food_template_id).execute()
+            ).eq('food_template_id', food_template_id))
 
             if not catalog_response.data:
                 return False, "今日商店中没有此商品！"
 
             # 4. 执行交易
             # 扣除积分并更新购买计数
-            supabase.table('users').update({
+            await async_db.execute(supabase.table('users').update({
                 'points': user_points - total_price,
                 'food_purchased_today': food_purchased_today + quantity,
                 'last_food_purchase_date': today.isoformat()
-            }).eq('id', user_id).execute()
+            }).eq('id', user_id))
 
             # 清除积分缓存，确保check命令显示最新数据
             if guild_id and discord_user_id:
@@ -239,23 +266,23 @@ class FeedingSystem:
 
             # 添加到用户库存
             # 检查用户是否已有此食物
-            inventory_response = supabase.table('user_food_inventory').select('quantity').eq(
+            inventory_response = await async_db.execute(supabase.table('user_food_inventory').select('quantity').eq(
                 'user_id', user_id
-            ).eq('food_template_id', food_template_id).execute()
+            ).eq('food_template_id', food_template_id))
 
             if inventory_response.data:
                 # 增加数量
                 current_quantity = inventory_response.data[0]['quantity']
-                supabase.table('user_food_inventory').update({
+                await async_db.execute(supabase.table('user_food_inventory').update({
                     'quantity': current_quantity + quantity
-                }).eq('user_id', user_id).eq('food_template_id', food_template_id).execute()
+                }).eq('user_id', user_id).eq('food_template_id', food_template_id))
             else:
                 # 新增记录
-                supabase.table('user_food_inventory').insert({
+                await async_db.execute(supabase.table('user_food_inventory').insert({
                     'user_id': user_id,
                     'food_template_id': food_template_id,
                     'quantity': quantity
-                }).execute()
+                }))
 
             return True, (quantity, total_price, user_points - total_price, food_purchased_today + quantity)
 
@@ -263,6 +290,21 @@ class FeedingSystem:
             print(f"购买食物时出错: {e}")
             return False, "购买失败，系统错误！"
 
+FeedingSystem._XP_REQUIREMENTS, FeedingSystem._XP_CUMULATIVE = FeedingSystem.build_xp_tables()
+
+
+@functools.lru_cache(maxsize=1)
+def _xp_arrays():
+    """经验查表的NumPy只读副本(首次批量计算时才导入NumPy,不影响启动耗时)"""
+    import numpy as np
+
+    requirements = np.array(FeedingSystem._XP_REQUIREMENTS, dtype=np.int64)
+    cumulative = np.array(FeedingSystem._XP_CUMULATIVE, dtype=np.int64)
+    requirements.flags.writeable = False
+    cumulative.flags.writeable = False
+    return requirements, cumulative
+
+
 class SatietyManager:
     """饱食度管理类"""
 
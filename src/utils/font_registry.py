@@ -0,0 +1,175 @@
+"""
+字体注册表
+进程内按 (路径, 字号) 只加载一次TrueType字体,并记录每个字体的加载耗时;
+同时解析各语言的字体配置(src/res/fonts/{locale}/metadata.json),
+配置缺失或文件不存在时回退到该语言的默认字体: 中文等需要CJK字形的语言使用
+CJK_FONT_PATH 或系统中的CJK字体,其余语言使用仓库自带的字体。
+
+Pillow只在真正加载字体时导入,主进程解析字体配置不会引入Pillow。
+"""
+import json
+import logging
+import os
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+FONTS_DIR = PROJECT_ROOT / "src" / "res" / "fonts"
+
+# 各部分的默认字体(仓库中实际存在的文件)
+DEFAULT_FONTS = {
+    "title": FONTS_DIR / "Comic Sans MS.ttf",
+    "rank": FONTS_DIR / "Arial Rounded Bold.ttf",
+    "name": FONTS_DIR / "SnellRoundhand.ttc",
+    "value": FONTS_DIR / "Arial Rounded Bold.ttf",
+}
+
+# 需要CJK字形的语言,以及这些语言中可能出现CJK文字的部分(标题、数值标签)
+CJK_LOCALES = ("zh",)
+CJK_ROLES = ("title", "value")
+# 仓库没有自带CJK字体,依次尝试环境变量和常见的系统字体路径
+CJK_FONT_CANDIDATES = [
+    os.getenv("CJK_FONT_PATH"),
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/google-noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
+    "/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf",
+    "/System/Library/Fonts/PingFang.ttc",
+    "/Library/Fonts/Arial Unicode.ttf",
+    "C:/Windows/Fonts/msyh.ttc",
+]
+
+_fonts: Dict[Tuple[str, int], Any] = {}
+_load_seconds: Dict[Tuple[str, int], float] = {}
+_lock = threading.Lock()
+
+
+def _resolve_path(path: str) -> Path:
+    """配置中的路径相对于项目根目录,与运行时的工作目录无关"""
+    candidate = Path(path)
+    if not candidate.is_absolute():
+        candidate = PROJECT_ROOT / candidate
+    return candidate
+
+
+@lru_cache(maxsize=None)
+def _find_cjk_font() -> Optional[Path]:
+    """返回第一个存在的CJK字体,都不存在时返回None"""
+    for candidate in CJK_FONT_CANDIDATES:
+        if candidate and _resolve_path(candidate).exists():
+            return _resolve_path(candidate)
+    logger.warning("未找到CJK字体,中文标题将无法正常显示,请设置 CJK_FONT_PATH")
+    return None
+
+
+def _default_fonts(locale: str) -> Dict[str, Path]:
+    """某个语言的默认字体"""
+    defaults = dict(DEFAULT_FONTS)
+    if locale.split("-")[0] in CJK_LOCALES:
+        cjk_font = _find_cjk_font()
+        if cjk_font is not None:
+            defaults.update({role: cjk_font for role in CJK_ROLES})
+    return defaults
+
+
+@lru_cache(maxsize=None)
+def get_locale_fonts(locale: str, fallback_locale: str) -> Dict[str, str]:
+    """
+    获取某个语言的字体文件路径(读取一次后缓存)
+
+    Args:
+        locale: 语言代码
+        fallback_locale: 该语言没有字体配置时使用的语言
+
+    Returns:
+        {'title', 'rank', 'name', 'value'} -> 字体文件绝对路径
+    """
+    metadata_path = FONTS_DIR / locale / "metadata.json"
+    if not metadata_path.exists():
+        metadata_path = FONTS_DIR / fallback_locale / "metadata.json"
+    try:
+        with metadata_path.open("r", encoding="utf-8") as fh:
+            data = json.load(fh)
+    except Exception:
+        data = {}
+
+    font_map = {}
+    for role, default_path in _default_fonts(locale).items():
+        path = _resolve_path(data[role]) if data.get(role) else default_path
+        if not path.exists():
+            logger.warning(f"字体文件不存在,使用默认字体: {locale}/{role} -> {path}")
+            path = default_path
+        font_map[role] = str(path)
+    return font_map
+
+
+def load_font(path: str, size: int):
+    """
+    加载字体,同一 (路径, 字号) 在进程内只加载一次
+
+    Args:
+        path: 字体文件路径
+        size: 字号
+
+    Returns:
+        Pillow字体对象;加载失败时返回Pillow默认字体
+    """
+    key = (path, size)
+    font = _fonts.get(key)
+    if font is not None:
+        return font
+
+    from PIL import ImageFont
+
+    with _lock:
+        font = _fonts.get(key)
+        if font is not None:
+            return font
+
+        started = time.perf_counter()
+        try:
+            font = ImageFont.truetype(path, size) if os.path.exists(path) else ImageFont.load_default()
+        except Exception:
+            font = ImageFont.load_default()
+        _load_seconds[key] = time.perf_counter() - started
+        _fonts[key] = font
+    return font
+
+
+def preload(font_maps: list, sizes: Dict[str, int]) -> float:
+    """
+    预加载字体
+
+    Args:
+        font_maps: get_locale_fonts返回的字体配置列表
+        sizes: 各部分字号 {'title': 32, ...}
+
+    Returns:
+        本次预加载耗时(秒)
+    """
+    started = time.perf_counter()
+    for font_map in font_maps:
+        for role, size in sizes.items():
+            load_font(font_map[role], size)
+    return time.perf_counter() - started
+
+
+def get_stats() -> Dict[str, Any]:
+    """已加载字体数量及每个字体的加载耗时(毫秒)"""
+    with _lock:
+        timings = sorted(_load_seconds.items(), key=lambda item: item[1], reverse=True)
+    return {
+        "loaded": len(timings),
+        "total_ms": sum(seconds for _, seconds in timings) * 1000,
+        "fonts": [
+            {"path": path, "size": size, "ms": seconds * 1000}
+            for (path, size), seconds in timings
+        ],
+    }
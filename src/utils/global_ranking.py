@@ -0,0 +1,233 @@
+"""
+跨服务器全局排行榜
+定期在Redis服务端用ZUNIONSTORE把所有服务器的排行榜合并为
+ranking:global:{type} 快照(同一用户在各服务器的分数求和),
+数据不会读回Python进程聚合。
+
+- 从数据库读取有效订阅的服务器,只合并已从数据库完整构建过(带ready标记)的排行榜,
+  按 GLOBAL_RANKING_BATCH 个一批合并进临时key,
+  合并完成后RENAME为正式快照,读者不会看到合并了一半的排行榜
+- 快照带有效期,定时任务按 GLOBAL_RANKING_REFRESH_MINUTES 刷新,刷新前先重建缺失的服务器排行榜;
+  没有定时任务的进程读取时发现快照不存在会用现有排行榜合并一次,读取路径不查询积分数据
+- 多进程部署时通过Redis锁保证同一时间只有一个进程在构建,
+  其他进程短暂等待构建完成,而不是返回空排行榜
+"""
+import asyncio
+import logging
+import os
+import uuid
+from typing import List, Tuple
+
+from src.db.redis_client import redis_client
+from src.utils.leaderboard_cache import LeaderboardCache, VERSION_TTL
+from src.utils.ranking import COUNTER_RANKINGS, RankingManager
+from src.utils.subscription_cache import SubscriptionCache
+
+logger = logging.getLogger(__name__)
+
+# 快照有效期(秒),应大于刷新间隔,保证定时刷新期间快照一直可用
+GLOBAL_RANKING_TTL = int(os.getenv('GLOBAL_RANKING_TTL', 1800))
+# 定时刷新间隔(分钟)
+GLOBAL_RANKING_REFRESH_MINUTES = int(os.getenv('GLOBAL_RANKING_REFRESH_MINUTES', 10))
+# 单条ZUNIONSTORE合并的服务器排行榜数量
+GLOBAL_RANKING_BATCH = int(os.getenv('GLOBAL_RANKING_BATCH', 100))
+# 合并锁和重建锁的有效期(秒),重建服务器排行榜期间每个服务器续期一次
+BUILD_LOCK_TTL = 120
+# 其他进程正在合并时,读取方等待快照出现的最长时间和轮询间隔(秒)
+BUILD_WAIT_TIMEOUT = 10
+BUILD_WAIT_INTERVAL = 0.5
+
+# LeaderboardCache中全局排行榜使用的"服务器ID"
+GLOBAL_SCOPE = 'global'
+
+RANKING_TYPES = ['points', *COUNTER_RANKINGS]
+
+# 只删除自己持有的锁(比较和删除在Redis中原子执行)
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class GlobalRanking:
+    """跨服务器全局排行榜"""
+
+    @staticmethod
+    def ranking_key(ranking_type: str = 'points') -> str:
+        return f'ranking:global:{ranking_type}'
+
+    @staticmethod
+    def _lock_key(ranking_type: str) -> str:
+        return f'ranking:global:{ranking_type}:lock'
+
+    @staticmethod
+    def _rebuild_lock_key(ranking_type: str) -> str:
+        return f'ranking:global:{ranking_type}:rebuild'
+
+    @staticmethod
+    async def _release_lock(lock_key: str, token: str):
+        await redis_client.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+
+    @staticmethod
+    async def _guild_boards(ranking_type: str) -> Tuple[List[str], List[int]]:
+        """
+        读取所有有效订阅服务器的排行榜状态
+
+        Returns:
+            (已完整构建的排行榜key, 缺少ready标记需要重建的服务器ID)
+        """
+        guild_ids = await SubscriptionCache.active_guild_ids()
+        missing = await RankingManager.missing_rankings(guild_ids, ranking_type)
+        missing_set = set(missing)
+        ready_keys = [
+            RankingManager.ranking_key(guild_id, ranking_type)
+            for guild_id in guild_ids if guild_id not in missing_set
+        ]
+        return ready_keys, missing
+
+    @staticmethod
+    async def rebuild_missing(ranking_type: str = 'points') -> int:
+        """
+        从数据库重建缺少ready标记的服务器排行榜(从未构建或只被增量写入过部分用户),
+        只在定时任务中调用,避免用户查看全局排行榜时逐个服务器查询数据库
+
+        Returns:
+            重建的服务器数量,其他进程正在重建时返回-1
+        """
+        lock_key = GlobalRanking._rebuild_lock_key(ranking_type)
+        token = uuid.uuid4().hex
+        if not await redis_client.set(lock_key, token, nx=True, ex=BUILD_LOCK_TTL):
+            return -1
+
+        try:
+            _, missing = await GlobalRanking._guild_boards(ranking_type)
+            for guild_id in missing:
+                await RankingManager.rebuild_ranking(guild_id, ranking_type)
+                await redis_client.expire(lock_key, BUILD_LOCK_TTL)
+            return len(missing)
+        finally:
+            await GlobalRanking._release_lock(lock_key, token)
+
+    @staticmethod
+    async def refresh(ranking_type: str = 'points') -> int:
+        """
+        合并已构建的服务器排行榜,重新生成全局排行榜快照(只在Redis中执行,不查询积分数据)
+
+        Args:
+            ranking_type: points / pets / hatched_eggs / blackjack_wins
+
+        Returns:
+            合并的服务器排行榜数量,其他进程正在构建时返回-1
+        """
+        lock_key = GlobalRanking._lock_key(ranking_type)
+        token = uuid.uuid4().hex
+        if not await redis_client.set(lock_key, token, nx=True, ex=BUILD_LOCK_TTL):
+            return -1
+
+        ranking_key = GlobalRanking.ranking_key(ranking_type)
+        tmp_key = f'{ranking_key}:build:{token}'
+        try:
+            source_keys, _ = await GlobalRanking._guild_boards(ranking_type)
+
+            # 逐批合并进临时key,所有命令在同一管道中发送,由Redis依次执行
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for start in range(0, len(source_keys), GLOBAL_RANKING_BATCH):
+                    batch = source_keys[start:start + GLOBAL_RANKING_BATCH]
+                    keys = [tmp_key, *batch] if start else batch
+                    pipe.zunionstore(tmp_key, keys, aggregate='SUM')
+                    pipe.expire(tmp_key, BUILD_LOCK_TTL)
+                await pipe.execute()
+
+            version_key = LeaderboardCache.version_key(GLOBAL_SCOPE, ranking_type)
+            async with redis_client.pipeline(transaction=True) as pipe:
+                if source_keys:
+                    pipe.rename(tmp_key, ranking_key)
+                    pipe.expire(ranking_key, GLOBAL_RANKING_TTL)
+                else:
+                    pipe.delete(ranking_key)
+                pipe.incr(version_key)
+                pipe.expire(version_key, VERSION_TTL)
+                await pipe.execute()
+
+            logger.info(f"全局排行榜已刷新: type={ranking_type}, 服务器数={len(source_keys)}")
+            return len(source_keys)
+        except Exception:
+            await redis_client.delete(tmp_key)
+            raise
+        finally:
+            await GlobalRanking._release_lock(lock_key, token)
+
+    @staticmethod
+    async def refresh_all():
+        """重建缺失的服务器排行榜并刷新所有类型的全局排行榜(定时任务调用)"""
+        for ranking_type in RANKING_TYPES:
+            try:
+                await GlobalRanking.rebuild_missing(ranking_type)
+                await GlobalRanking.refresh(ranking_type)
+            except Exception as e:
+                logger.error(f"刷新全局排行榜失败: type={ranking_type}, {e}")
+
+    @staticmethod
+    async def _ensure(ranking_type: str) -> bool:
+        """快照不存在时用现有排行榜合并一次(其他进程正在合并时等待其完成),返回快照是否可用"""
+        if ranking_type not in RANKING_TYPES:
+            return False
+        ranking_key = GlobalRanking.ranking_key(ranking_type)
+        if await redis_client.exists(ranking_key):
+            return True
+        try:
+            if await GlobalRanking.refresh(ranking_type) != -1:
+                return bool(await redis_client.exists(ranking_key))
+        except Exception as e:
+            logger.error(f"构建全局排行榜失败: type={ranking_type}, {e}")
+            return False
+
+        # 其他进程持有构建锁,等待快照出现或锁被释放
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + BUILD_WAIT_TIMEOUT
+        while loop.time() < deadline:
+            await asyncio.sleep(BUILD_WAIT_INTERVAL)
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.exists(ranking_key)
+                pipe.exists(GlobalRanking._lock_key(ranking_type))
+                snapshot_exists, building = await pipe.execute()
+            if snapshot_exists or not building:
+                return bool(snapshot_exists)
+        logger.warning(f"等待全局排行榜构建超时: type={ranking_type}")
+        return False
+
+    @staticmethod
+    async def get_page(ranking_type: str = 'points', page: int = 1,
+                       page_size: int = 10) -> Tuple[int, List[Tuple[int, int, int]]]:
+        """
+        获取全局排行榜的某一页
+
+        Returns:
+            (总人数, [(名次, discord_user_id, 分数), ...])
+        """
+        try:
+            if not await GlobalRanking._ensure(ranking_type):
+                return 0, []
+            return await RankingManager.read_page(GlobalRanking.ranking_key(ranking_type), page, page_size)
+        except Exception as e:
+            logger.error(f"获取全局排行榜失败: {e}")
+            return 0, []
+
+    @staticmethod
+    async def get_around(discord_user_id: int, ranking_type: str = 'points',
+                         radius: int = 4) -> Tuple[int, int, List[Tuple[int, int, int]]]:
+        """
+        获取全局排行榜中以某个用户为中心的窗口
+
+        Returns:
+            (用户名次(1-based,不在榜单为-1), 总人数, [(名次, discord_user_id, 分数), ...])
+        """
+        try:
+            if not await GlobalRanking._ensure(ranking_type):
+                return -1, 0, []
+            return await RankingManager.read_around(GlobalRanking.ranking_key(ranking_type), discord_user_id, radius)
+        except Exception as e:
+            logger.error(f"获取全局排行榜附近排名失败: {e}")
+            return -1, 0, []
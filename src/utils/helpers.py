@@ -1,8 +1,8 @@
 import datetime
-import random
 from zoneinfo import ZoneInfo
-from src.config.config import REWARD_SYSTEM
 from src.db.database import get_connection
+from src.db import async_db
+from src.utils.cache import UserCache
 
 # 统一使用的美东时区, zoneinfo 会根据DST自动调整
 EASTERN_TZ = ZoneInfo("America/New_York")
@@ -18,52 +18,20 @@ def now_est():
     return datetime.datetime.now(datetime.timezone.utc).astimezone(EASTERN_TZ)
 
 def get_weighted_reward():
-    """根据加权概率获取随机奖励"""
-    # 创建一个列表，其中每个奖励根据其概率出现
-    reward_pool = []
-    for reward in REWARD_SYSTEM:
-        # 将百分比转换为条目数量（乘以10以提高精度）
-        count = int(reward["probability"] * 10)
-        for _ in range(count):
-            reward_pool.append(reward)
-    
-    # 从池中随机选择
-    return random.choice(reward_pool)
+    """根据加权概率获取随机奖励(使用预编译的别名表采样器)"""
+    # 采样器依赖NumPy,首次抽奖时才导入,不影响启动耗时
+    from src.utils.reward_sampler import get_reward_sampler
+    return get_reward_sampler().sample_one()
 
-def get_user_internal_id(interaction):
-    """获取用户在数据库中的内部ID"""
-    supabase = get_connection()
-    
-    try:
-        # 确保参数是整数类型，匹配数据库的bigint字段
-        guild_id_int = int(interaction.guild.id)
-        discord_user_id_int = int(interaction.user.id)
-        
-        user_result = supabase.table("users").select("id").eq("guild_id", guild_id_int).eq("discord_user_id", discord_user_id_int).execute()
-        
-        if user_result.data:
-            return user_result.data[0]["id"]
-        else:
-            return None
-    except Exception as e:
-        print(f"获取用户内部ID失败: {e}")
-        return None
+async def get_user_internal_id(interaction):
+    """获取用户在数据库中的内部ID(经由UserCache的进程内LRU和Redis缓存)"""
+    return await get_user_internal_id_with_guild_and_discord_id(interaction.guild.id, interaction.user.id)
 
-def get_user_internal_id_with_guild_and_discord_id(guild_id, discord_user_id):
+async def get_user_internal_id_with_guild_and_discord_id(guild_id, discord_user_id):
     """根据guild_id和discord_user_id获取用户在数据库中的内部ID"""
-    supabase = get_connection()
-    
     try:
         # 确保参数是整数类型，匹配数据库的bigint字段
-        guild_id_int = int(guild_id)
-        discord_user_id_int = int(discord_user_id)
-        
-        user_result = supabase.table("users").select("id").eq("guild_id", guild_id_int).eq("discord_user_id", discord_user_id_int).execute()
-        
-        if user_result.data:
-            return user_result.data[0]["id"]
-        else:
-            return None
+        return await UserCache.get_user_id(int(guild_id), int(discord_user_id))
     except Exception as e:
         print(f"获取用户内部ID失败: {e}")
         return None
@@ -85,7 +53,7 @@ async def get_user_data_with_validation(interaction, fields="id", ephemeral=True
     guild_id = str(interaction.guild.id)
     
     try:
-        user_response = supabase.table("users").select(fields).eq("discord_user_id", discord_user_id).eq("guild_id", guild_id).execute()
+        user_response = await async_db.execute(supabase.table("users").select(fields).eq("discord_user_id", discord_user_id).eq("guild_id", guild_id))
         
         if not user_response.data:
             await interaction.response.send_message("你还没有注册，请先使用其他功能来创建账户！", ephemeral=ephemeral)
@@ -147,7 +115,7 @@ async def get_user_id_with_validation_ctx(ctx, target_user=None):
         guild_id = ctx.guild.id
         
         # 查询用户ID
-        user_response = supabase.table('users').select('id').eq('discord_user_id', discord_user_id).eq('guild_id', guild_id).execute()
+        user_response = await async_db.execute(supabase.table('users').select('id').eq('discord_user_id', discord_user_id).eq('guild_id', guild_id))
         
         if not user_response.data:
             await ctx.send(f"用户 {user.mention} 还没有注册，请先使用抽奖功能。")
@@ -3,18 +3,23 @@
 from __future__ import annotations
 
 import json
+import marshal
+import os
 import threading
 from dataclasses import dataclass
-from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, Iterable, Optional
+from typing import Any, Dict, Iterable, Optional, Tuple
 
 from src.config import config as config_module
+from src.utils.lru import LRUCache
 
 # Thread lock to guard cache mutation in async contexts
 _lock = threading.RLock()
 
 LOCALES_DIR = Path(__file__).resolve().parent.parent / "locales"
+# Parsed locale files are cached in marshal format; an entry is reused only
+# while the JSON file's mtime and size are unchanged
+LOCALE_CACHE_DIR = Path(os.getenv("LOCALE_CACHE_DIR", LOCALES_DIR / ".cache"))
 
 @dataclass(frozen=True)
 class LocaleMeta:
@@ -28,8 +33,14 @@ SUPPORTED_LOCALES: Dict[str, LocaleMeta] = {
 }
 
 _LOCALE_FILE_CACHE: Dict[str, Dict[str, Any]] = {}
-_GUILD_LOCALE_CACHE: Dict[int, tuple[str, datetime]] = {}
-_GUILD_LOCALE_TTL = timedelta(minutes=30)
+# Flat key -> (template, has_fields) catalogs with fallbacks applied,
+# keyed by (requested locale, default locale)
+_CATALOG_CACHE: Dict[Tuple[Optional[str], str], Dict[str, Tuple[str, bool]]] = {}
+# Bounded in-process guild locale cache; cross-process sharing and
+# invalidation are handled by src.utils.locale_cache
+_GUILD_LOCALE_TTL = 30 * 60
+_GUILD_LOCALE_MAX_SIZE = 10000
+_GUILD_LOCALE_CACHE = LRUCache(_GUILD_LOCALE_MAX_SIZE, _GUILD_LOCALE_TTL)
 
 
 def get_default_locale() -> str:
@@ -73,6 +84,35 @@ def get_locale_label(locale: str) -> str:
     return SUPPORTED_LOCALES.get(locale, LocaleMeta(locale, locale, locale)).label
 
 
+def _read_locale_file(file_path: Path) -> Dict[str, Any]:
+    """Parse a locale JSON file, going through the binary cache when possible."""
+    stat = file_path.stat()
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cache_path = LOCALE_CACHE_DIR / f"{file_path.stem}.marshal"
+
+    try:
+        with cache_path.open("rb") as fh:
+            cached_signature, data = marshal.load(fh)
+        if tuple(cached_signature) == signature:
+            return data
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    with file_path.open("r", encoding="utf-8") as fh:
+        data = json.load(fh)
+
+    try:
+        LOCALE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        with tmp_path.open("wb") as fh:
+            marshal.dump((signature, data), fh)
+        os.replace(tmp_path, cache_path)
+    except OSError as exc:  # pragma: no cover - read-only deployments
+        print(f"写入语言缓存失败: {exc}")
+
+    return data
+
+
 def _load_locale(locale: str) -> Dict[str, Any]:
     """Load locale file from disk with caching."""
     with _lock:
@@ -84,10 +124,9 @@ def _load_locale(locale: str) -> Dict[str, Any]:
             _LOCALE_FILE_CACHE[locale] = {}
             return _LOCALE_FILE_CACHE[locale]
 
-        with file_path.open("r", encoding="utf-8") as fh:
-            data = json.load(fh)
-            _LOCALE_FILE_CACHE[locale] = data
-            return data
+        data = _read_locale_file(file_path)
+        _LOCALE_FILE_CACHE[locale] = data
+        return data
 
 
 def _resolve_key(payload: Dict[str, Any], key: str) -> Optional[Any]:
@@ -100,20 +139,25 @@ def _resolve_key(payload: Dict[str, Any], key: str) -> Optional[Any]:
     return current
 
 
-def t(key: str, locale: Optional[str] = None, default: Optional[str] = None, **kwargs: Any) -> str:
-    """Translate a key to the requested language with fallback.
+def _flatten(payload: Dict[str, Any], prefix: str = "", out: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Flatten nested locale JSON into dotted keys, keeping string leaves only."""
+    if out is None:
+        out = {}
+    for name, value in payload.items():
+        path = f"{prefix}{name}"
+        if isinstance(value, dict):
+            _flatten(value, f"{path}.", out)
+        elif isinstance(value, str):
+            out[path] = value
+    return out
 
-    Args:
-        key: dotted path into locale files.
-        locale: preferred locale code.
-        default: explicit fallback string if nothing is found.
-        **kwargs: values injected via str.format.
-    """
+
+def _fallback_order(locale: Optional[str], default_locale: str) -> list:
+    """Locales to try for a lookup, most preferred first."""
     locales_to_try = []
     if locale and is_supported(locale):
         locales_to_try.append(locale)
 
-    default_locale = get_default_locale()
     if default_locale not in locales_to_try:
         locales_to_try.append(default_locale)
 
@@ -124,17 +168,59 @@ def t(key: str, locale: Optional[str] = None, default: Optional[str] = None, **k
     for code in SUPPORTED_LOCALES:
         if code not in locales_to_try:
             locales_to_try.append(code)
+    return locales_to_try
 
-    for code in locales_to_try:
-        value = _resolve_key(_load_locale(code), key)
-        if isinstance(value, str):
-            try:
-                formatted_value = value.format(**kwargs) if kwargs else value
-                # Convert \n escape sequences to actual newlines for embed display
-                return formatted_value.replace('\\n', '\n')
-            except KeyError:
-                # Return unformatted template if placeholders missing
-                return value.replace('\\n', '\n')
+
+def _compile_catalog(locales_to_try: list) -> Dict[str, Tuple[str, bool]]:
+    """Merge locale files into one flat catalog, earlier locales winning."""
+    merged: Dict[str, str] = {}
+    for code in reversed(locales_to_try):
+        merged.update(_flatten(_load_locale(code)))
+
+    # Convert \n escape sequences to actual newlines for embed display,
+    # and remember which templates need str.format at all
+    catalog: Dict[str, Tuple[str, bool]] = {}
+    for key, value in merged.items():
+        catalog[key] = (value.replace('\\n', '\n'), '{' in value or '}' in value)
+    return catalog
+
+
+def _get_catalog(locale: Optional[str]) -> Dict[str, Tuple[str, bool]]:
+    default_locale = get_default_locale()
+    catalog = _CATALOG_CACHE.get((locale, default_locale))
+    if catalog is not None:
+        return catalog
+
+    with _lock:
+        # Unsupported locales share the default catalog instead of compiling a copy
+        supported_key = (locale if locale and is_supported(locale) else None, default_locale)
+        catalog = _CATALOG_CACHE.get(supported_key)
+        if catalog is None:
+            catalog = _compile_catalog(_fallback_order(locale, default_locale))
+            _CATALOG_CACHE[supported_key] = catalog
+        _CATALOG_CACHE[(locale, default_locale)] = catalog
+    return catalog
+
+
+def t(key: str, locale: Optional[str] = None, default: Optional[str] = None, **kwargs: Any) -> str:
+    """Translate a key to the requested language with fallback.
+
+    Args:
+        key: dotted path into locale files.
+        locale: preferred locale code.
+        default: explicit fallback string if nothing is found.
+        **kwargs: values injected via str.format.
+    """
+    entry = _get_catalog(locale).get(key)
+    if entry is not None:
+        template, has_fields = entry
+        if not kwargs or not has_fields:
+            return template
+        try:
+            return template.format_map(kwargs)
+        except KeyError:
+            # Return unformatted template if placeholders missing
+            return template
 
     if default:
         try:
@@ -157,15 +243,31 @@ def get_all_localizations(key: str) -> Dict[str, str]:
     return translations
 
 
+def get_cached_guild_locale(guild_id: int) -> Optional[str]:
+    """Return the locale from the in-process cache without touching the database."""
+    with _lock:
+        return _GUILD_LOCALE_CACHE.get(guild_id)
+
+
+def cache_guild_locale(guild_id: int, locale: str) -> None:
+    """Store a resolved locale in the in-process cache."""
+    with _lock:
+        _GUILD_LOCALE_CACHE.set(guild_id, locale)
+
+
 def get_guild_locale(guild_id: Optional[int]) -> str:
-    """Resolve the guild's preferred locale with caching."""
+    """Resolve the guild's preferred locale with caching.
+
+    Command entry points warm the cache asynchronously through
+    ``locale_cache.GuildLocaleCache.prime``; the blocking database lookup
+    below only runs for guilds that were not primed.
+    """
     if not guild_id:
         return get_default_locale()
 
-    with _lock:
-        cached = _GUILD_LOCALE_CACHE.get(guild_id)
-        if cached and datetime.utcnow() - cached[1] < _GUILD_LOCALE_TTL:
-            return cached[0]
+    cached = get_cached_guild_locale(guild_id)
+    if cached:
+        return cached
 
     locale = None
     try:
@@ -180,8 +282,7 @@ def get_guild_locale(guild_id: Optional[int]) -> str:
     else:
         locale = normalize_locale(locale)
 
-    with _lock:
-        _GUILD_LOCALE_CACHE[guild_id] = (locale, datetime.utcnow())
+    cache_guild_locale(guild_id, locale)
     return locale
 
 
@@ -197,8 +298,7 @@ def set_guild_locale(guild_id: int, locale: str) -> bool:
 
         success = upsert_guild_language(guild_id, locale)
         if success:
-            with _lock:
-                _GUILD_LOCALE_CACHE[guild_id] = (locale, datetime.utcnow())
+            cache_guild_locale(guild_id, locale)
             return True
         return False
     except Exception as exc:  # pragma: no cover - defensive logging
@@ -216,7 +316,7 @@ def clear_guild_locale_cache(guild_id: Optional[int] = None) -> None:
         if guild_id is None:
             _GUILD_LOCALE_CACHE.clear()
         else:
-            _GUILD_LOCALE_CACHE.pop(guild_id, None)
+            _GUILD_LOCALE_CACHE.pop(guild_id)
 
 
 def format_supported_locales() -> str:
@@ -0,0 +1,113 @@
+"""
+排行榜图片缓存
+每个服务器、每种排行榜维护一个版本号,排行数据变化时递增;
+渲染好的图片按 服务器/类型/语言(分页视图另加页码) 保存在Redis中并记录生成时的版本号,
+版本号未变化时直接返回缓存图片,无需查询排名或重新绘图。
+"""
+import base64
+import logging
+from typing import Optional, Tuple
+
+from src.db.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+# 图片缓存有效期(成员改名/换头像不会递增版本号,依靠过期刷新)
+IMAGE_TTL = 600
+# 版本号有效期,远大于图片缓存有效期,过期后从头计数也不会命中旧图片
+VERSION_TTL = 7 * 24 * 3600
+
+# 计入21点胜场的结果
+BLACKJACK_WIN_RESULTS = ('win', 'blackjack')
+
+
+class LeaderboardCache:
+    """排行榜图片缓存"""
+
+    @staticmethod
+    def version_key(guild_id: int, ranking_type: str) -> str:
+        return f'ranking:version:{guild_id}:{ranking_type}'
+
+    @staticmethod
+    def _image_key(guild_id: int, ranking_type: str, locale: str, page: Optional[int] = None) -> str:
+        # 默认Top榜与分页视图的名次计算方式不同,分页视图(包括第1页)使用独立的key空间
+        if page is None:
+            return f'leaderboard:image:{guild_id}:{ranking_type}:{locale}'
+        return f'leaderboard:image:{guild_id}:{ranking_type}:{locale}:page:{page}'
+
+    @staticmethod
+    async def bump(guild_id: int, *ranking_types: str):
+        """
+        排行数据变化后递增版本号,使对应的图片缓存失效
+
+        Args:
+            guild_id: Discord服务器ID
+            ranking_types: 发生变化的排行榜类型
+        """
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for ranking_type in ranking_types:
+                    key = LeaderboardCache.version_key(guild_id, ranking_type)
+                    pipe.incr(key)
+                    pipe.expire(key, VERSION_TTL)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"更新排行榜版本号失败: {e}")
+
+    @staticmethod
+    async def get(guild_id: int, ranking_type: str, locale: str,
+                  page: Optional[int] = None) -> Tuple[int, Optional[bytes], str]:
+        """
+        读取当前版本号和对应版本的缓存图片(一次往返)
+
+        Args:
+            guild_id: Discord服务器ID
+            ranking_type: 排行榜类型
+            locale: 语言
+            page: 分页视图的页码,默认Top榜为None
+
+        Returns:
+            (当前版本号, 图片字节, 文件名);缓存不存在或版本不一致时图片为None
+        """
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.get(LeaderboardCache.version_key(guild_id, ranking_type))
+                pipe.hmget(LeaderboardCache._image_key(guild_id, ranking_type, locale, page), 'version', 'data', 'filename')
+                version, (cached_version, data, filename) = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"读取排行榜图片缓存失败: {e}")
+            return 0, None, ''
+
+        version = int(version or 0)
+        if data is None or cached_version is None or int(cached_version) != version:
+            return version, None, ''
+        return version, base64.b64decode(data), filename or 'ranking.png'
+
+    @staticmethod
+    async def store(guild_id: int, ranking_type: str, locale: str, version: int, image_bytes: bytes, filename: str,
+                    page: Optional[int] = None):
+        """
+        保存渲染好的图片
+
+        Args:
+            guild_id: Discord服务器ID
+            ranking_type: 排行榜类型
+            locale: 语言
+            version: 查询排名前读取的版本号(渲染期间数据变化时,下次请求会重新生成)
+            image_bytes: 图片字节
+            filename: 发送时使用的文件名(扩展名随编码格式变化)
+            page: 分页视图的页码,默认Top榜为None
+        """
+        key = LeaderboardCache._image_key(guild_id, ranking_type, locale, page)
+        try:
+            # Redis客户端启用了decode_responses,图片以base64文本保存
+            async with redis_client.pipeline(transaction=True) as pipe:
+                pipe.hset(key, mapping={
+                    'version': version,
+                    'data': base64.b64encode(image_bytes).decode('ascii'),
+                    'filename': filename
+                })
+                pipe.expire(key, IMAGE_TTL)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"保存排行榜图片缓存失败: {e}")
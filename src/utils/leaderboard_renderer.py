@@ -0,0 +1,234 @@
+"""
+排行榜图片渲染
+依赖Pillow,只在渲染进程(src.utils.render_service)中导入,避免拖慢启动和阻塞事件循环。
+输入均为纯数据(头像为原始字节),不依赖discord对象,便于在进程间传递。
+"""
+from functools import lru_cache
+from io import BytesIO
+from typing import Optional
+
+from PIL import Image, ImageColor, ImageDraw
+
+from src.utils import font_registry, image_encoder
+from src.utils.font_registry import load_font
+from src.utils.image_encoder import EncodedImage
+
+# 图片尺寸
+WIDTH = 700
+CARD_HEIGHT = 100
+CARD_SPACING = 15
+PADDING = 40
+TITLE_HEIGHT = 80
+CARD_COLOR = '#2E3440'
+AVATAR_SIZE = 80
+
+# 各部分字号
+FONT_SIZES = {'title': 32, 'rank': 16, 'name': 18, 'value': 14}
+
+GRADIENT_TOP = '#1a1a2e'
+GRADIENT_BOTTOM = '#16213e'
+
+
+@lru_cache(maxsize=4)
+def get_circle_mask(size: int):
+    """圆形头像蒙版(只读,按尺寸缓存)"""
+    mask = Image.new('L', (size, size), 0)
+    draw = ImageDraw.Draw(mask)
+    draw.ellipse((0, 0, size, size), fill=255)
+    return mask
+
+
+def create_circle_avatar(avatar_img, size=80):
+    """将头像裁剪为圆形"""
+    avatar_circle = Image.new('RGBA', (size, size), (0, 0, 0, 0))
+    avatar_circle.paste(avatar_img, (0, 0))
+    avatar_circle.putalpha(get_circle_mask(size))
+
+    return avatar_circle
+
+
+def create_gradient_background(width, height):
+    """
+    创建纵向渐变背景
+
+    每一行颜色相同,只计算一列像素再横向拉伸,
+    结果与逐像素计算完全一致
+    """
+    r1, g1, b1 = ImageColor.getrgb(GRADIENT_TOP)
+    r2, g2, b2 = ImageColor.getrgb(GRADIENT_BOTTOM)
+
+    column = []
+    for y in range(height):
+        alpha = int(255 * (y / height))
+        column.append((
+            int(r1 + (r2 - r1) * alpha / 255),
+            int(g1 + (g2 - g1) * alpha / 255),
+            int(b1 + (b2 - b1) * alpha / 255),
+        ))
+
+    strip = Image.new('RGB', (1, height))
+    strip.putdata(column)
+    return strip.resize((width, height), Image.NEAREST)
+
+def draw_rounded_rectangle(draw, xy, radius, fill, outline=None, width=1):
+    """绘制圆角矩形"""
+    x1, y1, x2, y2 = xy
+
+    # 绘制圆角
+    draw.pieslice([x1, y1, x1 + radius * 2, y1 + radius * 2], 180, 270, fill=fill, outline=outline, width=width)
+    draw.pieslice([x2 - radius * 2, y1, x2, y1 + radius * 2], 270, 360, fill=fill, outline=outline, width=width)
+    draw.pieslice([x1, y2 - radius * 2, x1 + radius * 2, y2], 90, 180, fill=fill, outline=outline, width=width)
+    draw.pieslice([x2 - radius * 2, y2 - radius * 2, x2, y2], 0, 90, fill=fill, outline=outline, width=width)
+
+    # 绘制矩形部分
+    draw.rectangle([x1 + radius, y1, x2 - radius, y2], fill=fill, outline=outline, width=width)
+    draw.rectangle([x1, y1 + radius, x2, y2 - radius], fill=fill, outline=outline, width=width)
+
+
+def get_canvas_height(entry_count: int) -> int:
+    return TITLE_HEIGHT + PADDING * 2 + (CARD_HEIGHT + CARD_SPACING) * entry_count
+
+
+@lru_cache(maxsize=16)
+def get_template(entry_count: int):
+    """
+    背景和卡片底板模板(只读,按条目数缓存)
+
+    同样数量的排行榜共用一张模板,渲染时复制后再绘制文字和头像
+    """
+    height = get_canvas_height(entry_count)
+    img = create_gradient_background(WIDTH, height)
+    draw = ImageDraw.Draw(img)
+
+    y = PADDING + TITLE_HEIGHT
+    for _ in range(entry_count):
+        draw_rounded_rectangle(draw, (PADDING, y, WIDTH - PADDING, y + CARD_HEIGHT), 15, CARD_COLOR)
+        y += CARD_HEIGHT + CARD_SPACING
+    return img
+
+
+def load_avatar(avatar_bytes: bytes, size: int = 80):
+    """解码头像字节,失败时返回透明占位图"""
+    try:
+        return Image.open(BytesIO(avatar_bytes)).convert("RGBA").resize((size, size))
+    except Exception:
+        return Image.new('RGBA', (size, size), (0, 0, 0, 0))
+
+
+def preload(font_maps: list, entry_count: int = 10):
+    """
+    预加载字体和常用模板(渲染进程初始化时调用)
+
+    Args:
+        font_maps: 需要预加载的字体配置列表
+        entry_count: 预先生成模板的条目数
+    """
+    font_seconds = font_registry.preload(font_maps, FONT_SIZES)
+    print(f"渲染进程已预加载 {font_registry.get_stats()['loaded']} 个字体,耗时 {font_seconds * 1000:.1f} ms")
+    get_template(entry_count)
+    get_circle_mask(AVATAR_SIZE)
+
+
+def draw_leaderboard(title: str, entries: list, font_map: dict):
+    """
+    绘制排行榜图片
+
+    Args:
+        title: 标题
+        entries: [{'rank', 'avatar_bytes', 'name', 'value_text', 'highlight'(可选)}, ...]
+        font_map: {'title', 'rank', 'name', 'value'} 字体文件路径
+
+    Returns:
+        Pillow图片(未编码)
+    """
+    # 字体设置
+    title_font = load_font(font_map['title'], FONT_SIZES['title'])
+    rank_font = load_font(font_map['rank'], FONT_SIZES['rank'])
+    name_font = load_font(font_map['name'], FONT_SIZES['name'])
+    points_font = load_font(font_map['value'], FONT_SIZES['value'])
+
+    # 复制缓存的背景和卡片底板
+    img = get_template(len(entries)).copy()
+    draw = ImageDraw.Draw(img)
+
+    # 绘制标题
+    title_bbox = draw.textbbox((0, 0), title, font=title_font)
+    title_width = title_bbox[2] - title_bbox[0]
+    title_x = (WIDTH - title_width) // 2
+    draw.text((title_x, PADDING), title, fill='#FFD700', font=title_font)
+
+    # 绘制每个排名卡片
+    y = PADDING + TITLE_HEIGHT
+    for entry in entries:
+        rank = entry['rank']
+        avatar = load_avatar(entry['avatar_bytes'], AVATAR_SIZE)
+        name = entry['name']
+
+        # 前三名使用特殊颜色
+        if rank == 1:
+            text_color = '#FFD700'
+            rank_color = '#FFD700'
+        elif rank == 2:
+            text_color = '#C0C0C0'
+            rank_color = '#C0C0C0'
+        elif rank == 3:
+            text_color = '#CD7F32'
+            rank_color = '#CD7F32'
+        else:
+            text_color = '#ECEFF4'
+            rank_color = '#88C0D0'
+
+        # "我的附近"视图中高亮调用者自己
+        if entry.get('highlight'):
+            text_color = '#A3BE8C'
+
+        # 卡片背景已在模板中绘制
+        card_x1 = PADDING
+        card_y1 = y
+
+        # 绘制排名
+        rank_text = str(rank)
+        rank_bbox = draw.textbbox((0, 0), rank_text, font=rank_font)
+        rank_width = rank_bbox[2] - rank_bbox[0]
+        rank_x = card_x1 + 25
+        rank_y = card_y1 + (CARD_HEIGHT - (rank_bbox[3] - rank_bbox[1])) // 2
+        draw.text((rank_x, rank_y), rank_text, fill=rank_color, font=rank_font)
+
+        # 绘制圆形头像
+        circle_avatar = create_circle_avatar(avatar, AVATAR_SIZE)
+        avatar_x = rank_x + rank_width + 20
+        avatar_y = card_y1 + 10
+        img.paste(circle_avatar, (avatar_x, avatar_y), circle_avatar)
+
+        # 绘制用户名
+        name_x = avatar_x + 100
+        name_y = card_y1 + 20
+        # 限制用户名长度
+        if len(name) > 15:
+            name = name[:15] + '...'
+        draw.text((name_x, name_y), name, fill=text_color, font=name_font)
+
+        # 绘制数值（积分/宠物数量/战力等）
+        value_x = name_x
+        value_y = card_y1 + 60
+        draw.text((value_x, value_y), entry['value_text'], fill='#88C0D0', font=points_font)
+
+        y += CARD_HEIGHT + CARD_SPACING
+
+    return img
+
+
+def render_leaderboard(title: str, entries: list, font_map: dict, encoding: Optional[dict] = None) -> EncodedImage:
+    """
+    绘制并编码排行榜图片
+
+    Args:
+        title: 标题
+        entries: 同draw_leaderboard
+        font_map: 同draw_leaderboard
+        encoding: image_encoder.encode的参数(formats/quality/target_bytes),默认普通PNG
+
+    Returns:
+        编码后的图片
+    """
+    return image_encoder.encode(draw_leaderboard(title, entries, font_map), **(encoding or {}))
@@ -0,0 +1,123 @@
+"""
+服务器语言缓存
+get_guild_locale 是同步函数且调用点很多,这里在命令入口异步预热进程内LRU:
+进程内LRU -> Redis -> 数据库,语言变更通过Redis pub/sub通知所有进程
+"""
+import asyncio
+import logging
+from typing import Dict
+
+from src.db.redis_client import redis_client
+from src.db.database import get_guild_language
+from src.db import async_db
+from src.utils.cache import InvalidationBus
+from src.utils.i18n import (
+    cache_guild_locale,
+    get_cached_guild_locale,
+    get_default_locale,
+    is_supported,
+    normalize_locale,
+)
+
+logger = logging.getLogger(__name__)
+
+# 语言设置很少变化,变更时会主动广播,Redis可以保存较长时间
+REDIS_TTL = 24 * 3600
+INVALIDATE_CHANNEL = 'locale:invalidate'
+
+
+class GuildLocaleCache:
+    """服务器语言缓存"""
+
+    # 正在从Redis/数据库加载的服务器,合并并发请求
+    _inflight: Dict[int, asyncio.Future] = {}
+
+    @staticmethod
+    def _cache_key(guild_id: int) -> str:
+        return f'guild:locale:{guild_id}'
+
+    @staticmethod
+    async def prime(guild_id: int) -> str:
+        """
+        预热服务器语言缓存,之后同步的get_guild_locale可以直接命中进程内缓存
+
+        Args:
+            guild_id: Discord服务器ID
+
+        Returns:
+            服务器语言代码
+        """
+        guild_id = int(guild_id)
+        cached = get_cached_guild_locale(guild_id)
+        if cached:
+            return cached
+
+        future = GuildLocaleCache._inflight.get(guild_id)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        GuildLocaleCache._inflight[guild_id] = future
+        try:
+            locale = await GuildLocaleCache._load(guild_id)
+            future.set_result(locale)
+            return locale
+        except Exception as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免 "Future exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            GuildLocaleCache._inflight.pop(guild_id, None)
+
+    @staticmethod
+    async def _load(guild_id: int) -> str:
+        """从Redis或数据库加载语言并写入缓存"""
+        cache_key = GuildLocaleCache._cache_key(guild_id)
+
+        try:
+            cached_value = await redis_client.get(cache_key)
+            if cached_value and is_supported(cached_value):
+                cache_guild_locale(guild_id, cached_value)
+                return cached_value
+        except Exception as e:
+            logger.warning(f"Redis查询服务器语言失败,降级到数据库: {e}")
+
+        locale = await async_db.run_sync(get_guild_language, guild_id)
+        locale = normalize_locale(locale) if locale else get_default_locale()
+        cache_guild_locale(guild_id, locale)
+
+        try:
+            await redis_client.setex(cache_key, REDIS_TTL, locale)
+        except Exception as e:
+            logger.error(f"Redis写入服务器语言失败: {e}")
+
+        return locale
+
+    @staticmethod
+    async def publish(guild_id: int, locale: str):
+        """
+        写入新的服务器语言并通知所有进程(语言设置成功后调用)
+
+        Args:
+            guild_id: Discord服务器ID
+            locale: 新的语言代码
+        """
+        guild_id = int(guild_id)
+        locale = normalize_locale(locale)
+        cache_guild_locale(guild_id, locale)
+        try:
+            await redis_client.setex(GuildLocaleCache._cache_key(guild_id), REDIS_TTL, locale)
+        except Exception as e:
+            logger.error(f"Redis写入服务器语言失败: {e}")
+        await InvalidationBus.publish(INVALIDATE_CHANNEL, f'{guild_id}:{locale}')
+
+    @staticmethod
+    def _on_invalidate(message: str):
+        """收到语言变更通知时直接更新本进程缓存"""
+        guild_id, _, locale = message.partition(':')
+        if is_supported(locale):
+            cache_guild_locale(int(guild_id), locale)
+
+
+InvalidationBus.register(INVALIDATE_CHANNEL, GuildLocaleCache._on_invalidate)
@@ -0,0 +1,53 @@
+"""
+进程内有界LRU缓存
+不依赖Redis/数据库,可在任何模块中使用
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class LRUCache:
+    """进程内有界LRU缓存(带TTL),非线程安全,跨线程使用时需由调用方加锁"""
+
+    def __init__(self, max_size: int, ttl: float):
+        """
+        Args:
+            max_size: 最大条目数,超出时淘汰最久未使用的条目
+            ttl: 条目有效期(秒)
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """获取条目,不存在或已过期返回None"""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        """写入条目"""
+        self._data[key] = (value, time.monotonic() + self.ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable):
+        """删除条目"""
+        self._data.pop(key, None)
+
+    def clear(self):
+        """清空缓存"""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
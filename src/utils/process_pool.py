@@ -0,0 +1,59 @@
+"""
+spawn进程池
+渲染和经济模拟都把纯CPU任务交给独立进程执行,这里统一负责延迟创建进程池、
+在工作进程异常退出时重建进程池并重试,只依赖标准库
+"""
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+
+class SpawnPool:
+    """延迟创建的spawn进程池,线程安全"""
+
+    def __init__(self, max_workers: int, initializer: Optional[Callable] = None, initargs: tuple = ()):
+        """
+        Args:
+            max_workers: 工作进程数
+            initializer: 工作进程启动时调用的函数
+            initargs: initializer的参数(在进程池创建时读取,创建前可修改)
+        """
+        self.max_workers = max_workers
+        self.initializer = initializer
+        self.initargs = initargs
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        """获取进程池(首次调用时创建)"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # 使用spawn避免fork带有事件循环和线程池的父进程
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context('spawn'),
+                        initializer=self.initializer,
+                        initargs=self.initargs
+                    )
+        return self._executor
+
+    def shutdown(self, wait: bool = True):
+        """关闭进程池,下次提交任务时重新创建"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+    async def run(self, func: Callable, *args) -> Any:
+        """在工作进程中执行func(*args)"""
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.get_executor(), func, *args)
+        except BrokenProcessPool:
+            # 工作进程异常退出(如内存不足被杀),重建进程池后重试一次
+            self.shutdown(wait=False)
+            return await loop.run_in_executor(self.get_executor(), func, *args)
@@ -1,42 +1,570 @@
 """
 排行榜管理器
 使用Redis Sorted Set实现高性能排行榜
+
+- points: ranking:{guild_id},随积分缓存一起写入
+- pets / hatched_eggs / blackjack_wins: ranking:{type}:{guild_id},
+  在写入点用ZINCRBY增量维护;冷启动时由数据库RPC重建,
+  重建完成后写入 ranking:{type}:{guild_id}:ready 标记,
+  标记不存在时不做增量更新(避免把不完整的集合当成完整排行)
+
+重建时先分页写入临时key,全部写完后RENAME覆盖正式key,
+读者不会看到写了一半的排行榜;reconcile_points 定期抽样修复积分排行榜的漂移
 """
+import random
+import uuid
+from typing import AsyncIterator, Dict, List, Tuple
+
 from src.db.redis_client import redis_client
 from src.db.database import get_connection
+from src.db import async_db
+from src.utils.leaderboard_cache import LeaderboardCache, VERSION_TTL
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 增量维护的排行榜类型 -> (重建用的RPC, 返回的计数字段)
+COUNTER_RANKINGS = {
+    'pets': ('get_pet_count_ranking', 'pet_count'),
+    'hatched_eggs': ('get_hatched_eggs_ranking', 'hatched_count'),
+    'blackjack_wins': ('get_blackjack_wins_ranking', 'total_wins'),
+}
+
+# 重建时一次读取的最大用户数
+REBUILD_LIMIT = 1_000_000
+# 重建时每页从数据库读取的用户数
+REBUILD_PAGE_SIZE = 1000
+# 管道中单条ZADD命令携带的成员数
+ZADD_CHUNK_SIZE = 500
+# 临时key的有效期,重建进程中途崩溃时自动清理
+REBUILD_TMP_TTL = 600
+
+# 漂移抽样数(排行榜抽样 + 数据库随机一页各一份)
+RECONCILE_SAMPLE_SIZE = 200
+# 抽样中漂移比例超过该值时直接全量重建
+RECONCILE_REBUILD_RATIO = 0.05
+
+# 对每种类型依次传入 排行榜key / ready标记 / 版本号key 三个KEYS
+# ARGV[1]: 成员(Discord用户ID), ARGV[2]: 版本号有效期, ARGV[3..]: 各类型的增量
+INCREMENT_SCRIPT = """
+for i = 1, #KEYS / 3 do
+    local ranking_key = KEYS[i * 3 - 2]
+    local ready_key = KEYS[i * 3 - 1]
+    local version_key = KEYS[i * 3]
+    if redis.call('EXISTS', ready_key) == 1 then
+        local score = tonumber(redis.call('ZINCRBY', ranking_key, ARGV[i + 2], ARGV[1]))
+        if score <= 0 then
+            redis.call('ZREM', ranking_key, ARGV[1])
+        end
+    end
+    redis.call('INCR', version_key)
+    redis.call('EXPIRE', version_key, ARGV[2])
+end
+return 1
+"""
+
+# 以某个成员为中心的排行窗口(一次往返,O(log N + 窗口大小))
+# KEYS[1]: 排行榜key, ARGV[1]: 成员, ARGV[2]: 上下各取的名次数
+# 返回 {名次(0-based,不在榜单为-1), 总人数, [成员, 分数, ...]}
+AROUND_SCRIPT = """
+local total = redis.call('ZCARD', KEYS[1])
+local rank = redis.call('ZREVRANK', KEYS[1], ARGV[1])
+if not rank then
+    return {-1, total, {}}
+end
+local radius = tonumber(ARGV[2])
+local start = math.max(0, rank - radius)
+return {rank, total, redis.call('ZREVRANGE', KEYS[1], start, rank + radius, 'WITHSCORES')}
+"""
+
 
 class RankingManager:
     """排行榜管理器（异步版本）"""
 
     @staticmethod
-    async def initialize_ranking(guild_id: int):
+    def ranking_key(guild_id: int, ranking_type: str = 'points') -> str:
+        if ranking_type == 'points':
+            return f'ranking:{guild_id}'
+        return f'ranking:{ranking_type}:{guild_id}'
+
+    @staticmethod
+    def _ready_key(guild_id: int, ranking_type: str) -> str:
+        return f'ranking:{ranking_type}:{guild_id}:ready'
+
+    @staticmethod
+    async def increment_scores(guild_id: int, discord_user_id: int, increments: dict):
         """
-        初始化排行榜(从数据库加载)
+        增量更新计数类排行榜,并递增对应的排行榜版本号(一次往返)
 
         Args:
             guild_id: 服务器ID
+            discord_user_id: Discord用户ID
+            increments: {ranking_type: delta},例如 {'pets': 2, 'hatched_eggs': 2}
         """
+        increments = {k: v for k, v in increments.items() if k in COUNTER_RANKINGS and v}
+        if not increments:
+            return
+
+        keys = []
+        for ranking_type in increments:
+            keys.extend((
+                RankingManager.ranking_key(guild_id, ranking_type),
+                RankingManager._ready_key(guild_id, ranking_type),
+                LeaderboardCache.version_key(guild_id, ranking_type),
+            ))
         try:
-            supabase = get_connection()
-            result = supabase.table('users').select('discord_user_id, points').eq('guild_id', guild_id).execute()
+            await redis_client.eval(
+                INCREMENT_SCRIPT, len(keys), *keys,
+                str(discord_user_id), VERSION_TTL, *increments.values()
+            )
+        except Exception as e:
+            logger.error(f"增量更新排行榜失败: {e}")
 
-            ranking_key = f'ranking:{guild_id}'
+    @staticmethod
+    async def _swap_in(guild_id: int, ranking_type: str, pages: AsyncIterator[Dict[str, int]]) -> int:
+        """
+        将分页数据写入临时key,全部写完后原子地RENAME为正式排行榜
+
+        每页在一个非事务管道中分块ZADD;最后在一个事务中完成
+        RENAME、计数类排行榜的ready标记和版本号递增。
+        失败时删除临时key,正式排行榜保持不变。
+
+        Args:
+            guild_id: 服务器ID
+            ranking_type: 排行榜类型
+            pages: 异步产出 {discord_user_id: score} 的分页数据
+
+        Returns:
+            写入的成员数
+        """
+        ranking_key = RankingManager.ranking_key(guild_id, ranking_type)
+        tmp_key = f'{ranking_key}:rebuild:{uuid.uuid4().hex}'
+        version_key = LeaderboardCache.version_key(guild_id, ranking_type)
+        total = 0
+
+        try:
+            async for page in pages:
+                if not page:
+                    continue
+                items = list(page.items())
+                async with redis_client.pipeline(transaction=False) as pipe:
+                    for start in range(0, len(items), ZADD_CHUNK_SIZE):
+                        pipe.zadd(tmp_key, dict(items[start:start + ZADD_CHUNK_SIZE]))
+                    pipe.expire(tmp_key, REBUILD_TMP_TTL)
+                    await pipe.execute()
+                total += len(items)
+
+            async with redis_client.pipeline(transaction=True) as pipe:
+                if total:
+                    pipe.rename(tmp_key, ranking_key)
+                    pipe.persist(ranking_key)
+                else:
+                    pipe.delete(ranking_key)
+                pipe.set(RankingManager._ready_key(guild_id, ranking_type), 1)
+                pipe.incr(version_key)
+                pipe.expire(version_key, VERSION_TTL)
+                await pipe.execute()
+        except Exception:
+            try:
+                await redis_client.delete(tmp_key)
+            except Exception as e:
+                logger.warning(f"清理排行榜临时key失败: {tmp_key}, {e}")
+            raise
 
-            # 批量写入Sorted Set（异步）
-            if result.data:
-                mapping = {str(row['discord_user_id']): row['points'] for row in result.data}
-                await redis_client.zadd(ranking_key, mapping)
-                logger.info(f"初始化排行榜成功: guild_id={guild_id}, 用户数={len(mapping)}")
-                return True
+        return total
+
+    @staticmethod
+    async def _points_pages(guild_id: int) -> AsyncIterator[Dict[str, int]]:
+        """按主键分页读取服务器内所有用户积分(keyset分页,不随偏移量变慢)"""
+        supabase = get_connection()
+        last_id = 0
+        while True:
+            result = await async_db.execute(
+                supabase.table('users')
+                .select('id, discord_user_id, points')
+                .eq('guild_id', guild_id)
+                .gt('id', last_id)
+                .order('id')
+                .limit(REBUILD_PAGE_SIZE)
+            )
+            rows = result.data or []
+            if not rows:
+                return
+            yield {str(row['discord_user_id']): row['points'] for row in rows}
+            if len(rows) < REBUILD_PAGE_SIZE:
+                return
+            last_id = rows[-1]['id']
+
+    @staticmethod
+    async def _counter_pages(guild_id: int, ranking_type: str) -> AsyncIterator[Dict[str, int]]:
+        """
+        读取计数类排行榜的重建数据
+
+        排行RPC只接受p_limit,没有偏移参数,所以只能一次读取;
+        写入Redis时仍按页拆分,避免单条命令过大
+        """
+        rpc_name, count_field = COUNTER_RANKINGS[ranking_type]
+        supabase = get_connection()
+        result = await async_db.execute(supabase.rpc(rpc_name, {
+            'p_guild_id': guild_id,
+            'p_limit': REBUILD_LIMIT
+        }))
+        rows = result.data or []
+        for start in range(0, len(rows), REBUILD_PAGE_SIZE):
+            yield {
+                str(row['discord_user_id']): row[count_field]
+                for row in rows[start:start + REBUILD_PAGE_SIZE]
+            }
+
+    @staticmethod
+    async def rebuild_ranking(guild_id: int, ranking_type: str = 'points') -> bool:
+        """
+        从数据库全量重建排行榜(冷启动、数据漂移或管理员手动触发时调用)
+
+        Args:
+            guild_id: 服务器ID
+            ranking_type: points / pets / hatched_eggs / blackjack_wins
+
+        Returns:
+            是否重建成功
+        """
+        if ranking_type == 'points':
+            pages = RankingManager._points_pages(guild_id)
+        elif ranking_type in COUNTER_RANKINGS:
+            pages = RankingManager._counter_pages(guild_id, ranking_type)
+        else:
+            logger.error(f"未知的排行榜类型: {ranking_type}")
             return False
+
+        try:
+            total = await RankingManager._swap_in(guild_id, ranking_type, pages)
+            logger.info(f"重建排行榜成功: guild_id={guild_id}, type={ranking_type}, 用户数={total}")
+            return True
         except Exception as e:
-            logger.error(f"初始化排行榜失败: {e}")
+            logger.error(f"重建排行榜失败: guild_id={guild_id}, type={ranking_type}, {e}")
             return False
 
+    @staticmethod
+    async def rebuild_counter_ranking(guild_id: int, ranking_type: str) -> bool:
+        """
+        从数据库重建计数类排行榜
+
+        Args:
+            guild_id: 服务器ID
+            ranking_type: pets / hatched_eggs / blackjack_wins
+
+        Returns:
+            是否重建成功
+        """
+        return await RankingManager.rebuild_ranking(guild_id, ranking_type)
+
+    @staticmethod
+    async def get_counter_rankings(guild_id: int, ranking_type: str, limit: int = 10) -> list:
+        """
+        获取计数类排行榜Top N,未初始化时先从数据库重建
+
+        Args:
+            guild_id: 服务器ID
+            ranking_type: pets / hatched_eggs / blackjack_wins
+            limit: 返回前N名
+
+        Returns:
+            [(discord_user_id, count), ...]
+        """
+        for _ in range(2):
+            try:
+                async with redis_client.pipeline(transaction=False) as pipe:
+                    pipe.exists(RankingManager._ready_key(guild_id, ranking_type))
+                    pipe.zrevrange(RankingManager.ranking_key(guild_id, ranking_type), 0, limit - 1, withscores=True)
+                    ready, rankings = await pipe.execute()
+            except Exception as e:
+                logger.error(f"获取排行榜失败: {e}")
+                return []
+
+            if ready:
+                return [(int(user_id), int(score)) for user_id, score in rankings]
+            if not await RankingManager.rebuild_counter_ranking(guild_id, ranking_type):
+                return []
+        return []
+
+    @staticmethod
+    async def _ensure_ranking(guild_id: int, ranking_type: str) -> bool:
+        """
+        排行榜为空时确认是否需要从数据库重建
+
+        Returns:
+            是否进行了重建(调用方据此决定是否重新查询)
+        """
+        if await redis_client.exists(RankingManager._ready_key(guild_id, ranking_type)):
+            # 已初始化,只是确实没有数据
+            return False
+        return await RankingManager.rebuild_ranking(guild_id, ranking_type)
+
+    @staticmethod
+    async def missing_rankings(guild_ids: List[int], ranking_type: str) -> List[int]:
+        """
+        找出尚未从数据库完整构建过的服务器排行榜(一次往返)
+
+        只被增量写入过的排行榜不带ready标记,可能只包含部分用户,同样视为缺失
+
+        Returns:
+            需要重建的服务器ID列表
+        """
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for guild_id in guild_ids:
+                pipe.exists(RankingManager._ready_key(guild_id, ranking_type))
+            ready = await pipe.execute()
+        return [guild_id for guild_id, is_ready in zip(guild_ids, ready) if not is_ready]
+
+    @staticmethod
+    async def clamp_page(ranking_key: str, page: int, page_size: int) -> int:
+        """
+        把页码限制在排行榜实际页数内(与read_page超出范围时返回最后一页的规则一致)
+
+        Returns:
+            实际页码;排行榜为空时返回原页码
+        """
+        total = await redis_client.zcard(ranking_key)
+        if not total:
+            return max(1, page)
+        return min(max(1, page), (total - 1) // page_size + 1)
+
+    @staticmethod
+    async def read_page(ranking_key: str, page: int, page_size: int) -> Tuple[int, List[Tuple[int, int, int]]]:
+        """
+        读取任意排行榜key的某一页(ZCARD + 窗口ZREVRANGE,一次往返)
+
+        Args:
+            ranking_key: 排行榜key
+            page: 页码(1-based),超出范围时返回最后一页
+            page_size: 每页人数
+
+        Returns:
+            (总人数, [(名次, discord_user_id, 分数), ...]),名次为1-based
+        """
+        start = (max(1, page) - 1) * page_size
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.zcard(ranking_key)
+            pipe.zrevrange(ranking_key, start, start + page_size - 1, withscores=True)
+            total, rankings = await pipe.execute()
+
+        if total and not rankings:
+            # 页码超出范围,改为读取最后一页
+            start = (total - 1) // page_size * page_size
+            rankings = await redis_client.zrevrange(ranking_key, start, start + page_size - 1, withscores=True)
+
+        return total, [
+            (start + index + 1, int(user_id), int(score))
+            for index, (user_id, score) in enumerate(rankings)
+        ]
+
+    @staticmethod
+    async def read_around(ranking_key: str, discord_user_id: int,
+                          radius: int) -> Tuple[int, int, List[Tuple[int, int, int]]]:
+        """
+        读取任意排行榜key中以某个用户为中心的窗口(ZREVRANK + 窗口ZREVRANGE,一次往返)
+
+        Args:
+            ranking_key: 排行榜key
+            discord_user_id: Discord用户ID
+            radius: 上下各取的名次数
+
+        Returns:
+            (用户名次(1-based,不在榜单为-1), 总人数, [(名次, discord_user_id, 分数), ...])
+        """
+        rank, total, flat = await redis_client.eval(
+            AROUND_SCRIPT, 1, ranking_key, str(discord_user_id), radius
+        )
+        rank = int(rank)
+        if rank < 0:
+            return -1, int(total), []
+
+        start = max(0, rank - radius)
+        rows = [
+            (start + index + 1, int(user_id), int(float(score)))
+            for index, (user_id, score) in enumerate(zip(flat[0::2], flat[1::2]))
+        ]
+        return rank + 1, int(total), rows
+
+    @staticmethod
+    async def get_rankings_page(guild_id: int, ranking_type: str = 'points',
+                                page: int = 1, page_size: int = 10) -> Tuple[int, List[Tuple[int, int, int]]]:
+        """
+        获取服务器排行榜的某一页,排行榜为空时先从数据库重建
+
+        Args:
+            guild_id: 服务器ID
+            ranking_type: points / pets / hatched_eggs / blackjack_wins
+            page: 页码(1-based),超出范围时返回最后一页
+            page_size: 每页人数
+
+        Returns:
+            (总人数, [(名次, discord_user_id, 分数), ...]),名次为1-based
+        """
+        ranking_key = RankingManager.ranking_key(guild_id, ranking_type)
+        try:
+            result = await RankingManager.read_page(ranking_key, page, page_size)
+            if not result[0] and await RankingManager._ensure_ranking(guild_id, ranking_type):
+                result = await RankingManager.read_page(ranking_key, page, page_size)
+            return result
+        except Exception as e:
+            logger.error(f"获取排行榜分页失败: {e}")
+            return 0, []
+
+    @staticmethod
+    async def get_rankings_around(guild_id: int, discord_user_id: int, ranking_type: str = 'points',
+                                  radius: int = 4) -> Tuple[int, int, List[Tuple[int, int, int]]]:
+        """
+        获取服务器排行榜中以某个用户为中心、上下各radius名的窗口,排行榜为空时先从数据库重建
+
+        Args:
+            guild_id: 服务器ID
+            discord_user_id: Discord用户ID
+            ranking_type: points / pets / hatched_eggs / blackjack_wins
+            radius: 上下各取的名次数
+
+        Returns:
+            (用户名次(1-based,不在榜单为-1), 总人数, [(名次, discord_user_id, 分数), ...])
+        """
+        ranking_key = RankingManager.ranking_key(guild_id, ranking_type)
+        try:
+            result = await RankingManager.read_around(ranking_key, discord_user_id, radius)
+            if not result[1] and await RankingManager._ensure_ranking(guild_id, ranking_type):
+                result = await RankingManager.read_around(ranking_key, discord_user_id, radius)
+            return result
+        except Exception as e:
+            logger.error(f"获取用户附近排名失败: {e}")
+            return -1, 0, []
+
+    @staticmethod
+    async def initialize_ranking(guild_id: int):
+        """
+        初始化排行榜(从数据库加载)
+
+        Args:
+            guild_id: 服务器ID
+        """
+        return await RankingManager.rebuild_ranking(guild_id, 'points')
+
+    @staticmethod
+    async def reconcile_points(guild_id: int, sample_size: int = RECONCILE_SAMPLE_SIZE) -> dict:
+        """
+        抽样检查积分排行榜与数据库是否一致并修复漂移
+
+        同时抽取排行榜中的随机成员(发现多余或分数错误的成员)
+        和数据库中随机一页用户(发现排行榜中缺失的成员)。
+        不一致的用户会重新读取一次数据库确认,避免把检查期间的正常写入当成漂移;
+        漂移比例超过 RECONCILE_REBUILD_RATIO 时直接全量重建。
+
+        Args:
+            guild_id: 服务器ID
+            sample_size: 每种抽样的数量
+
+        Returns:
+            {'checked': 抽样数, 'repaired': 修复数, 'rebuilt': 是否全量重建}
+        """
+        stats = {'checked': 0, 'repaired': 0, 'rebuilt': False}
+        ranking_key = RankingManager.ranking_key(guild_id)
+        supabase = get_connection()
+
+        try:
+            if not await redis_client.exists(ranking_key):
+                # 排行榜尚未初始化,首次读取时会自动重建
+                return stats
+
+            # 1. 排行榜随机成员
+            sampled = await redis_client.zrandmember(ranking_key, sample_size, withscores=True) or []
+            redis_scores = {
+                member: int(float(score))
+                for member, score in zip(sampled[0::2], sampled[1::2])
+            }
+
+            # 2. 数据库随机一页用户
+            count_result = await async_db.execute(
+                supabase.table('users').select('id', count='exact').eq('guild_id', guild_id).limit(1)
+            )
+            user_count = count_result.count or 0
+            db_points = {}
+            if user_count:
+                offset = random.randrange(max(1, user_count - sample_size + 1))
+                page = await async_db.execute(
+                    supabase.table('users')
+                    .select('discord_user_id, points')
+                    .eq('guild_id', guild_id)
+                    .order('id')
+                    .range(offset, offset + sample_size - 1)
+                )
+                db_points = {str(row['discord_user_id']): row['points'] for row in (page.data or [])}
+
+            # 补齐两边缺失的数据
+            missing_in_db = [member for member in redis_scores if member not in db_points]
+            if missing_in_db:
+                db_points.update(await RankingManager._load_points(guild_id, missing_in_db))
+            missing_in_redis = [member for member in db_points if member not in redis_scores]
+            if missing_in_redis:
+                scores = await redis_client.zmscore(ranking_key, missing_in_redis)
+                for member, score in zip(missing_in_redis, scores):
+                    redis_scores[member] = int(float(score)) if score is not None else None
+
+            members = set(redis_scores) | set(db_points)
+            stats['checked'] = len(members)
+            drifted = [m for m in members if redis_scores.get(m) != db_points.get(m)]
+            if not drifted:
+                return stats
+
+            if len(drifted) > len(members) * RECONCILE_REBUILD_RATIO:
+                logger.warning(
+                    f"积分排行榜漂移过多,全量重建: guild_id={guild_id}, "
+                    f"漂移={len(drifted)}/{len(members)}"
+                )
+                stats['repaired'] = len(drifted)
+                stats['rebuilt'] = await RankingManager.rebuild_ranking(guild_id, 'points')
+                return stats
+
+            # 3. 重新读取确认后逐个修复
+            confirmed = await RankingManager._load_points(guild_id, drifted)
+            current = await redis_client.zmscore(ranking_key, drifted)
+            async with redis_client.pipeline(transaction=True) as pipe:
+                for member, score in zip(drifted, current):
+                    score = int(float(score)) if score is not None else None
+                    points = confirmed.get(member)
+                    if score == points:
+                        continue
+                    if points is None:
+                        pipe.zrem(ranking_key, member)
+                    else:
+                        pipe.zadd(ranking_key, {member: points})
+                    # 积分缓存可能同样过期,删除后下次读取会回源
+                    pipe.delete(f'user:points:{guild_id}:{member}')
+                    stats['repaired'] += 1
+                if stats['repaired']:
+                    version_key = LeaderboardCache.version_key(guild_id, 'points')
+                    pipe.incr(version_key)
+                    pipe.expire(version_key, VERSION_TTL)
+                    await pipe.execute()
+
+            if stats['repaired']:
+                logger.info(f"修复积分排行榜漂移: guild_id={guild_id}, 修复={stats['repaired']}/{stats['checked']}")
+        except Exception as e:
+            logger.error(f"积分排行榜漂移检查失败: guild_id={guild_id}, {e}")
+
+        return stats
+
+    @staticmethod
+    async def _load_points(guild_id: int, members: List[str]) -> Dict[str, int]:
+        """按Discord用户ID批量读取积分,不存在的用户不出现在结果中"""
+        supabase = get_connection()
+        points = {}
+        for start in range(0, len(members), REBUILD_PAGE_SIZE):
+            result = await async_db.execute(
+                supabase.table('users')
+                .select('discord_user_id, points')
+                .eq('guild_id', guild_id)
+                .in_('discord_user_id', [int(m) for m in members[start:start + REBUILD_PAGE_SIZE]])
+            )
+            points.update({str(row['discord_user_id']): row['points'] for row in (result.data or [])})
+        return points
+
     @staticmethod
     async def get_top_rankings(guild_id: int, limit: int = 10) -> list:
         """
@@ -97,6 +625,7 @@ class RankingManager:
         try:
             ranking_key = f'ranking:{guild_id}'
             await redis_client.zadd(ranking_key, {str(discord_user_id): points})
+            await LeaderboardCache.bump(guild_id, 'points')
         except Exception as e:
             logger.error(f"更新排行榜失败: {e}")
 
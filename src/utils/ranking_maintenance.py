@@ -0,0 +1,74 @@
+"""
+排行榜维护命令行工具
+不启动机器人即可重建排行榜或检查积分排行榜漂移,便于运维脚本和定时任务调用
+
+用法:
+    python -m src.utils.ranking_maintenance --guild 123456789 --type points
+    python -m src.utils.ranking_maintenance --reconcile          # 所有有效订阅的服务器
+"""
+import argparse
+import asyncio
+from typing import List
+
+from src.db import async_db
+from src.db.redis_client import redis_client
+from src.utils.ranking import RankingManager, COUNTER_RANKINGS, RECONCILE_SAMPLE_SIZE
+from src.utils.subscription_cache import SubscriptionCache
+
+RANKING_TYPES = ['points', *COUNTER_RANKINGS]
+
+
+async def run(guild_ids: List[int], ranking_types: List[str], reconcile: bool, sample_size: int) -> bool:
+    """
+    对指定服务器执行重建或漂移检查
+
+    Returns:
+        是否全部成功
+    """
+    if not guild_ids:
+        guild_ids = await SubscriptionCache.active_guild_ids()
+
+    ok = True
+    for guild_id in guild_ids:
+        if reconcile:
+            stats = await RankingManager.reconcile_points(guild_id, sample_size)
+            print(
+                f"[{guild_id}] 抽样 {stats['checked']}，修复 {stats['repaired']}"
+                f"{'，已全量重建' if stats['rebuilt'] else ''}"
+            )
+            continue
+
+        for ranking_type in ranking_types:
+            success = await RankingManager.rebuild_ranking(guild_id, ranking_type)
+            ok = ok and success
+            print(f"[{guild_id}] {ranking_type}: {'重建成功' if success else '重建失败'}")
+
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='重建排行榜或检查积分排行榜漂移')
+    parser.add_argument('--guild', type=int, action='append', default=[],
+                        help='服务器ID,可重复指定;省略时处理所有有效订阅的服务器')
+    parser.add_argument('--type', choices=['all', *RANKING_TYPES], default='all',
+                        help='要重建的排行榜类型')
+    parser.add_argument('--reconcile', action='store_true',
+                        help='只抽样检查并修复积分排行榜漂移,不做全量重建')
+    parser.add_argument('--sample-size', type=int, default=RECONCILE_SAMPLE_SIZE)
+    args = parser.parse_args()
+
+    ranking_types = RANKING_TYPES if args.type == 'all' else [args.type]
+
+    async def _main():
+        try:
+            return await run(args.guild, ranking_types, args.reconcile, args.sample_size)
+        finally:
+            await redis_client.aclose()
+
+    ok = asyncio.run(_main())
+    async_db.shutdown_executor()
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
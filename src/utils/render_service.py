@@ -0,0 +1,98 @@
+"""
+图片渲染服务
+Pillow绘图和PNG编码是纯CPU工作,在事件循环中执行会卡住所有交互。
+这里把渲染任务(纯数据)提交到独立的进程池,工作进程启动时预加载字体,
+返回编码后的图片字节;同时限制排队中的任务数量,超出时调用方等待(背压)。
+"""
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from src.utils.image_encoder import EncodedImage, parse_formats
+from src.utils.process_pool import SpawnPool
+
+logger = logging.getLogger(__name__)
+
+# 渲染进程数,设置为0时在线程中渲染(不启动子进程)
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", min(4, os.cpu_count() or 1)))
+# 同时提交到进程池的最大任务数,超出的请求在事件循环中等待
+RENDER_MAX_PENDING = int(os.getenv("RENDER_MAX_PENDING", max(1, RENDER_WORKERS) * 2))
+
+# 图片编码: 逗号分隔的候选格式(png/png_optimized/png_quantized/webp/jpeg),
+# 设置目标字节数后依次尝试,选第一个不超过目标大小的格式
+IMAGE_ENCODING = {
+    'formats': parse_formats(os.getenv("IMAGE_FORMAT", "png")),
+    'quality': int(os.getenv("IMAGE_QUALITY", 85)),
+    'target_bytes': int(os.getenv("IMAGE_TARGET_BYTES", 0)),
+}
+
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _init_worker(font_maps: list):
+    """工作进程初始化: 导入Pillow并预加载字体和模板"""
+    from src.utils import leaderboard_renderer
+
+    leaderboard_renderer.preload(font_maps)
+
+
+def _render_leaderboard(title: str, entries: list, font_map: dict, encoding: dict) -> EncodedImage:
+    from src.utils import leaderboard_renderer
+
+    return leaderboard_renderer.render_leaderboard(title, entries, font_map, encoding)
+
+
+_pool = SpawnPool(RENDER_WORKERS, initializer=_init_worker, initargs=([],))
+
+
+def configure(font_maps: list):
+    """设置工作进程启动时预加载的字体(需在首次渲染前调用)"""
+    _pool.initargs = (list(font_maps),)
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """获取渲染进程池(延迟创建)"""
+    return _pool.get_executor()
+
+
+def shutdown_executor(wait: bool = True):
+    """关闭渲染进程池"""
+    _pool.shutdown(wait=wait)
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(RENDER_MAX_PENDING)
+    return _semaphore
+
+
+async def _submit(func, *args):
+    loop = asyncio.get_running_loop()
+    async with _get_semaphore():
+        if RENDER_WORKERS <= 0:
+            return await loop.run_in_executor(None, func, *args)
+        return await _pool.run(func, *args)
+
+
+async def render_leaderboard(title: str, entries: list, font_map: dict) -> EncodedImage:
+    """
+    在渲染进程中生成排行榜图片
+
+    Args:
+        title: 标题
+        entries: [{'rank', 'avatar_bytes', 'name', 'value_text'}, ...]
+        font_map: 字体文件路径
+
+    Returns:
+        编码后的图片(含格式、大小和编码耗时)
+    """
+    image = await _submit(_render_leaderboard, title, entries, font_map, IMAGE_ENCODING)
+    logger.info(
+        f"排行榜图片: {image.format} q={image.quality} {len(image.data) / 1024:.1f} KiB, "
+        f"编码 {image.encode_ms:.1f} ms"
+    )
+    return image
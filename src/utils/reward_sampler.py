@@ -0,0 +1,139 @@
+"""
+抽奖奖励采样器
+使用Walker别名法(Alias Method)预编译奖励概率表,单次采样O(1),
+不再每次抽奖都重建奖励池,也不会把概率截断到0.1%精度。
+别名表保存为NumPy数组,N次抽奖在一次向量化调用中完成
+"""
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+class RewardSampler:
+    """基于别名表的加权奖励采样器"""
+
+    def __init__(self, rewards: Sequence[Dict[str, Any]], rng: Optional[np.random.Generator] = None):
+        """
+        根据奖励表构建别名表
+
+        Args:
+            rewards: 奖励列表,每项需包含probability字段(百分比,无需归一化)
+            rng: NumPy随机数生成器(默认使用系统熵初始化的新生成器)
+        """
+        if not rewards:
+            raise ValueError("奖励表不能为空")
+
+        weights = [float(reward["probability"]) for reward in rewards]
+        if any(w < 0 for w in weights):
+            raise ValueError("奖励概率不能为负数")
+
+        total = sum(weights)
+        if total <= 0:
+            raise ValueError("奖励概率之和必须大于0")
+
+        self.rewards = list(rewards)
+        self.probabilities = [w / total for w in weights]
+        self._rng = rng if rng is not None else np.random.default_rng()
+        self._prob, self._alias = self._build_alias_table(self.probabilities)
+
+    @staticmethod
+    def _build_alias_table(probabilities: List[float]):
+        """Vose算法构建别名表"""
+        n = len(probabilities)
+        scaled = [p * n for p in probabilities]
+        prob = [0.0] * n
+        alias = [0] * n
+
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            prob[s] = scaled[s]
+            alias[s] = l
+            scaled[l] = scaled[l] + scaled[s] - 1.0
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+
+        # 剩余项由于浮点误差可能略偏离1,直接视为1
+        for i in large + small:
+            prob[i] = 1.0
+            alias[i] = i
+
+        return np.asarray(prob, dtype=np.float64), np.asarray(alias, dtype=np.intp)
+
+    def sample_indices(self, n: int = 1, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """
+        批量采样奖励下标(一次向量化调用完成N次采样)
+
+        Args:
+            n: 采样次数
+            rng: 本次使用的随机数生成器(默认使用构建时的生成器)
+
+        Returns:
+            奖励在奖励表中的下标数组
+        """
+        rng = rng if rng is not None else self._rng
+        column = rng.integers(len(self._prob), size=n)
+        return np.where(rng.random(n) < self._prob[column], column, self._alias[column])
+
+    def sample(self, n: int = 1) -> List[Dict[str, Any]]:
+        """
+        批量采样奖励
+
+        Args:
+            n: 采样次数
+
+        Returns:
+            奖励字典列表(与奖励表中的对象相同)
+        """
+        rewards = self.rewards
+        return [rewards[i] for i in self.sample_indices(n).tolist()]
+
+    def sample_one(self) -> Dict[str, Any]:
+        """采样单个奖励"""
+        return self.sample(1)[0]
+
+
+_sampler: Optional[RewardSampler] = None
+_sampler_lock = threading.Lock()
+
+
+def get_reward_sampler() -> RewardSampler:
+    """获取全局奖励采样器(首次调用时根据REWARD_SYSTEM构建)"""
+    global _sampler
+
+    if _sampler is None:
+        with _sampler_lock:
+            if _sampler is None:
+                from src.config.config import REWARD_SYSTEM
+                _sampler = RewardSampler(REWARD_SYSTEM)
+    return _sampler
+
+
+def rebuild_reward_sampler(rewards: Optional[Sequence[Dict[str, Any]]] = None) -> RewardSampler:
+    """
+    重建全局奖励采样器
+
+    奖励表被修改后必须显式调用,否则继续使用旧的别名表
+
+    Args:
+        rewards: 新的奖励表,默认重新读取REWARD_SYSTEM
+
+    Returns:
+        新的采样器
+    """
+    global _sampler
+
+    if rewards is None:
+        from src.config.config import REWARD_SYSTEM
+        rewards = REWARD_SYSTEM
+
+    sampler = RewardSampler(rewards)
+    with _sampler_lock:
+        _sampler = sampler
+    return sampler
@@ -1,14 +1,21 @@
 """
 定时任务调度器
-处理饱食度重置和杂货铺刷新等定时任务
+处理饱食度重置、杂货铺刷新、排行榜漂移检查和全局排行榜刷新等定时任务
 """
 
 import asyncio
 import datetime
 from typing import Optional
+from src.db import async_db
 from src.utils.feeding_system import FoodShopManager
 from src.utils.helpers import now_est
 
+# 排行榜漂移检查: 每小时的第几分钟执行
+RANKING_RECONCILE_MINUTE = 30
+# 多进程部署时同一小时只由一个进程执行
+RANKING_RECONCILE_LOCK_KEY = 'ranking:reconcile:lock'
+RANKING_RECONCILE_LOCK_TTL = 3000
+
 class FeedingScheduler:
     """喂食系统定时任务调度器"""
 
@@ -16,6 +23,8 @@ class FeedingScheduler:
         self.bot = bot
         self.running = False
         self.task: Optional[asyncio.Task] = None
+        self.reconcile_task: Optional[asyncio.Task] = None
+        self.global_ranking_task: Optional[asyncio.Task] = None
 
     async def start(self):
         """启动定时任务"""
@@ -38,6 +47,9 @@ class FeedingScheduler:
                 await self.task
             except asyncio.CancelledError:
                 pass
+        for task in (self.reconcile_task, self.global_ranking_task):
+            if task:
+                task.cancel()
         print("🕐 定时任务已停止")
 
     async def _scheduler_loop(self):
@@ -50,6 +62,8 @@ class FeedingScheduler:
                 # 检查是否到达重置时间点
                 await self._check_satiety_reset(current_est)
                 await self._check_shop_refresh(current_est)
+                await self._check_ranking_reconcile(current_est)
+                await self._check_global_ranking_refresh(current_est)
 
                 # 等待1分钟再次检查
                 await asyncio.sleep(60)
@@ -100,7 +114,7 @@ class FeedingScheduler:
                 today = current_time.date()
                 today_str = today.isoformat()
 
-                existing_response = supabase.table('daily_shop_catalog').select('*').eq('refresh_date', today_str).execute()
+                existing_response = await async_db.execute(supabase.table('daily_shop_catalog').select('*').eq('refresh_date', today_str))
                 existing_count = len(existing_response.data) if existing_response.data else 0
 
                 if existing_count > 0:
@@ -119,6 +133,71 @@ class FeedingScheduler:
             await self._refresh_daily_shop()
             print(f"🏪 执行杂货铺刷新 - {current_time.strftime('%Y-%m-%d %H:%M')} EST")
 
+    async def _check_ranking_reconcile(self, current_time: datetime.datetime):
+        """检查并执行积分排行榜漂移检查(在后台任务中运行,不阻塞其他定时任务)"""
+        if current_time.minute != RANKING_RECONCILE_MINUTE or not self.bot:
+            return
+
+        # 只记录最近一次执行的小时,避免记录集合随运行时间无限增长
+        last_reconcile_key = f"ranking_reconcile_{current_time.strftime('%Y%m%d_%H')}"
+        if getattr(self, '_last_reconcile_key', None) == last_reconcile_key:
+            return
+        self._last_reconcile_key = last_reconcile_key
+
+        if self.reconcile_task and not self.reconcile_task.done():
+            print("⚠️ 上一轮排行榜漂移检查尚未结束，跳过")
+            return
+
+        self.reconcile_task = asyncio.create_task(self._reconcile_rankings())
+
+    async def _reconcile_rankings(self):
+        """对本进程所在的所有服务器执行积分排行榜漂移检查"""
+        try:
+            from src.db.redis_client import redis_client
+            from src.utils.ranking import RankingManager
+
+            acquired = await redis_client.set(
+                RANKING_RECONCILE_LOCK_KEY, 1, nx=True, ex=RANKING_RECONCILE_LOCK_TTL
+            )
+            if not acquired:
+                return
+
+            checked = repaired = rebuilt = 0
+            for guild in list(self.bot.guilds):
+                stats = await RankingManager.reconcile_points(guild.id)
+                checked += stats['checked']
+                repaired += stats['repaired']
+                rebuilt += int(stats['rebuilt'])
+
+            print(f"📊 排行榜漂移检查完成：抽样 {checked}，修复 {repaired}，全量重建 {rebuilt} 个服务器")
+
+        except Exception as e:
+            print(f"❌ 排行榜漂移检查时出错: {e}")
+
+    async def _check_global_ranking_refresh(self, current_time: datetime.datetime):
+        """每隔 GLOBAL_RANKING_REFRESH_MINUTES 分钟在后台刷新全局排行榜快照"""
+        from src.utils.global_ranking import GLOBAL_RANKING_REFRESH_MINUTES
+
+        if current_time.minute % max(1, GLOBAL_RANKING_REFRESH_MINUTES) != 0:
+            return
+        if self.global_ranking_task and not self.global_ranking_task.done():
+            return
+
+        last_refresh_key = f"global_ranking_{current_time.strftime('%Y%m%d_%H%M')}"
+        if getattr(self, '_last_global_ranking_key', None) == last_refresh_key:
+            return
+        self._last_global_ranking_key = last_refresh_key
+
+        self.global_ranking_task = asyncio.create_task(self._refresh_global_rankings())
+
+    async def _refresh_global_rankings(self):
+        """刷新所有类型的全局排行榜(其他进程正在刷新时自动跳过)"""
+        try:
+            from src.utils.global_ranking import GlobalRanking
+            await GlobalRanking.refresh_all()
+        except Exception as e:
+            print(f"❌ 刷新全局排行榜时出错: {e}")
+
     async def _reset_all_pet_satiety(self):
         """重置所有宠物的饱食度"""
         try:
@@ -128,10 +207,10 @@ class FeedingScheduler:
             current_time = datetime.datetime.now(datetime.timezone.utc)
 
             # 重置所有宠物的饱食度为0
-            result = supabase.table('user_pets').update({
+            result = await async_db.execute(supabase.table('user_pets').update({
                 'satiety': 0,
                 'last_feeding': None  # 也重置最后喂食时间
-            }).neq('id', 0).execute()  # 更新所有宠物
+            }).neq('id', 0))  # 更新所有宠物
 
             affected_count = len(result.data) if result.data else 0
             print(f"✅ 重置了 {affected_count} 只宠物的饱食度")
@@ -143,7 +222,7 @@ class FeedingScheduler:
         """刷新每日杂货铺"""
         try:
             # 使用FoodShopManager刷新商店
-            new_items = FoodShopManager.refresh_daily_shop()
+            new_items = await async_db.run_sync(FoodShopManager.refresh_daily_shop)
             item_count = len(new_items) if new_items else 0
             print(f"✅ 杂货铺已刷新，共 {item_count} 种商品")
 
@@ -0,0 +1,54 @@
+"""
+启动耗时记录
+从进程入口开始记录各阶段(模块导入、登录、斜杠命令同步、定时任务...)的时间点,
+在on_ready结束时输出一次时间线,用于衡量冷启动到就绪的耗时。
+
+只依赖标准库,必须尽早导入(bot.py第一行),否则起点会偏晚。
+"""
+import time
+from contextlib import contextmanager
+from typing import List, Tuple
+
+_start = time.perf_counter()
+_marks: List[Tuple[str, float]] = []
+_reported = False
+
+
+def mark(label: str):
+    """记录一个时间点"""
+    _marks.append((label, time.perf_counter()))
+
+
+@contextmanager
+def section(label: str):
+    """记录一段代码的开始与结束"""
+    mark(f"{label} 开始")
+    try:
+        yield
+    finally:
+        mark(f"{label} 结束")
+
+
+def elapsed() -> float:
+    """进程启动以来的秒数"""
+    return time.perf_counter() - _start
+
+
+def format_report() -> str:
+    """格式化时间线: 每行为 累计耗时 / 距上一时间点的耗时 / 标签"""
+    lines = ["启动时间线:"]
+    previous = _start
+    for label, at in _marks:
+        lines.append(f"  {(at - _start) * 1000:8.1f} ms  (+{(at - previous) * 1000:7.1f} ms)  {label}")
+        previous = at
+    return "\n".join(lines)
+
+
+def report_once():
+    """输出时间线(断线重连触发的on_ready不会重复输出)"""
+    global _reported
+
+    if _reported:
+        return
+    _reported = True
+    print(format_report())
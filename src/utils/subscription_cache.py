@@ -0,0 +1,135 @@
+"""
+服务器订阅状态缓存
+每条命令都会检查订阅状态,这里按 进程内LRU -> Redis -> 数据库 三级缓存,
+订阅变更通过Redis pub/sub通知所有进程立即失效
+"""
+import logging
+from typing import List
+
+from src.db.redis_client import redis_client
+from src.db.database import get_connection
+from src.db import async_db
+from src.utils.cache import InvalidationBus
+from src.utils.lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# 进程内缓存有效期较短,即使错过失效通知也能很快恢复一致
+LOCAL_TTL = 60
+LOCAL_MAX_SIZE = 10000
+# Redis缓存有效期(直接修改数据库且未广播时的最长延迟)
+REDIS_TTL = 300
+INVALIDATE_CHANNEL = 'subscription:invalidate'
+
+
+class SubscriptionCache:
+    """服务器订阅状态缓存"""
+
+    _local = LRUCache(LOCAL_MAX_SIZE, LOCAL_TTL)
+
+    @staticmethod
+    def _cache_key(guild_id: int) -> str:
+        return f'subscription:{guild_id}'
+
+    @staticmethod
+    async def is_subscribed(guild_id: int) -> bool:
+        """
+        检查服务器是否有有效订阅(带缓存)
+
+        Args:
+            guild_id: Discord服务器ID
+
+        Returns:
+            True表示有有效订阅
+        """
+        guild_id = int(guild_id)
+
+        # 1. 进程内缓存
+        cached = SubscriptionCache._local.get(guild_id)
+        if cached is not None:
+            return cached
+
+        # 2. Redis缓存
+        cache_key = SubscriptionCache._cache_key(guild_id)
+        try:
+            cached_value = await redis_client.get(cache_key)
+            if cached_value is not None:
+                is_active = cached_value == '1'
+                SubscriptionCache._local.set(guild_id, is_active)
+                return is_active
+        except Exception as e:
+            logger.warning(f"Redis查询订阅状态失败,降级到数据库: {e}")
+
+        # 3. 查询数据库(查询失败时不缓存,按未订阅处理)
+        try:
+            supabase = get_connection()
+            response = await async_db.execute(
+                supabase.table('guild_subscriptions').select('is_active').eq('guild_id', guild_id)
+            )
+        except Exception as e:
+            print(f"检查服务器订阅状态错误: {e}")
+            return False
+
+        is_active = bool(response.data and response.data[0].get('is_active', False))
+        SubscriptionCache._local.set(guild_id, is_active)
+        try:
+            await redis_client.setex(cache_key, REDIS_TTL, '1' if is_active else '0')
+        except Exception as e:
+            logger.error(f"Redis写入订阅状态失败: {e}")
+
+        return is_active
+
+    @staticmethod
+    async def active_guild_ids() -> List[int]:
+        """
+        从数据库读取所有有效订阅的服务器ID(不经过缓存,供后台任务使用)
+
+        Returns:
+            服务器ID列表
+        """
+        supabase = get_connection()
+        result = await async_db.execute(
+            supabase.table('guild_subscriptions').select('guild_id').eq('is_active', True)
+        )
+        return [int(row['guild_id']) for row in (result.data or [])]
+
+    @staticmethod
+    async def store(guild_id: int, is_active: bool):
+        """
+        写入最新订阅状态并通知所有进程(管理员刷新订阅时调用)
+
+        Args:
+            guild_id: Discord服务器ID
+            is_active: 是否有效
+        """
+        guild_id = int(guild_id)
+        SubscriptionCache._local.set(guild_id, is_active)
+        try:
+            await redis_client.setex(SubscriptionCache._cache_key(guild_id), REDIS_TTL, '1' if is_active else '0')
+        except Exception as e:
+            logger.error(f"Redis写入订阅状态失败: {e}")
+        await InvalidationBus.publish(INVALIDATE_CHANNEL, str(guild_id))
+
+    @staticmethod
+    async def invalidate(guild_id: int):
+        """
+        使订阅状态缓存失效并通知所有进程
+
+        Args:
+            guild_id: Discord服务器ID
+        """
+        guild_id = int(guild_id)
+        SubscriptionCache._local.pop(guild_id)
+        try:
+            await redis_client.delete(SubscriptionCache._cache_key(guild_id))
+        except Exception as e:
+            logger.error(f"删除订阅状态缓存失败: {e}")
+        await InvalidationBus.publish(INVALIDATE_CHANNEL, str(guild_id))
+
+    @staticmethod
+    def _on_invalidate(message: str):
+        """收到失效通知时清除本进程缓存,下次检查会从Redis读取最新值"""
+        SubscriptionCache._local.pop(int(message))
+
+
+InvalidationBus.register(INVALIDATE_CHANNEL, SubscriptionCache._on_invalidate)